@@ -0,0 +1,56 @@
+# benchmarks/allocation_benchmark.py
+
+"""
+Measures the memory get_route_metrics allocates with tracemalloc: the
+peak while extracting each of the largest reference routes, and the sum
+of the peaks over the whole GPX set.
+
+Usage (from the TRA directory):
+    python benchmarks/allocation_benchmark.py [corpus_dir] [--files N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metric_extractor import get_route_metrics
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+def _peak_bytes(path):
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = get_route_metrics(path, 'gpx')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, metrics["raw_points_count"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--files', type=int, default=3, help='Number of largest files to list individually.')
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')), key=os.path.getsize, reverse=True)
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    total_peak = total_points = 0
+    for n, path in enumerate(files):
+        peak, points = _peak_bytes(path)
+        total_peak += peak
+        total_points += points
+        if n < args.files:
+            print(f"{os.path.basename(path)}: {points} points, peak {peak / 1e6:6.1f} MB ({peak / points:.0f} B/point)")
+    print(f"All {len(files)} files: {total_points} points, summed peaks {total_peak / 1e6:.1f} MB "
+          f"({total_peak / total_points:.0f} B/point)")
+
+if __name__ == '__main__':
+    main()
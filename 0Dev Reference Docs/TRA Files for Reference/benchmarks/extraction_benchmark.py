@@ -0,0 +1,80 @@
+# benchmarks/extraction_benchmark.py
+
+"""
+Times get_route_metrics over the reference route files, split into the
+parse step, and the metrics engine (distance, PDD, TEGa, MCg, ACg, ADg
+from the shared arrays). Whatever remains of the total is the copy and
+smoothing of the parsed points.
+
+Usage (from the TRA directory):
+    python benchmarks/extraction_benchmark.py [corpus_dir]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metric_extractor as me
+from common.utils import haversine_distances
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+PARSERS = me.TRACK_EXTRACTORS
+
+def _run_metrics(track):
+    """The metric stage of get_route_metrics, on an already-parsed track."""
+    latitudes, longitudes, elevations = track.lat, track.lon, track.ele
+    segment_distances_km = haversine_distances(latitudes, longitudes)
+    segment_distances_m = segment_distances_km * 1000
+    rises = np.diff(elevations)
+    me._calculate_tega(elevations)
+    me._calculate_tega(elevations)
+    me._calculate_distances_and_pdd(segment_distances_km, rises)
+    me._calculate_mcg(elevations, segment_distances_m)
+    me._calculate_acg_or_adg(elevations, rises, segment_distances_m, is_climb=True)
+    me._calculate_acg_or_adg(elevations, rises, segment_distances_m, is_climb=False)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    files = sorted(f for f in glob.glob(os.path.join(args.corpus, '*')) if f.rsplit('.', 1)[-1] in PARSERS)
+    if not files:
+        print(f"No GPX, TCX or FIT files found in {args.corpus}")
+        return
+
+    totals = {'points': 0, 'total': 0.0, 'parse': 0.0, 'metrics': 0.0}
+    for path in files:
+        extension = path.rsplit('.', 1)[-1]
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            me.get_route_metrics(path, extension)
+            totals['total'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            _, track = PARSERS[extension](path)
+            totals['parse'] += time.perf_counter() - start
+
+        if len(track) >= 2:
+            start = time.perf_counter()
+            _run_metrics(track)
+            totals['metrics'] += time.perf_counter() - start
+        totals['points'] += len(track)
+
+    other = totals['total'] - totals['parse'] - totals['metrics']
+    print(f"{len(files)} files, {totals['points']} points")
+    print(f"  get_route_metrics total {totals['total']:6.2f} s")
+    print(f"    parse                 {totals['parse']:6.2f} s")
+    print(f"    metrics engine        {totals['metrics']:6.2f} s")
+    print(f"    copy + smoothing      {other:6.2f} s")
+
+if __name__ == '__main__':
+    main()
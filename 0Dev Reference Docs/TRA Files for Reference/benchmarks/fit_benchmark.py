@@ -0,0 +1,85 @@
+# benchmarks/fit_benchmark.py
+
+"""
+Compares decoding the same routes from FIT, TCX and GPX. Each reference
+GPX file is re-encoded as a FIT course and a TCX course holding exactly
+its points, then every copy is read with the metric extractor's reader
+for its format (TRACK_EXTRACTORS). Reports file sizes and decode
+throughput per format.
+
+Usage (from the TRA directory):
+    python benchmarks/fit_benchmark.py [corpus_dir] [--limit N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metric_extractor import TRACK_EXTRACTORS
+from tests.test_fit import _encode_fit, _gpx_columns
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+def _encode_tcx(lats, lons, eles):
+    """The same points as a TCX course."""
+    trackpoints = []
+    for lat, lon, ele in zip(lats, lons, eles):
+        altitude = f"<AltitudeMeters>{ele}</AltitudeMeters>" if ele is not None else ""
+        trackpoints.append(f"<Trackpoint><Position><LatitudeDegrees>{lat}</LatitudeDegrees>"
+                           f"<LongitudeDegrees>{lon}</LongitudeDegrees></Position>{altitude}</Trackpoint>")
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">'
+            '<Courses><Course><Name>Benchmark</Name><Track>' + "\n".join(trackpoints) +
+            '</Track></Course></Courses></TrainingCenterDatabase>\n').encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--limit', type=int, default=None, help="only use the first N GPX files")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')))[:args.limit]
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    totals = {fmt: {'bytes': 0, 'seconds': 0.0} for fmt in ('gpx', 'tcx', 'fit')}
+    points = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n, path in enumerate(files):
+            lats, lons, eles = _gpx_columns(path)
+            copies = {'gpx': path, 'tcx': os.path.join(work_dir, f'{n}.tcx'), 'fit': os.path.join(work_dir, f'{n}.fit')}
+            with open(copies['tcx'], 'wb') as f:
+                f.write(_encode_tcx(lats, lons, eles))
+            with open(copies['fit'], 'wb') as f:
+                f.write(_encode_fit(lats, lons, eles, course_name="Benchmark"))
+
+            for fmt, copy_path in copies.items():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    _, track = TRACK_EXTRACTORS[fmt](copy_path)
+                    totals[fmt]['seconds'] += time.perf_counter() - start
+                totals[fmt]['bytes'] += os.path.getsize(copy_path)
+                if len(track) != len(lats) or (len(track) and not math.isclose(track.lat[-1], lats[-1], abs_tol=1e-6)):
+                    print(f"  warning: {fmt} copy of {os.path.basename(path)} decoded differently")
+            points += len(lats)
+
+    print(f"{len(files)} routes, {points} points")
+    for fmt, t in totals.items():
+        megabytes = t['bytes'] / (1024 * 1024)
+        print(f"  {fmt}: {megabytes:7.1f} MB, {t['seconds']:6.2f} s, {megabytes / t['seconds']:6.1f} MB/s, "
+              f"{points / t['seconds'] / 1000:7.1f}k points/s")
+    print(f"  FIT is {totals['gpx']['bytes'] / totals['fit']['bytes']:.1f}x smaller than GPX and "
+          f"{totals['tcx']['bytes'] / totals['fit']['bytes']:.1f}x smaller than TCX, and decodes "
+          f"{totals['gpx']['seconds'] / totals['fit']['seconds']:.0f}x faster than GPX")
+
+if __name__ == '__main__':
+    main()
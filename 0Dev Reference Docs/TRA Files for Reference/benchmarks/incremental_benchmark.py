@@ -0,0 +1,85 @@
+# benchmarks/incremental_benchmark.py
+
+"""
+Times an edit to a route three ways: re-scoring the file from scratch with
+get_route_metrics (what the planner does today), rebuilding
+IncrementalRouteMetrics from the edited points, and splicing the edit into
+an existing IncrementalRouteMetrics. Each edit moves, inserts or deletes a
+few points at a random position on the largest routes in the corpus.
+
+Usage (from the TRA directory):
+    python benchmarks/incremental_benchmark.py [corpus_dir] [--routes N] [--edits N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from incremental_metrics import IncrementalRouteMetrics
+from metric_extractor import get_route_metrics
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+def _edit(metrics, rng):
+    """A planner-sized edit: drag one point, add a few, or remove a few."""
+    n = len(metrics)
+    index = rng.randrange(1, n - 10)
+    kind = rng.choice(('move', 'insert', 'delete'))
+    if kind == 'delete':
+        return index, index + 5, [], [], []
+    count = 1 if kind == 'move' else 5
+    lat, lon, ele = metrics.lat[index], metrics.lon[index], metrics.raw_ele[index]
+    lats = [lat + 1e-5 * (i + 1) for i in range(count)]
+    lons = [lon + 1e-5 * (i + 1) for i in range(count)]
+    eles = [ele + rng.uniform(-5, 5) for _ in range(count)]
+    return index, index + (1 if kind == 'move' else 0), lats, lons, eles
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--routes', type=int, default=3, help="benchmark the N largest routes")
+    parser.add_argument('--edits', type=int, default=200, help="edits per route")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')), key=os.path.getsize, reverse=True)[:args.routes]
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    rng = random.Random(0)
+    for path in files:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            get_route_metrics(path, 'gpx')
+            full_seconds = time.perf_counter() - start
+            metrics = IncrementalRouteMetrics.from_file(path, 'gpx')
+
+        rebuild_seconds = splice_seconds = 0.0
+        for _ in range(args.edits):
+            edit = _edit(metrics, rng)
+            start = time.perf_counter()
+            metrics.splice(*edit)
+            metrics.metrics()
+            splice_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            IncrementalRouteMetrics(metrics.lat, metrics.lon, metrics.raw_ele).metrics()
+            rebuild_seconds += time.perf_counter() - start
+
+        rebuild_ms = rebuild_seconds / args.edits * 1000
+        splice_ms = splice_seconds / args.edits * 1000
+        print(f"{os.path.basename(path)}: {len(metrics)} points")
+        print(f"  get_route_metrics from file: {full_seconds * 1000:8.2f} ms")
+        print(f"  rebuild from points:         {rebuild_ms:8.2f} ms per edit")
+        print(f"  splice:                      {splice_ms:8.2f} ms per edit "
+              f"({rebuild_ms / splice_ms:.1f}x faster than a rebuild, {full_seconds * 1000 / splice_ms:.0f}x than re-scoring)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/mcg_benchmark.py
+
+"""
+Times MCg (maximum ~100 m climb gradient) with the sliding-window
+_calculate_mcg against the original nested loop, on the largest reference
+route and across the whole GPX set, and checks both give the same value.
+
+Usage (from the TRA directory):
+    python benchmarks/mcg_benchmark.py [corpus_dir]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import math
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.utils import haversine_distances
+from metric_extractor import TrackPoint, _calculate_mcg, get_route_metrics
+from tests.test_metric_extractor import _reference_mcg
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')), key=os.path.getsize, reverse=True)
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    totals = {'points': 0, 'reference': 0.0, 'sliding': 0.0, 'mismatches': 0}
+    for n, path in enumerate(files):
+        with contextlib.redirect_stdout(io.StringIO()):
+            track = get_route_metrics(path, 'gpx')["track_points"]
+        points = [TrackPoint(lat, lon, None if math.isnan(ele) else ele)
+                  for lat, lon, ele in zip(track.lat.tolist(), track.lon.tolist(), track.ele.tolist())]
+        segments = haversine_distances(track.lat, track.lon).tolist()
+
+        expected, reference_seconds = _timed(_reference_mcg, points, segments)
+        elevations = np.array([np.nan if p.elevation is None else p.elevation for p in points])
+        actual, sliding_seconds = _timed(_calculate_mcg, elevations, np.array(segments) * 1000)
+        totals['points'] += len(points)
+        totals['reference'] += reference_seconds
+        totals['sliding'] += sliding_seconds
+        totals['mismatches'] += actual != expected
+        if n == 0:
+            print(f"Largest file {os.path.basename(path)} ({len(points)} points, MCg {actual:.2f}%):")
+            print(f"  nested loop {reference_seconds * 1000:8.1f} ms, sliding window {sliding_seconds * 1000:6.1f} ms "
+                  f"({reference_seconds / sliding_seconds:.0f}x)")
+
+    print(f"All {len(files)} files ({totals['points']} points):")
+    print(f"  nested loop {totals['reference']:6.2f} s, sliding window {totals['sliding']:6.2f} s "
+          f"({totals['reference'] / totals['sliding']:.0f}x), {totals['mismatches']} mismatches")
+
+if __name__ == '__main__':
+    main()
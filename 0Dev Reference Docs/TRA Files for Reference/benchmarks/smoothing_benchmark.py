@@ -0,0 +1,70 @@
+# benchmarks/smoothing_benchmark.py
+
+"""
+Times elevation smoothing on the reference corpus: the original per-window
+moving average against the vectorised smoothers in common.utils, at several
+window sizes, and checks the default moving average still gives the same
+values.
+
+Usage (from the TRA directory):
+    python benchmarks/smoothing_benchmark.py [corpus_dir] [--windows 7 31 101]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.utils import SMOOTHERS, get_smoothed_elevations
+from metric_extractor import get_route_metrics
+from tests.test_utils import _reference_smoothed_elevations
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--windows', type=int, nargs='+', default=[7, 31, 101])
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')))
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    profiles = []
+    for path in files:
+        with contextlib.redirect_stdout(io.StringIO()):
+            track = get_route_metrics(path, 'gpx', apply_smoothing=False)["track_points"]
+        profiles.append([e for e in track.ele.tolist() if not math.isnan(e)])
+    print(f"{len(profiles)} routes, {sum(map(len, profiles))} points")
+
+    for window_size in args.windows:
+        reference_seconds, mismatches = 0.0, 0
+        timings = dict.fromkeys(SMOOTHERS, 0.0)
+        for elevations in profiles:
+            expected, seconds = _timed(_reference_smoothed_elevations, elevations, window_size)
+            reference_seconds += seconds
+            for method in SMOOTHERS:
+                options = {'polyorder': 2} if method == 'savitzky_golay' else {}
+                actual, seconds = _timed(get_smoothed_elevations, elevations, window_size, method, **options)
+                timings[method] += seconds
+                if method == 'moving_average':
+                    mismatches += sum(1 for a, e in zip(actual, expected) if abs(a - e) > 1e-9)
+        print(f"  window {window_size:3d}: original loop {reference_seconds:6.2f} s | " +
+              ", ".join(f"{method} {seconds:5.3f} s" for method, seconds in timings.items()) +
+              f" | {mismatches} moving-average mismatches")
+
+if __name__ == '__main__':
+    main()
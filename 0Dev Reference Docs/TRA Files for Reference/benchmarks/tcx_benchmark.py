@@ -0,0 +1,81 @@
+# benchmarks/tcx_benchmark.py
+
+"""
+Times reading TCX files with the single-pass streaming reader against the
+previous path, where TCXParser loaded the whole tree with lxml.objectify,
+failed on course files (no <Activities>), and the fallback then parsed the
+whole file again. The previous path is reproduced here with objectify
+directly (including the per-point time parsing it did), so
+python-tcxparser isn't needed.
+
+Usage (from the TRA directory):
+    python benchmarks/tcx_benchmark.py [corpus_dir] [--repeat N]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+from datetime import datetime
+from lxml import objectify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metric_extractor import _extract_track_from_tcx
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'route_files_store')
+
+def _previous_path(path):
+    """Two full-tree parses: TCXParser's, then the Course fallback's walk over the second tree."""
+    root = objectify.parse(path).getroot()
+    if not hasattr(root, 'Activities'):
+        root = objectify.parse(path).getroot()
+    points = []
+    for container in (getattr(root, 'Activities', None), getattr(root, 'Courses', None)):
+        if container is None:
+            continue
+        for trackpoint in container.iter('{*}Trackpoint'):
+            if hasattr(trackpoint, 'Position'):
+                ele = trackpoint.AltitudeMeters.text if hasattr(trackpoint, 'AltitudeMeters') else None
+                time_obj = None
+                if hasattr(trackpoint, 'Time') and trackpoint.Time.text:
+                    time_obj = datetime.fromisoformat(str(trackpoint.Time.text).replace('Z', '+00:00'))
+                points.append((float(trackpoint.Position.LatitudeDegrees.text),
+                               float(trackpoint.Position.LongitudeDegrees.text),
+                               float(ele) if ele is not None else None, time_obj))
+    return points
+
+def _best_time(func, path, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.tcx')))
+    if not files:
+        print(f"No TCX files found in {args.corpus}")
+        return
+
+    for path in files:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, track = _extract_track_from_tcx(path)
+            previous_seconds = _best_time(_previous_path, path, args.repeat)
+            streaming_seconds = _best_time(_extract_track_from_tcx, path, args.repeat)
+        print(f"{os.path.basename(path)} ({os.path.getsize(path) / (1024 * 1024):.1f} MB, {len(track)} points):")
+        print(f"  previous (two objectify parses) {previous_seconds * 1000:7.1f} ms")
+        print(f"  streaming                       {streaming_seconds * 1000:7.1f} ms "
+              f"({previous_seconds / streaming_seconds:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
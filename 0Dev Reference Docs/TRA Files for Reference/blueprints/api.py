@@ -10,7 +10,7 @@ from flask_login import login_required, current_user
 from bson import ObjectId, errors
 from difficulty_calculator import calculate_total_difficulty
 from common.utils import haversine_distance, get_start_location_name
-from metric_extractor import get_route_metrics
+from metrics_cache import get_route_metrics_cached
 from difficulty_calculator import calculate_total_difficulty
 from common.utils import get_start_location_name # We need this for the new logic
 
@@ -324,7 +324,7 @@ def save_planned_route():
             f.write(gpx_string)
 
         # 2. Process the file immediately (no Celery)
-        metrics_data = get_route_metrics(temp_filepath, 'gpx', apply_smoothing=True)
+        metrics_data = get_route_metrics_cached(temp_filepath, 'gpx', apply_smoothing=True)
         if not metrics_data:
             raise ValueError("Failed to extract metrics from generated GPX.")
 
@@ -344,7 +344,7 @@ def save_planned_route():
             "metrics_summary": {k: v for k,v in metrics_data.items() if k not in ["track_points", "start_lat", "start_lon"]},
             "start_location_name": start_location_name,
             "start_coordinates": {"lat": start_lat, "lon": start_lon},
-            "track_points": metrics_data.get("track_points", []),
+            "track_points": metrics_data["track_points"].to_dicts(),
             "difficulty_score": round(total_difficulty, 2),
             "file_type": "gpx", # It's now a GPX file
             "source_type": 'planner',
@@ -10,7 +10,7 @@ from celery import Celery
 from bson import ObjectId
 
 # Helper function imports
-from metric_extractor import get_route_metrics
+from metrics_cache import get_route_metrics_cached
 from difficulty_calculator import calculate_total_difficulty
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderUnavailable, GeocoderServiceError
@@ -53,15 +53,16 @@ def process_route_task(filepath, file_extension, original_identifier, is_upload,
     This background task contains the full logic for processing a route file.
     """
     try:
-        metrics_data = get_route_metrics(filepath, file_extension, apply_smoothing=True)
+        metrics_data = get_route_metrics_cached(filepath, file_extension, apply_smoothing=True)
         if not metrics_data: 
             raise ValueError("Failed to extract metrics from route file.")
 
         # --- Thumbnail Generation ---
         thumbnail_filename = None # Default to None
-        if metrics_data.get("track_points"):
+        track = metrics_data["track_points"]
+        if track:
             try:
-                line_coordinates = [(p['lon'], p['lat']) for p in metrics_data["track_points"]]
+                line_coordinates = track.lon_lat_pairs()
                 if line_coordinates:
                     # Generate a unique filename for the thumbnail
                     temp_thumb_filename = f"map_{uuid.uuid4().hex[:10]}.png"
@@ -95,7 +96,7 @@ def process_route_task(filepath, file_extension, original_identifier, is_upload,
             "metrics_summary": {k: v for k,v in metrics_data.items() if k not in ["track_points", "start_lat", "start_lon"]},
             "start_location_name": start_location_name,
             "start_coordinates": {"lat": start_lat, "lon": start_lon},
-            "track_points": metrics_data.get("track_points", []),
+            "track_points": track.to_dicts(),
             "difficulty_score": round(total_difficulty, 2),
             "file_type": file_extension,
             "source_type": 'upload' if is_upload else 'url',
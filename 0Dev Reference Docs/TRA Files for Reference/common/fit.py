@@ -0,0 +1,171 @@
+# common/fit.py - Minimal decoder for Garmin FIT activity and course files
+
+import struct
+from array import array
+
+# Only the messages and fields the metric extractor uses are decoded; every
+# other message is skipped by its defined size.
+FIT_SIGNATURE = b'.FIT'
+COURSE_MESG_NUM = 31
+RECORD_MESG_NUM = 20
+
+COURSE_NAME_FIELD = 5
+RECORD_POSITION_LAT_FIELD = 0
+RECORD_POSITION_LONG_FIELD = 1
+RECORD_ALTITUDE_FIELD = 2
+RECORD_ENHANCED_ALTITUDE_FIELD = 78
+
+SEMICIRCLES_TO_DEGREES = 180.0 / 2**31
+ALTITUDE_SCALE = 5.0
+ALTITUDE_OFFSET_M = 500.0
+
+# Base type bytes, and struct codes for the numeric ones decoded here
+_SINT32 = 0x85
+_UINT16 = 0x84
+_UINT32 = 0x86
+_STRING = 0x07
+_STRUCT_CODES = {_SINT32: 'i', _UINT16: 'H', _UINT32: 'I'}
+_INVALID_SINT32 = 0x7FFFFFFF
+_INVALID_UINT16 = 0xFFFF
+_INVALID_UINT32 = 0xFFFFFFFF
+
+# Record field number -> the base type it must have to be read
+_RECORD_FIELDS = {
+    RECORD_POSITION_LAT_FIELD: _SINT32,
+    RECORD_POSITION_LONG_FIELD: _SINT32,
+    RECORD_ALTITUDE_FIELD: _UINT16,
+    RECORD_ENHANCED_ALTITUDE_FIELD: _UINT32,
+}
+
+
+class FitDecodeError(ValueError):
+    """Raised when a file isn't FIT or its records run past the end of the data."""
+
+
+class _Definition:
+    """A local message definition: its size, and for records a Struct that unpacks the wanted fields."""
+    __slots__ = ("size", "record_struct", "lat_index", "lon_index", "altitude_index", "enhanced_altitude_index",
+                 "name_offset", "name_size")
+
+    def __init__(self, global_num, fields, developer_size, big_endian):
+        self.size = sum(size for _, size, _ in fields) + developer_size
+        self.record_struct = None
+        self.name_offset = self.name_size = None
+
+        if global_num == RECORD_MESG_NUM:
+            # One struct per definition: wanted fields unpacked, the rest padded over
+            codes, wanted, offset = [], [], 0
+            for field_num, size, base_type in fields:
+                expected_type = _RECORD_FIELDS.get(field_num)
+                if expected_type is not None and base_type == expected_type \
+                        and struct.calcsize(_STRUCT_CODES[base_type]) == size:
+                    if offset:
+                        codes.append(f'{offset}x')
+                        offset = 0
+                    codes.append(_STRUCT_CODES[base_type])
+                    wanted.append(field_num)
+                else:
+                    offset += size
+            # Records without both coordinates are never used, so they get no struct
+            if RECORD_POSITION_LAT_FIELD in wanted and RECORD_POSITION_LONG_FIELD in wanted:
+                self.record_struct = struct.Struct(('>' if big_endian else '<') + ''.join(codes))
+                self.lat_index = wanted.index(RECORD_POSITION_LAT_FIELD)
+                self.lon_index = wanted.index(RECORD_POSITION_LONG_FIELD)
+                self.altitude_index = wanted.index(RECORD_ALTITUDE_FIELD) if RECORD_ALTITUDE_FIELD in wanted else None
+                self.enhanced_altitude_index = (wanted.index(RECORD_ENHANCED_ALTITUDE_FIELD)
+                                                if RECORD_ENHANCED_ALTITUDE_FIELD in wanted else None)
+        elif global_num == COURSE_MESG_NUM:
+            offset = 0
+            for field_num, size, base_type in fields:
+                if field_num == COURSE_NAME_FIELD and base_type == _STRING:
+                    self.name_offset, self.name_size = offset, size
+                offset += size
+
+
+def decode_fit_track(data: bytes):
+    """
+    Decodes the record messages of a FIT file straight into coordinate
+    columns.
+
+    Returns (course name or None, latitudes, longitudes, elevations) where
+    the columns are array('d') in degrees and metres. Records without a
+    position are skipped; a record without an altitude gets NaN (the
+    enhanced altitude is preferred when both are present). Chained FIT
+    files are read one after another. CRCs are not checked.
+
+    Raises FitDecodeError for anything that isn't a well-formed FIT file.
+    """
+    try:
+        return _decode_fit_track(data)
+    except (IndexError, struct.error) as e:
+        raise FitDecodeError(f"Truncated FIT data: {e}") from e
+
+def _decode_fit_track(data: bytes):
+    latitudes, longitudes, elevations = array('d'), array('d'), array('d')
+    course_name = None
+    nan = float('nan')
+    position = 0
+
+    while position < len(data):
+        if len(data) - position < 12 or data[position + 8:position + 12] != FIT_SIGNATURE:
+            raise FitDecodeError("Not a FIT file (missing '.FIT' header)")
+        header_size = data[position]
+        data_size = struct.unpack_from('<I', data, position + 4)[0]
+        offset = position + header_size
+        end = offset + data_size
+        if header_size < 12 or end > len(data):
+            raise FitDecodeError("FIT header describes more data than the file holds")
+
+        definitions = {}
+        while offset < end:
+            header = data[offset]
+            offset += 1
+            if header & 0x80:
+                # Compressed timestamp header: a data message with local type in bits 5-6
+                local_type = (header >> 5) & 0x03
+            elif header & 0x40:
+                # Definition message
+                local_type = header & 0x0F
+                big_endian = data[offset + 1] == 1
+                global_num = struct.unpack_from('>H' if big_endian else '<H', data, offset + 2)[0]
+                field_count = data[offset + 4]
+                offset += 5
+                fields = [tuple(data[offset + 3 * i:offset + 3 * i + 3]) for i in range(field_count)]
+                offset += 3 * field_count
+                developer_size = 0
+                if header & 0x20:
+                    developer_count = data[offset]
+                    developer_size = sum(data[offset + 1 + 3 * i + 1] for i in range(developer_count))
+                    offset += 1 + 3 * developer_count
+                definitions[local_type] = _Definition(global_num, fields, developer_size, big_endian)
+                continue
+            else:
+                local_type = header & 0x0F
+
+            definition = definitions.get(local_type)
+            if definition is None:
+                raise FitDecodeError(f"Data message for undefined local type {local_type}")
+            if offset + definition.size > end:
+                raise FitDecodeError("FIT message runs past the end of the data")
+
+            if definition.record_struct is not None:
+                values = definition.record_struct.unpack_from(data, offset)
+                lat, lon = values[definition.lat_index], values[definition.lon_index]
+                if lat != _INVALID_SINT32 and lon != _INVALID_SINT32:
+                    altitude = None
+                    if definition.enhanced_altitude_index is not None \
+                            and values[definition.enhanced_altitude_index] != _INVALID_UINT32:
+                        altitude = values[definition.enhanced_altitude_index]
+                    elif definition.altitude_index is not None and values[definition.altitude_index] != _INVALID_UINT16:
+                        altitude = values[definition.altitude_index]
+                    latitudes.append(lat * SEMICIRCLES_TO_DEGREES)
+                    longitudes.append(lon * SEMICIRCLES_TO_DEGREES)
+                    elevations.append(nan if altitude is None else altitude / ALTITUDE_SCALE - ALTITUDE_OFFSET_M)
+            elif definition.name_offset is not None and course_name is None:
+                raw = data[offset + definition.name_offset:offset + definition.name_offset + definition.name_size]
+                course_name = raw.split(b'\x00', 1)[0].decode('utf-8', errors='replace').strip() or None
+            offset += definition.size
+
+        position = end + 2  # skip the file CRC
+
+    return course_name, latitudes, longitudes, elevations
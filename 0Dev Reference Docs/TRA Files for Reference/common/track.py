@@ -0,0 +1,53 @@
+# common/track.py - Compact column-oriented track container
+
+import numpy as np
+
+
+class Track:
+    """
+    A GPS track held as parallel float64 arrays instead of a list of dicts.
+
+    `lat`, `lon` and `ele` use NaN for missing values and `dist` is the
+    cumulative distance in km at each point. Iterating a Track (or calling
+    `to_dicts()`) yields the `{"lat", "lon", "ele", "dist"}` dicts that the
+    templates, JS and stored documents expect, so conversion only happens
+    where the data leaves Python.
+    """
+    __slots__ = ("lat", "lon", "ele", "dist")
+
+    def __init__(self, lat, lon, ele, dist):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.ele = np.asarray(ele, dtype=np.float64)
+        self.dist = np.asarray(dist, dtype=np.float64)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [])
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __bool__(self):
+        return len(self.lat) > 0
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    @property
+    def nbytes(self):
+        return self.lat.nbytes + self.lon.nbytes + self.ele.nbytes + self.dist.nbytes
+
+    def lon_lat_pairs(self):
+        """Returns [(lon, lat), ...], the coordinate order staticmap expects."""
+        return list(zip(self.lon.tolist(), self.lat.tolist()))
+
+    def to_dicts(self):
+        """Converts the track to a list of {"lat", "lon", "ele", "dist"} dicts (NaN becomes None)."""
+        def _none_if_nan(values):
+            return [None if v != v else v for v in values.tolist()]
+        return [
+            {"lat": lat, "lon": lon, "ele": ele, "dist": dist}
+            for lat, lon, ele, dist in zip(_none_if_nan(self.lat), _none_if_nan(self.lon),
+                                           _none_if_nan(self.ele), self.dist.tolist())
+        ]
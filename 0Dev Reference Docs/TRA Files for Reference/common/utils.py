@@ -1,12 +1,14 @@
 # blueprints/utils.py
 
+import bisect
 import os
 from urllib.parse import urlparse
-from math import radians, sin, cos, sqrt, atan2
+from math import pi, sin, cos, sqrt, atan2
+import numpy as np
 
 # These are the same functions you had in app.py
 
-ALLOWED_EXTENSIONS = {'gpx', 'tcx'}
+ALLOWED_EXTENSIONS = {'gpx', 'tcx', 'fit'}
 
 def allowed_file(filename):
     """Checks if a filename has an allowed extension."""
@@ -118,45 +120,201 @@ def transform_to_download_url(url):
     # If no match, return the original URL
     return url
 
+EARTH_RADIUS_KM = 6371.0
+_DEG_TO_RAD = pi / 180.0
+
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great-circle distance between two points
     on the earth (specified in decimal degrees).
-    """
-    # Radius of earth in kilometers
-    R = 6371.0
-
-    lat1_rad = radians(lat1)
-    lon1_rad = radians(lon1)
-    lat2_rad = radians(lat2)
-    lon2_rad = radians(lon2)
 
-    dlon = lon2_rad - lon1_rad
+    Scalar fast path for single pairs. Use `haversine_distances` for a
+    whole track.
+    """
+    lat1_rad = lat1 * _DEG_TO_RAD
+    lat2_rad = lat2 * _DEG_TO_RAD
     dlat = lat2_rad - lat1_rad
+    dlon = (lon2 - lon1) * _DEG_TO_RAD
 
     a = sin(dlat / 2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2)**2
     c = 2 * atan2(sqrt(a), sqrt(1 - a))
 
-    distance = R * c
-    return distance
+    return EARTH_RADIUS_KM * c
 
-def get_smoothed_elevations(original_elevations: list, window_size: int) -> list:
+def haversine_distances(lats, lons) -> np.ndarray:
     """
-    Applies a simple moving average to a list of elevation values.
-    `window_size` should be an odd integer.
+    Batched haversine: the distance in km of every segment of a track.
+
+    Takes equal-length sequences of latitudes and longitudes (decimal
+    degrees, NaN or None for a missing coordinate) and returns an array of
+    len - 1 segment distances, item i covering points i -> i + 1. Segments
+    touching a missing coordinate are 0.0, which is how the per-point loops
+    in metric_extractor treated gaps before they switched to this kernel.
+
+    Values are not bit-identical to `haversine_distance`: NumPy's
+    vectorised trigonometry rounds differently from the math module. They
+    agree to a relative 1e-8 (the largest differences are on the
+    few-metre segments of recorded tracks; tests/test_utils.py checks the
+    bound on reference routes and on random global pairs).
     """
-    if not original_elevations or window_size < 2 or len(original_elevations) < window_size:
-        return list(original_elevations) 
+    lat_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lons, dtype=np.float64))
+    if len(lat_rad) < 2:
+        return np.zeros(0)
 
-    smoothed_elevations = list(original_elevations)
+    dlat = np.diff(lat_rad)
+    dlon = np.diff(lon_rad)
+    a = np.sin(dlat / 2)**2 + np.cos(lat_rad[:-1]) * np.cos(lat_rad[1:]) * np.sin(dlon / 2)**2
+    distances = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.nan_to_num(distances, nan=0.0)
+
+_MEDIAN_BLOCK_VALUES = 1 << 20
+_RUNNING_MEDIAN_MIN_WINDOW = 32
+_SUMMED_WINDOW_MAX = 31
+
+def _window_sums(values: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Window sums. Windows up to _SUMMED_WINDOW_MAX points are summed left to
+    right across shifted views, which gives exactly what sum() over each
+    window did (so identical windows, e.g. on a flat stretch, still average
+    to identical values and don't read as tiny climbs or descents). Wider
+    windows use a running (prefix) sum, which is O(n) whatever the size but
+    only accurate to rounding.
+    """
+    count = len(values) - window_size + 1
+    if window_size <= _SUMMED_WINDOW_MAX:
+        totals = values[:count].copy()
+        for k in range(1, window_size):
+            totals += values[k:k + count]
+        return totals
+    # Offsetting by the first value keeps the running sum small, so the
+    # difference of two prefix sums loses little precision on long tracks.
+    offset = values[0]
+    prefix = np.concatenate(([0.0], np.cumsum(values - offset)))
+    return (prefix[window_size:] - prefix[:-window_size]) + offset * window_size
+
+def _moving_average(values: np.ndarray, window_size: int) -> np.ndarray:
+    """Window means; see `_window_sums` for exactness."""
+    return _window_sums(values, window_size) / window_size
+
+def _moving_median(values: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Window medians. Narrow windows are taken over strided views a block of
+    rows at a time (to bound memory), which costs O(n * window) but runs in
+    NumPy. From _RUNNING_MEDIAN_MIN_WINDOW points on, a sorted copy of the
+    window is kept and updated by one bisect removal and one insertion per
+    step, so the cost grows with log(window) plus a memmove of the window
+    rather than with a full selection per point.
+    """
+    if window_size >= _RUNNING_MEDIAN_MIN_WINDOW:
+        return _running_median(values, window_size)
+    windows = np.lib.stride_tricks.sliding_window_view(values, window_size)
+    rows_per_block = max(1, _MEDIAN_BLOCK_VALUES // window_size)
+    return np.concatenate([np.median(windows[start:start + rows_per_block], axis=1)
+                           for start in range(0, len(windows), rows_per_block)])
+
+def _running_median(values: np.ndarray, window_size: int) -> np.ndarray:
+    """Medians of odd-sized windows from a sorted sliding window."""
+    values = values.tolist()
+    window = sorted(values[:window_size])
     half_window = window_size // 2
+    medians = [window[half_window]]
+    for leaving, entering in zip(values, values[window_size:]):
+        del window[bisect.bisect_left(window, leaving)]
+        bisect.insort(window, entering)
+        medians.append(window[half_window])
+    return np.array(medians)
 
-    for i in range(half_window, len(original_elevations) - half_window):
-        window_values = original_elevations[i - half_window : i + half_window + 1]
-        
-        valid_window_values = [v for v in window_values if isinstance(v, (int, float))]
-        
-        if len(valid_window_values) == window_size: 
-            smoothed_elevations[i] = sum(valid_window_values) / len(valid_window_values)
-            
-    return smoothed_elevations
\ No newline at end of file
+def savitzky_golay_coefficients(window_size: int, polyorder: int) -> np.ndarray:
+    """
+    Convolution weights that evaluate, at the centre of the window, the
+    least-squares polynomial of degree `polyorder` through the window.
+    """
+    half_window = window_size // 2
+    offsets = np.arange(-half_window, half_window + 1, dtype=np.float64)
+    vandermonde = np.vander(offsets, polyorder + 1, increasing=True)
+    return np.linalg.pinv(vandermonde)[0]
+
+def _savitzky_golay(values: np.ndarray, window_size: int, polyorder: int = 2) -> np.ndarray:
+    """Window Savitzky-Golay fits as one convolution."""
+    if polyorder >= window_size:
+        raise ValueError(f"Savitzky-Golay polyorder ({polyorder}) must be less than the window size ({window_size})")
+    coefficients = savitzky_golay_coefficients(window_size, polyorder)
+    return np.convolve(values, coefficients[::-1], mode='valid')
+
+# Each smoother takes the gap-filled values and an odd window size and returns
+# one value per full-length window (len - window_size + 1 of them).
+SMOOTHERS = {
+    'moving_average': _moving_average,
+    'median': _moving_median,
+    'savitzky_golay': _savitzky_golay,
+}
+
+def _smoothed_windows(values: np.ndarray, window_size: int, method: str, options: dict):
+    """
+    Runs the smoother over `values` (float64, NaN where missing). Returns the
+    smoothed value for each interior point and a mask of the points whose
+    whole window has elevations, or (None, None) if the track is too short.
+
+    An even window size is only accepted for the moving average, and
+    reproduces the original per-window loop: it looked at the
+    window_size + 1 points centred on each point and averaged them only
+    when exactly window_size had elevations. So a gap-free profile is left
+    unsmoothed, and only points with one gap in that span are averaged.
+    """
+    if method not in SMOOTHERS:
+        raise ValueError(f"Unknown smoothing method '{method}'; expected one of {sorted(SMOOTHERS)}")
+    centred_size = window_size | 1
+    if window_size < 2 or len(values) < centred_size:
+        return None, None
+    if window_size < 3 and method != 'moving_average':
+        return None, None
+    missing = np.isnan(values)
+    missing_before = np.concatenate(([0], np.cumsum(missing)))
+    missing_in_window = missing_before[centred_size:] - missing_before[:-centred_size]
+    filled = np.where(missing, 0.0, values)
+    if window_size % 2:
+        return SMOOTHERS[method](filled, window_size, **options), missing_in_window == 0
+    if method != 'moving_average':
+        raise ValueError(f"The {method} smoother needs an odd window size, got {window_size}")
+    return _window_sums(filled, centred_size) / window_size, missing_in_window == 1
+
+def smooth_elevations(elevations, window_size: int, method: str = 'moving_average', **options) -> np.ndarray:
+    """
+    Array version of `get_smoothed_elevations`: returns a float64 copy of
+    `elevations` (NaN or None where missing) with the smoother applied.
+
+    Only interior points whose whole window has elevations are replaced;
+    the first and last `window_size // 2` points, and any point within half
+    a window of a gap, keep their original value. `method` is one of
+    SMOOTHERS and `options` are passed through to it (e.g. `polyorder`).
+    Windows are centred; for what an even `window_size` does, see
+    `_smoothed_windows`.
+    """
+    values = np.array(elevations, dtype=np.float64)
+    smoothed, full = _smoothed_windows(values, window_size, method, options)
+    if smoothed is not None:
+        half_window = (window_size | 1) // 2
+        values[half_window:len(values) - half_window][full] = smoothed[full]
+    return values
+
+def get_smoothed_elevations(original_elevations: list, window_size: int,
+                            method: str = 'moving_average', **options) -> list:
+    """
+    Applies a smoother (a simple moving average by default) to a list of
+    elevation values. `window_size` should be an odd integer; an even one
+    behaves as the original per-window loop did (see `_smoothed_windows`).
+    Values that aren't numbers count as missing; see `smooth_elevations`.
+    """
+    if not original_elevations or window_size < 2 or len(original_elevations) < window_size:
+        return list(original_elevations)
+
+    values = np.array([v if isinstance(v, (int, float)) else np.nan for v in original_elevations], dtype=np.float64)
+    smoothed, full = _smoothed_windows(values, window_size, method, options)
+    smoothed_elevations = list(original_elevations)
+    if smoothed is not None:
+        half_window = (window_size | 1) // 2
+        smoothed = smoothed.tolist()
+        for i in np.flatnonzero(full).tolist():
+            smoothed_elevations[i + half_window] = smoothed[i]
+    return smoothed_elevations
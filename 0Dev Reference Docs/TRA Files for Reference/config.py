@@ -2,6 +2,8 @@
 
 # --- Configuration: Metric Extraction ---
 SMOOTHING_WINDOW_SIZE = 7 
+SMOOTHING_METHOD = 'moving_average' # One of common.utils.SMOOTHERS: 'moving_average', 'median', 'savitzky_golay'
+SMOOTHING_OPTIONS = {} # Passed to the smoother, e.g. {'polyorder': 2} for 'savitzky_golay'
 MCG_SEGMENT_TARGET_DISTANCE_M = 100.0 
 MIN_DIST_FOR_MCG_GRADIENT_CALC_M = 50.0 
 SIG_CLIMB_FACTOR_THRESHOLD = 3500.0 
@@ -12,6 +14,12 @@ SIG_DESCENT_MIN_DISTANCE_M = 500.0
 SIG_DESCENT_MIN_GRADIENT_PERCENT = -3.0 
 POTENTIAL_DESCENT_START_GRADIENT_THRESHOLD = -1.0 
 
+# --- Configuration: Metrics Cache ---
+# Extracted metrics are cached on disk by file content (see metrics_cache.py)
+METRICS_CACHE_FOLDER = 'metrics_cache'
+METRICS_CACHE_MAX_AGE_DAYS = 30 # Entries unused for longer than this are evicted
+METRICS_CACHE_MAX_MB = 256 # Least recently used entries are evicted beyond this
+
 # --- Configuration: Difficulty Calculation ---
 # Distance Difficulty
 DISTANCE_BASE_ADDITION = 5.0
@@ -1,6 +1,7 @@
 # difficulty_calculator.py - Calculates route difficulty based on extracted metrics
 
 from math import pow 
+import numpy as np
 
 # Import all configuration constants from config.py
 # This makes them available as, e.g., config.DISTANCE_BASE_ADDITION
@@ -115,6 +116,56 @@ def calculate_total_difficulty(
     
     return final_difficulty
 
+# --- Batch Difficulty Calculation ---
+
+def _normalised(values: np.ndarray, ceiling: float) -> np.ndarray:
+    """Vector form of min(max(0, value) / ceiling, 1.0) as used by calculate_uphill_factor."""
+    return np.minimum(np.maximum(0, values) / (ceiling if ceiling > 0 else 1.0), 1.0)
+
+def calculate_total_difficulties(distance_km, tega, acg, mcg_val, pdd, adg) -> np.ndarray:
+    """
+    Array form of calculate_total_difficulty: each argument is an array (or
+    sequence) of one metric across many routes, and the result is the array
+    of their scores. Applies the same formulas in the same order, reading
+    each config constant once, so re-scoring a whole collection after
+    retuning config.py is a handful of array operations.
+    """
+    distance_km, tega, acg, mcg_val, pdd, adg = (
+        np.asarray(values, dtype=np.float64) for values in (distance_km, tega, acg, mcg_val, pdd, adg))
+
+    # Distance difficulty
+    dist_difficulty = config.DISTANCE_BASE_ADDITION + config.DISTANCE_DIFFICULTY_COEFFICIENT_A * (distance_km**2)
+
+    # Uphill factor
+    uphill_score = (config.WEIGHT_TEGA * _normalised(tega, config.MAX_EXPECTED_TEGA)) + \
+                   (config.WEIGHT_ACG * _normalised(acg, config.MAX_EXPECTED_ACG)) + \
+                   (config.WEIGHT_MCG * _normalised(mcg_val, config.MAX_EXPECTED_MCG))
+    uphill_factor = 1 + (config.LINEAR_UF_SLOPE * np.clip(uphill_score, 0.0, 1.0))
+
+    # Downhill reduction factor, 1.0 where the qualifying conditions aren't met
+    abs_adg = np.abs(adg)
+    qualifies = (pdd > config.PDD_THRESHOLD) & \
+                (tega < config.MAX_ASCENT_FOR_DOWNHILL_REDUCTION) & \
+                (abs_adg > config.MIN_AVG_DESCENT_GRADIENT_THRESHOLD)
+    pdd_norm_denominator = 1.0 - config.PDD_THRESHOLD
+    if pdd_norm_denominator > 0:
+        pdd_score_norm = (pdd - config.PDD_THRESHOLD) / pdd_norm_denominator
+    else:
+        pdd_score_norm = np.where(pdd >= config.PDD_THRESHOLD, 1.0, 0.0)
+    adg_norm_denominator = config.TARGET_ADG_FOR_MAX_REDUCTION - config.MIN_AVG_DESCENT_GRADIENT_THRESHOLD
+    if adg_norm_denominator > 0:
+        adg_score_norm = (abs_adg - config.MIN_AVG_DESCENT_GRADIENT_THRESHOLD) / adg_norm_denominator
+    else:
+        adg_score_norm = np.where(abs_adg >= config.TARGET_ADG_FOR_MAX_REDUCTION, 1.0, 0.0)
+    downhill_score = (config.WEIGHT_PDD_SCORE * np.clip(pdd_score_norm, 0.0, 1.0)) + \
+                     (config.WEIGHT_ADG_SCORE * np.clip(adg_score_norm, 0.0, 1.0))
+    downhill_reduction_factor = np.where(
+        qualifies, np.power(config.MAX_DOWNHILL_REDUCTION_FACTOR, np.clip(downhill_score, 0.0, 1.0)), 1.0)
+
+    raw_total_difficulty = dist_difficulty * (uphill_factor * downhill_reduction_factor)
+    return np.where(distance_km <= 0, config.MIN_DIFFICULTY_SCORE,
+                    np.maximum(config.MIN_DIFFICULTY_SCORE, raw_total_difficulty))
+
 if __name__ == '__main__':
     # Example Usage (optional - for testing difficulty_calculator.py directly)
     # This requires 'config.py' to be in the same directory or accessible in PYTHONPATH
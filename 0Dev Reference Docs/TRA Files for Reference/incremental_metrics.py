@@ -0,0 +1,380 @@
+# incremental_metrics.py - Route metrics that update in place as points are edited
+
+import operator
+import numpy as np
+
+import config
+from common.track import Track
+from common.utils import haversine_distances
+from metric_extractor import (TRACK_EXTRACTORS, _mcg_window_gradient, _mcg_window_lookup, _run_mask,
+                              _significant_runs, _smoothed_elevation_array)
+
+# Below this many points (or elevations) a splice simply rebuilds everything
+_MIN_INCREMENTAL_POINTS = 64
+# Extra distance allowed when looking back for MCg windows that reach an edit
+_MCG_REACH_SLACK_M = 1.0
+# Segments scanned at a time when widening an edit to whole climbs/descents
+_RUN_SCAN_CHUNK = 256
+# Points scanned at a time when counting elevations either side of an edit
+_VALID_SCAN_CHUNK = 64
+# Free slots a gap buffer keeps beyond an eighth of its length when it grows
+_MIN_GAP = 64
+
+
+class _GapBuffer:
+    """
+    A float64 array stored with a gap of free slots at the last edit.
+
+    `replace()` writes a same-length replacement in place. Otherwise it
+    moves the gap to the edit, which copies only the points between the
+    previous edit and this one, and fills it from there, growing the
+    buffer by an eighth when the gap runs out. Slices that don't cross the
+    gap are views, valid until the next edit; `np.asarray()` gives a copy
+    of the whole array.
+    """
+
+    def __init__(self, values=()):
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        self._buffer = np.empty(len(values) + _MIN_GAP)
+        self._buffer[:len(values)] = values
+        self._gap_start, self._gap_end = len(values), len(self._buffer)
+
+    def __len__(self):
+        return len(self._buffer) - (self._gap_end - self._gap_start)
+
+    def __array__(self, dtype=None, copy=None):
+        values = np.concatenate((self._buffer[:self._gap_start], self._buffer[self._gap_end:]))
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        gap = self._gap_end - self._gap_start
+        if isinstance(key, slice):
+            lo, hi, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Gap buffer slices must be contiguous")
+            hi = max(lo, hi)
+            if hi <= self._gap_start:
+                return self._buffer[lo:hi]
+            if lo >= self._gap_start:
+                return self._buffer[lo + gap:hi + gap]
+            return np.concatenate((self._buffer[lo:self._gap_start], self._buffer[self._gap_end:hi + gap]))
+        index = operator.index(key)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {key} is outside an array of {len(self)}")
+        return self._buffer[index if index < self._gap_start else index + gap]
+
+    def replace(self, lo: int, hi: int, values):
+        """Replaces items lo..hi-1 with `values` (any number, including none)."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        count = len(values)
+        if count == hi - lo:
+            gap = self._gap_end - self._gap_start
+            split = min(max(self._gap_start, lo), hi)
+            self._buffer[lo:split] = values[:split - lo]
+            self._buffer[split + gap:hi + gap] = values[split - lo:]
+            return
+        self._move_gap(hi)
+        self._gap_start = lo
+        if self._gap_end - self._gap_start < count:
+            self._grow(count)
+        self._buffer[lo:lo + count] = values
+        self._gap_start = lo + count
+
+    def _move_gap(self, index: int):
+        """Moves the gap to just before item `index`."""
+        if index < self._gap_start:
+            moved = self._gap_start - index
+            self._buffer[self._gap_end - moved:self._gap_end] = self._buffer[index:self._gap_start]
+            self._gap_start, self._gap_end = index, self._gap_end - moved
+        elif index > self._gap_start:
+            moved = index - self._gap_start
+            self._buffer[self._gap_start:index] = self._buffer[self._gap_end:self._gap_end + moved]
+            self._gap_start, self._gap_end = index, self._gap_end + moved
+
+    def _grow(self, count: int):
+        """Reallocates with room for `count` items in the gap and an eighth of the array spare."""
+        tail = len(self._buffer) - self._gap_end
+        buffer = np.empty(self._gap_start + tail + count + len(self) // 8 + _MIN_GAP)
+        buffer[:self._gap_start] = self._buffer[:self._gap_start]
+        buffer[len(buffer) - tail:] = self._buffer[self._gap_end:]
+        self._buffer, self._gap_end = buffer, len(buffer) - tail
+
+
+def _step_valid(elevations: _GapBuffer, index: int, direction: int, count: int) -> int:
+    """
+    Walks from `index` over `count` points that have an elevation. Going
+    back (direction -1) returns the index of the count-th one before
+    `index`; going forward returns the index just past the count-th one at
+    or after `index`. Stops at the ends of the track.
+    """
+    position = index
+    if direction < 0:
+        while count > 0 and position > 0:
+            chunk_lo = max(0, position - _VALID_SCAN_CHUNK)
+            seen = np.cumsum(~np.isnan(elevations[chunk_lo:position][::-1]))
+            reached = np.flatnonzero(seen >= count)
+            if len(reached):
+                return position - 1 - int(reached[0])
+            count -= int(seen[-1])
+            position = chunk_lo
+        return position
+    while count > 0 and position < len(elevations):
+        chunk_hi = min(len(elevations), position + _VALID_SCAN_CHUNK)
+        seen = np.cumsum(~np.isnan(elevations[position:chunk_hi]))
+        reached = np.flatnonzero(seen >= count)
+        if len(reached):
+            return position + int(reached[0]) + 1
+        count -= int(seen[-1])
+        position = chunk_hi
+    return position
+
+
+class IncrementalRouteMetrics:
+    """
+    Distance, TEGa, PDD, MCg, ACg and ADg for a route that is being edited.
+
+    Instead of totals alone, it keeps per-segment partial aggregates: each
+    segment's length, its share of TEGa and of downhill distance, the MCg
+    window gradient starting there, and the average gradient of any
+    significant climb or descent starting there. `splice()` replaces a
+    range of points and recomputes only what the edit can reach: the
+    edited points, the points within half a smoothing window of them, the
+    MCg windows that reach into them and the climbs/descents that overlap
+    them. The totals are then adjusted by the difference.
+
+    Results match get_route_metrics on the same points to within
+    floating-point rounding. Adjusting totals by differences lets that
+    rounding build up over very many edits, and `rebuild()` resets it.
+    Points use the raw (unsmoothed) elevations, NaN or None where missing.
+
+    Points and partial aggregates are kept in gap buffers, so moving points
+    is written in place and inserting or deleting near the previous edit
+    copies little; `lat`, `lon`, `raw_ele` and `ele` convert to arrays with
+    `np.asarray()`.
+    """
+
+    def __init__(self, latitudes, longitudes, elevations, apply_smoothing: bool = True):
+        self.apply_smoothing = apply_smoothing
+        self.lat = _GapBuffer(np.array(latitudes, dtype=np.float64))
+        self.lon = _GapBuffer(np.array(longitudes, dtype=np.float64))
+        self.raw_ele = _GapBuffer(np.array(elevations, dtype=np.float64))
+        if not len(self.lat) == len(self.lon) == len(self.raw_ele):
+            raise ValueError("latitudes, longitudes and elevations must be the same length")
+        self.rebuild()
+
+    @classmethod
+    def from_file(cls, file_path: str, file_extension: str, apply_smoothing: bool = True):
+        """Reads a route file with the metric extractor's reader for its format."""
+        _, track = TRACK_EXTRACTORS[file_extension](file_path)
+        return cls(track.lat, track.lon, track.ele, apply_smoothing)
+
+    def __len__(self):
+        return len(self.lat)
+
+    # --- Editing ---
+
+    def splice(self, start: int, stop: int, latitudes, longitudes, elevations):
+        """Replaces points start..stop-1 with the given points (any number, including none)."""
+        n_old = len(self.lat)
+        if not 0 <= start <= stop <= n_old:
+            raise IndexError(f"Splice range {start}:{stop} is outside a route of {n_old} points")
+        new_lat = np.array(latitudes, dtype=np.float64).reshape(-1)
+        new_lon = np.array(longitudes, dtype=np.float64).reshape(-1)
+        new_ele = np.array(elevations, dtype=np.float64).reshape(-1)
+        if not len(new_lat) == len(new_lon) == len(new_ele):
+            raise ValueError("latitudes, longitudes and elevations must be the same length")
+
+        inserted = len(new_lat)
+        self._valid_count += np.count_nonzero(~np.isnan(new_ele)) - np.count_nonzero(~np.isnan(self.raw_ele[start:stop]))
+        self.lat.replace(start, stop, new_lat)
+        self.lon.replace(start, stop, new_lon)
+        self.raw_ele.replace(start, stop, new_ele)
+        n = len(self.lat)
+        window_size = config.SMOOTHING_WINDOW_SIZE | 1
+        if min(n, n_old) < _MIN_INCREMENTAL_POINTS or self._valid_count < 2 * window_size:
+            self.rebuild()
+            return
+        # Past the edit, old index = new index + shift
+        shift = (stop - start) - inserted
+
+        # Smoothed elevations: the edited points, plus the points within half a
+        # window of them, re-smoothed from a slice with a full window of context
+        lo_pt, hi_pt = start, start + inserted
+        self.ele.replace(start, stop, new_ele)
+        if self.apply_smoothing:
+            half_window = window_size // 2
+            lo_pt = _step_valid(self.raw_ele, start, -1, half_window)
+            hi_pt = _step_valid(self.raw_ele, start + inserted, 1, half_window)
+            context_lo = _step_valid(self.raw_ele, start, -1, window_size)
+            context_hi = _step_valid(self.raw_ele, start + inserted, 1, window_size)
+            smoothed = _smoothed_elevation_array(self.raw_ele[context_lo:context_hi], True)
+            self.ele.replace(lo_pt, hi_pt, smoothed[lo_pt - context_lo:hi_pt - context_lo])
+
+        # Segments touching any point that changed
+        seg_lo, seg_hi = max(lo_pt - 1, 0), min(hi_pt, n - 1)
+        self._update_segments(seg_lo, seg_hi, seg_hi + shift)
+
+        # MCg windows that reach the changed segments
+        mcg_lo = self._mcg_reach(seg_lo)
+        old_gradients = self._mcg[mcg_lo:seg_hi + shift]
+        old_max = float(old_gradients.max()) if len(old_gradients) else 0.0
+        new_gradients = self._mcg_gradients(mcg_lo, seg_hi)
+        self._mcg.replace(mcg_lo, seg_hi + shift, new_gradients)
+        new_max = float(new_gradients.max()) if len(new_gradients) else 0.0
+        if new_max >= self._mcg_max:
+            self._mcg_max = new_max
+        elif len(old_gradients) and old_max >= self._mcg_max:
+            # The steepest window may have been edited away
+            self._mcg_max = float(np.max(self._mcg)) if len(self._mcg) else 0.0
+
+        # Climbs and descents overlapping the changed segments, widened to whole runs
+        for is_climb in (True, False):
+            run_lo, run_hi = self._widen_to_runs(seg_lo, seg_hi, is_climb)
+            self._update_runs(run_lo, run_hi, run_hi + shift, is_climb)
+
+    def insert(self, index: int, latitudes, longitudes, elevations):
+        """Inserts points before `index`."""
+        self.splice(index, index, latitudes, longitudes, elevations)
+
+    def delete(self, start: int, stop: int):
+        """Removes points start..stop-1."""
+        self.splice(start, stop, [], [], [])
+
+    # --- Results ---
+
+    def metrics(self) -> dict:
+        """The current metrics, under the same keys as get_route_metrics."""
+        distance_km = self._distance_km
+        return {
+            "distance_km": distance_km,
+            "TEGa": self._tega, "TEGa_smoothed": self._tega, "TEGa_raw": self._tega_raw,
+            "PDD": self._downhill_km / distance_km if distance_km > 0 else 0.0,
+            "MCg": self._mcg_max,
+            "ACg": self._climb_sum / self._climb_count if self._climb_count else 0.0,
+            "ADg": self._descent_sum / self._descent_count if self._descent_count else 0.0,
+            "raw_points_count": len(self.lat),
+        }
+
+    def track(self) -> Track:
+        """The route as a Track of smoothed elevations and cumulative distances."""
+        cumulative_km = np.concatenate(([0.0], np.cumsum(np.asarray(self._seg_km)))) if len(self.lat) else np.zeros(0)
+        return Track(np.asarray(self.lat), np.asarray(self.lon), np.asarray(self.ele), cumulative_km)
+
+    def rebuild(self):
+        """Recomputes every partial aggregate and total from the points."""
+        n = len(self.lat)
+        raw_elevations = np.asarray(self.raw_ele)
+        self._valid_count = int(np.count_nonzero(~np.isnan(raw_elevations)))
+        self.ele = _GapBuffer(_smoothed_elevation_array(raw_elevations, self.apply_smoothing))
+        for column in ('_seg_km', '_rises', '_tega_parts', '_tega_raw_parts', '_downhill_parts'):
+            setattr(self, column, _GapBuffer())
+        self._distance_km = self._tega = self._tega_raw = self._downhill_km = 0.0
+        self._update_segments(0, max(n - 1, 0), 0)
+
+        mcg = self._mcg_gradients(0, n - 1) if n >= 2 else np.zeros(0)
+        self._mcg = _GapBuffer(mcg)
+        self._mcg_max = float(mcg.max()) if len(mcg) else 0.0
+
+        self._climbs = _GapBuffer(np.full(max(n - 1, 0), np.nan))
+        self._descents = _GapBuffer(np.full(max(n - 1, 0), np.nan))
+        self._climb_sum = self._descent_sum = 0.0
+        self._climb_count = self._descent_count = 0
+        for is_climb in (True, False):
+            self._update_runs(0, max(n - 1, 0), max(n - 1, 0), is_climb)
+
+    # --- Partial aggregates ---
+
+    def _update_segments(self, seg_lo: int, seg_hi: int, old_seg_hi: int):
+        """Recomputes segments seg_lo..seg_hi-1, which replace old segments seg_lo..old_seg_hi-1."""
+        points = slice(seg_lo, seg_hi + 1)
+        seg_km = haversine_distances(self.lat[points], self.lon[points])
+        rises = np.diff(self.ele[points])
+        raw_rises = np.diff(self.raw_ele[points])
+        parts = {
+            '_seg_km': ('_distance_km', seg_km),
+            '_rises': (None, rises),
+            '_tega_parts': ('_tega', np.where(rises > 0, rises, 0.0)),
+            '_tega_raw_parts': ('_tega_raw', np.where(raw_rises > 0, raw_rises, 0.0)),
+            '_downhill_parts': ('_downhill_km', np.where(rises < 0, seg_km, 0.0)),
+        }
+        for column, (total, values) in parts.items():
+            old = getattr(self, column)
+            if total is not None:
+                setattr(self, total, getattr(self, total) - float(old[seg_lo:old_seg_hi].sum()) + float(values.sum()))
+            old.replace(seg_lo, old_seg_hi, values)
+
+    def _mcg_reach(self, seg_lo: int) -> int:
+        """The first start point whose MCg window walk can reach segment seg_lo."""
+        target_m = config.MCG_SEGMENT_TARGET_DISTANCE_M + _MCG_REACH_SLACK_M
+        start, reach_m = seg_lo, 0.0
+        while start > 0:
+            reach_m += self._seg_km[start - 1] * 1000
+            if reach_m > target_m:
+                break
+            start -= 1
+        return start
+
+    def _mcg_gradients(self, start_lo: int, start_hi: int) -> np.ndarray:
+        """MCg window gradients for start points start_lo..start_hi-1 (0.0 where there's no climb)."""
+        if start_hi <= start_lo:
+            return np.zeros(0)
+        # Take enough points past the last start for its window walk to finish
+        end, reach_m = start_hi, 0.0
+        while end < len(self._seg_km) and reach_m <= config.MCG_SEGMENT_TARGET_DISTANCE_M:
+            reach_m += self._seg_km[end] * 1000
+            end += 1
+        elevations = self.ele[start_lo:end + 1]
+        segment_distances_m = self._seg_km[start_lo:end] * 1000
+        gradients, ties = _mcg_window_lookup(elevations, segment_distances_m)
+        gradients = gradients[:start_hi - start_lo]
+        tie_starts = np.flatnonzero(ties[:start_hi - start_lo])
+        if len(tie_starts):
+            elevation_list, segment_list = elevations.tolist(), segment_distances_m.tolist()
+            for i in tie_starts.tolist():
+                gradients[i] = _mcg_window_gradient(elevation_list, segment_list, i) or 0.0
+        return gradients
+
+    def _widen_to_runs(self, seg_lo: int, seg_hi: int, is_climb: bool):
+        """Widens segments seg_lo..seg_hi-1 so no climb (or descent) run crosses either end."""
+        n_segments = len(self._seg_km)
+        while seg_lo > 0:
+            chunk_lo = max(0, seg_lo - _RUN_SCAN_CHUNK)
+            in_run, _ = _run_mask(self._rises[chunk_lo:seg_lo], self._seg_km[chunk_lo:seg_lo] * 1000, is_climb)
+            outside = np.flatnonzero(~in_run)
+            if len(outside):
+                seg_lo = chunk_lo + int(outside[-1]) + 1
+                break
+            seg_lo = chunk_lo
+        while seg_hi < n_segments:
+            chunk_hi = min(n_segments, seg_hi + _RUN_SCAN_CHUNK)
+            in_run, _ = _run_mask(self._rises[seg_hi:chunk_hi], self._seg_km[seg_hi:chunk_hi] * 1000, is_climb)
+            outside = np.flatnonzero(~in_run)
+            if len(outside):
+                seg_hi = seg_hi + int(outside[0])
+                break
+            seg_hi = chunk_hi
+        return seg_lo, seg_hi
+
+    def _update_runs(self, seg_lo: int, seg_hi: int, old_seg_hi: int, is_climb: bool):
+        """
+        Re-finds the significant climbs (or descents) in segments
+        seg_lo..seg_hi-1, which replace old segments seg_lo..old_seg_hi-1.
+        Neither range may split a run.
+        """
+        column = '_climbs' if is_climb else '_descents'
+        runs = np.full(seg_hi - seg_lo, np.nan)
+        if seg_hi > seg_lo:
+            run_starts, gradients = _significant_runs(self.ele[seg_lo:seg_hi + 1], self._rises[seg_lo:seg_hi],
+                                                      self._seg_km[seg_lo:seg_hi] * 1000, is_climb)
+            runs[run_starts] = gradients
+        old = getattr(self, column)[seg_lo:old_seg_hi]
+        old_runs, new_runs = old[~np.isnan(old)], runs[~np.isnan(runs)]
+        total = float(new_runs.sum()) - float(old_runs.sum())
+        count = len(new_runs) - len(old_runs)
+        if is_climb:
+            self._climb_sum, self._climb_count = self._climb_sum + total, self._climb_count + count
+        else:
+            self._descent_sum, self._descent_count = self._descent_sum + total, self._descent_count + count
+        getattr(self, column).replace(seg_lo, old_seg_hi, runs)
@@ -2,19 +2,26 @@
 
 import gpxpy
 import gpxpy.gpx
-from tcxparser import TCXParser 
-from lxml import objectify # For fallback TCX parsing
-import copy 
+from lxml import etree
 import traceback 
-from datetime import datetime 
+from array import array
 import os 
+import numpy as np
 
 # Assuming config.py and utils.py are in the same directory or accessible in PYTHONPATH
 import config 
-from common.utils import haversine_distance, get_smoothed_elevations
+from common.utils import haversine_distances, smooth_elevations
+from common.track import Track
+from common.fit import FitDecodeError, decode_fit_track
+
+# Bump whenever a change here alters the metrics or track extracted from a file,
+# so cached results (metrics_cache.py) from the previous version are not reused
+METRICS_VERSION = 1
 
 class TrackPoint:
     """Represents a single point in a track with latitude, longitude, elevation, and time."""
+    __slots__ = ("latitude", "longitude", "elevation", "time")
+
     def __init__(self, latitude, longitude, elevation=None, time=None):
         self.latitude = latitude
         self.longitude = longitude
@@ -50,365 +57,380 @@ def _extract_trackpoints_from_gpx(gpx_file_path: str) -> tuple[str, list[TrackPo
         return "N/A (GPX Parse Error)", []
     return route_name_from_gpx, all_points_list
 
-def _parse_tcx_course_manually(tcx_file_path: str) -> tuple[str, list[TrackPoint]]:
-    all_points_list = []
-    route_name_from_tcx = "N/A (TCX Course - Manual)"
-    try:
-        with open(tcx_file_path, 'rb') as f: 
-            tree = objectify.parse(f)
-        root = tree.getroot()
-        if hasattr(root, 'Courses') and hasattr(root.Courses, 'Course'):
-            course_elements = root.Courses.Course
-            if not hasattr(course_elements, '__iter__') or isinstance(course_elements, str):
-                course_elements = [course_elements] if hasattr(course_elements, 'Name') else []
-            if course_elements:
-                course = course_elements[0] 
-                if hasattr(course, 'Name') and course.Name is not None:
-                    route_name_from_tcx = str(course.Name.text if hasattr(course.Name, 'text') else course.Name)
-                if hasattr(course, 'Track') and hasattr(course.Track, 'Trackpoint'):
-                    trackpoints_nodes = course.Track.Trackpoint
-                    if not hasattr(trackpoints_nodes, '__iter__') or isinstance(trackpoints_nodes, str):
-                        trackpoints_nodes = [trackpoints_nodes] if hasattr(trackpoints_nodes, 'Position') else []
-                    for tp_node in trackpoints_nodes:
-                        lat, lon, ele, time_obj = None, None, None, None
-                        if hasattr(tp_node, 'Position'):
-                            if hasattr(tp_node.Position, 'LatitudeDegrees'): lat = float(tp_node.Position.LatitudeDegrees.text)
-                            if hasattr(tp_node.Position, 'LongitudeDegrees'): lon = float(tp_node.Position.LongitudeDegrees.text)
-                        if hasattr(tp_node, 'AltitudeMeters') and tp_node.AltitudeMeters is not None:
-                            ele_text = tp_node.AltitudeMeters.text
-                            if ele_text is not None: ele = float(ele_text)
-                        if hasattr(tp_node, 'Time') and tp_node.Time is not None:
-                            time_str = tp_node.Time.text
-                            if time_str:
-                                try: time_obj = datetime.fromisoformat(str(time_str).replace('Z', '+00:00'))
-                                except ValueError: print(f"Warning: Could not parse time '{time_str}' in TCX course (manual parse).")
-                        if lat is not None and lon is not None:
-                            all_points_list.append(TrackPoint(lat, lon, ele, time_obj))
-        if all_points_list: print(f"Info: Successfully parsed TCX as Course (manual lxml): {tcx_file_path}")
-        else:
-            print(f"Warning: No trackpoints found in TCX (manual lxml Course parse) for: {tcx_file_path}")
-            if route_name_from_tcx == "N/A (TCX Course - Manual)": route_name_from_tcx = "N/A (TCX Manual Parse Failed)"
-    except Exception as e_lxml:
-        print(f"Error during manual lxml TCX Course parsing for {tcx_file_path}: {e_lxml}")
-        traceback.print_exc()
-        return "N/A (TCX Manual Parse Error)", []
-    return route_name_from_tcx, all_points_list
+# TCX elements are matched in any namespace, so every TrainingCenterDatabase version parses
+_TCX_ACTIVITY_TAG = 'Activity'
+_TCX_COURSE_TAG = 'Course'
+_TCX_NAME_TAG = 'Name'
+_TCX_TRACK_POINT_TAG = 'Trackpoint'
+_TCX_ITERPARSE_TAGS = tuple(f'{{*}}{tag}' for tag in (_TCX_ACTIVITY_TAG, _TCX_COURSE_TAG, _TCX_NAME_TAG, _TCX_TRACK_POINT_TAG))
 
-def _extract_trackpoints_from_tcx(tcx_file_path: str) -> tuple[str, list[TrackPoint]]:
-    all_points_list = []
+def _local_name(tag: str) -> str:
+    """Strips the '{namespace}' prefix from an element tag."""
+    return tag.rsplit('}', 1)[-1]
+
+def _extract_track_from_tcx(tcx_file_path: str) -> tuple[str, Track]:
+    """
+    Reads a TCX file in one streaming pass, Activities and Courses alike,
+    appending each <Trackpoint> straight into the track's coordinate
+    columns and freeing it as soon as it has been read. Only the elements
+    named above reach Python; everything else stays inside lxml.
+
+    Points come from every Activity, or from the first Course (the one a
+    course file describes). Trackpoints without a <Position> are skipped,
+    and a point without <AltitudeMeters> gets a NaN elevation. The
+    returned Track's distances are left at zero for the caller to fill.
+    """
+    latitudes, longitudes, elevations = array('d'), array('d'), array('d')
     route_name_from_tcx = "N/A (TCX Data)"
-    parser = None
+    container, course_name = None, None
     try:
-        parser = TCXParser(tcx_file_path)
-    except AttributeError as e_attr_init:
-        if "Activities" in str(e_attr_init).lower() or "'NoneType' object has no attribute 'Activities'" in str(e_attr_init):
-            print(f"Info: TCXParser init failed for {tcx_file_path} (likely missing <Activities>). Attempting manual lxml parse for Course structure.")
-            return _parse_tcx_course_manually(tcx_file_path)
-        else:
-            print(f"Error initializing TCXParser for {tcx_file_path}: {e_attr_init}.")
-            traceback.print_exc()
-            return "N/A (TCX Init Error)", []
-    except Exception as e_init_other:
-        print(f"An unexpected error occurred while initializing TCXParser for {tcx_file_path}: {e_init_other}")
+        for event, elem in etree.iterparse(tcx_file_path, events=('start', 'end'), tag=_TCX_ITERPARSE_TAGS):
+            name = _local_name(elem.tag)
+            if event == 'start':
+                if container is None and name in (_TCX_ACTIVITY_TAG, _TCX_COURSE_TAG):
+                    container = name
+                    ns = elem.tag[:-len(name)]
+                    position_tag, elevation_tag = f'{ns}Position', f'{ns}AltitudeMeters'
+                    latitude_tag, longitude_tag = f'{ns}LatitudeDegrees', f'{ns}LongitudeDegrees'
+                    if name == _TCX_ACTIVITY_TAG:
+                        sport = elem.get('Sport')
+                        route_name_from_tcx = f"TCX Activity: {sport.lower()}" if sport else "TCX Activity"
+                continue
+
+            if name == _TCX_TRACK_POINT_TAG:
+                if container is not None:
+                    lat = lon = ele = None
+                    for child in elem:
+                        if child.tag == position_tag:
+                            for coordinate in child:
+                                if coordinate.tag == latitude_tag: lat = coordinate.text
+                                elif coordinate.tag == longitude_tag: lon = coordinate.text
+                        elif child.tag == elevation_tag:
+                            ele = child.text
+                    if lat is not None and lon is not None:
+                        latitudes.append(float(lat))
+                        longitudes.append(float(lon))
+                        elevations.append(float(ele) if ele and ele.strip() else np.nan)
+                # Drop the finished point (and the ones before it) to keep memory flat
+                elem.clear(keep_tail=True)
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+            elif name == _TCX_NAME_TAG:
+                if container == _TCX_COURSE_TAG and course_name is None and elem.text and elem.text.strip() \
+                        and _local_name(elem.getparent().tag) == _TCX_COURSE_TAG:
+                    course_name = elem.text.strip()
+            elif name == _TCX_COURSE_TAG and container == _TCX_COURSE_TAG:
+                route_name_from_tcx = course_name or "TCX Course"
+                break
+    except (etree.XMLSyntaxError, ValueError, OSError) as e:
+        print(f"Error during TCX parsing for {tcx_file_path}: {e}")
         traceback.print_exc()
-        return "N/A (TCX Init Error)", []
+        return "N/A (TCX Parse Error)", Track.empty()
+
+    if not latitudes:
+        print(f"Warning: No trackpoints found in TCX file: {tcx_file_path}")
+        return "N/A (Unknown TCX Structure)", Track.empty()
+    print(f"Info: Successfully parsed TCX as {container}: {tcx_file_path}")
+    return route_name_from_tcx, Track(latitudes, longitudes, elevations, np.zeros(len(latitudes)))
+
+def _extract_track_from_fit(fit_file_path: str) -> tuple[str, Track]:
+    """
+    Decodes a FIT activity or course file's record messages straight into
+    the track's coordinate columns (see common.fit). The route name is the
+    course name when the file has one.
+    """
     try:
-        activity_name_candidate = "TCX Activity"
-        if hasattr(parser, 'activity_type') and parser.activity_type:
-            activity_name_candidate = f"TCX Activity: {parser.activity_type}"
-        lat_lon_tuples = parser.position_values()
-        if lat_lon_tuples:
-            elevations = parser.altitude_points()
-            times_from_parser = parser.time_values()
-            num_points = len(lat_lon_tuples)
-            for i in range(num_points):
-                lat, lon = lat_lon_tuples[i]
-                ele = elevations[i] if i < len(elevations) and elevations[i] is not None else None
-                time_val = times_from_parser[i] if i < len(times_from_parser) and times_from_parser[i] is not None else None
-                all_points_list.append(TrackPoint(lat, lon, ele, time_val))
-            if all_points_list:
-                route_name_from_tcx = activity_name_candidate
-                print(f"Info: Successfully parsed TCX as Activity: {tcx_file_path}")
-                return route_name_from_tcx, all_points_list
-        if hasattr(parser, 'courses') and parser.courses and len(parser.courses) > 0:
-            course = parser.courses[0]
-            if hasattr(course, 'name') and course.name: route_name_from_tcx = course.name
-            elif route_name_from_tcx == "N/A (TCX Data)" or "Activity" in route_name_from_tcx: route_name_from_tcx = "TCX Course"
-            if hasattr(course, 'laps') and course.laps:
-                for lap in course.laps:
-                    if hasattr(lap, 'track') and lap.track:
-                        for trackpoint_data in lap.track: 
-                            lat = trackpoint_data.get('latitude')
-                            lon = trackpoint_data.get('longitude')
-                            ele = trackpoint_data.get('altitude_meters')
-                            time_val_str = trackpoint_data.get('time') 
-                            time_obj = None
-                            if time_val_str:
-                                try:
-                                    if isinstance(time_val_str, datetime): time_obj = time_val_str
-                                    else: time_obj = datetime.fromisoformat(str(time_val_str).replace('Z', '+00:00'))
-                                except ValueError: print(f"Warning: Could not parse time '{time_val_str}' in TCX course trackpoint (parser.courses).")
-                            if lat is not None and lon is not None:
-                                all_points_list.append(TrackPoint(float(lat), float(lon), float(ele) if ele is not None else None, time_obj))
-            if all_points_list:
-                print(f"Info: Successfully parsed TCX as Course (via parser.courses): {tcx_file_path}")
-                return route_name_from_tcx, all_points_list
-        print(f"Warning: TCX file {tcx_file_path} did not yield points from TCXParser standard attributes.")
-        return "N/A (Unknown TCX Structure via TCXParser)", []
-    except Exception as e_gen:
-        print(f"An unexpected error after TCXParser init for {tcx_file_path}: {e_gen}")
+        with open(fit_file_path, 'rb') as f:
+            course_name, latitudes, longitudes, elevations = decode_fit_track(f.read())
+    except (FitDecodeError, OSError) as e:
+        print(f"Error during FIT parsing for {fit_file_path}: {e}")
         traceback.print_exc()
-        return "N/A (TCX General Parse Error)", []
-
-def _calculate_distances_and_pdd(
-    points: list[TrackPoint], 
-    total_distance_km_ref: list[float], 
-    total_downhill_distance_km_ref: list[float], 
-    cumulative_distances_km_at_points_ref: list[float] 
-):
-    if len(points) < 1: return 
-    current_cumulative_dist_km = 0.0 
-    for i in range(len(points) - 1):
-        p1, p2 = points[i], points[i+1]
-        segment_dist_km = 0.0
-        if p1.latitude is not None and p1.longitude is not None and \
-           p2.latitude is not None and p2.longitude is not None:
-            segment_dist_km = haversine_distance(p1.latitude, p1.longitude, p2.latitude, p2.longitude)
-        total_distance_km_ref[0] += segment_dist_km
-        current_cumulative_dist_km += segment_dist_km
-        if i + 1 < len(cumulative_distances_km_at_points_ref):
-            cumulative_distances_km_at_points_ref[i+1] = current_cumulative_dist_km
-        if p1.elevation is not None and p2.elevation is not None:
-            elevation_diff = p2.elevation - p1.elevation
-            if elevation_diff < 0: 
-                total_downhill_distance_km_ref[0] += segment_dist_km
-
-def _calculate_tega(points: list[TrackPoint]) -> float:
-    tega = 0.0
-    if len(points) < 2: return tega
-    for i in range(len(points) - 1):
-        p1, p2 = points[i], points[i+1]
-        if p1.elevation is not None and p2.elevation is not None:
-            if p2.elevation > p1.elevation:
-                tega += (p2.elevation - p1.elevation)
-    return tega
-
-def _calculate_mcg(points: list[TrackPoint], cumulative_distances_km: list[float]) -> float:
-    mcg_metric = 0.0
-    if len(points) < 2: return mcg_metric
-    for i in range(len(points) -1): 
-        start_point_mcg_segment = points[i]
-        current_segment_dist_m = 0.0
-        end_point_idx = i 
-        for j in range(i + 1, len(points)): 
-            p1_seg, p2_seg = points[j-1], points[j]
-            dist_between_m = 0.0
-            if p1_seg.latitude is not None and p1_seg.longitude is not None and \
-               p2_seg.latitude is not None and p2_seg.longitude is not None:
-                dist_between_m = haversine_distance(p1_seg.latitude, p1_seg.longitude, 
-                                                    p2_seg.latitude, p2_seg.longitude) * 1000 
-            if current_segment_dist_m + dist_between_m <= config.MCG_SEGMENT_TARGET_DISTANCE_M:
-                current_segment_dist_m += dist_between_m
+        return "N/A (FIT Parse Error)", Track.empty()
+
+    if not latitudes:
+        print(f"Warning: No positioned records found in FIT file: {fit_file_path}")
+        return "N/A (No FIT Records)", Track.empty()
+    print(f"Info: Successfully parsed FIT file: {fit_file_path}")
+    return course_name or "FIT Activity", Track(latitudes, longitudes, elevations, np.zeros(len(latitudes)))
+
+def _track_from_points(points: list[TrackPoint]) -> Track:
+    """Columns of parsed points, with distances left at zero, as `_extract_track_from_tcx` returns them."""
+    return Track([p.latitude for p in points], [p.longitude for p in points],
+                 _elevation_array(points), np.zeros(len(points)))
+
+def _extract_track_from_gpx(gpx_file_path: str) -> tuple[str, Track]:
+    route_name_from_gpx, points = _extract_trackpoints_from_gpx(gpx_file_path)
+    return route_name_from_gpx, _track_from_points(points)
+
+# Track readers by file extension. Each returns (route name, Track with
+# distances still zero); a name ending in "Error)" with no points is a failure.
+TRACK_EXTRACTORS = {
+    'gpx': _extract_track_from_gpx,
+    'tcx': _extract_track_from_tcx,
+    'fit': _extract_track_from_fit,
+}
+
+def _elevation_array(points: list[TrackPoint]) -> np.ndarray:
+    """Returns the points' elevations as float64, with NaN where a point has none."""
+    return np.array([np.nan if p.elevation is None else p.elevation for p in points], dtype=np.float64)
+
+def _smoothed_elevation_array(raw_elevations: np.ndarray, apply_smoothing: bool) -> np.ndarray:
+    """
+    Returns the elevations the metrics use, side by side with the raw ones.
+
+    Smoothing runs over the points that have an elevation, as if the gaps
+    weren't there, and the results are written back to those positions;
+    points without an elevation stay NaN.
+    """
+    elevations = raw_elevations.copy()
+    if apply_smoothing and len(elevations) >= config.SMOOTHING_WINDOW_SIZE:
+        has_elevation = ~np.isnan(elevations)
+        if has_elevation.sum() >= config.SMOOTHING_WINDOW_SIZE:
+            elevations[has_elevation] = smooth_elevations(elevations[has_elevation], config.SMOOTHING_WINDOW_SIZE,
+                                                          config.SMOOTHING_METHOD, **config.SMOOTHING_OPTIONS)
+    return elevations
+
+# The metric helpers below all work on arrays shared across metrics: elevations
+# (NaN where missing), their per-segment differences (`rises`, NaN where either
+# end is missing) and the segment lengths. Sums that feed reported values are
+# taken left to right with sum(), exactly as the original per-point loops did.
+
+def _calculate_distances_and_pdd(segment_distances_km: np.ndarray, rises: np.ndarray):
+    """Returns (cumulative distance at each point, total distance, downhill distance), all in km."""
+    cumulative_distances_km = np.zeros(len(segment_distances_km) + 1)
+    np.cumsum(segment_distances_km, out=cumulative_distances_km[1:])
+    total_distance_km = float(cumulative_distances_km[-1])
+    total_downhill_distance_km = sum(segment_distances_km[rises < 0].tolist(), 0.0)
+    return cumulative_distances_km, total_distance_km, total_downhill_distance_km
+
+def _calculate_tega(elevations: np.ndarray) -> float:
+    rises = np.diff(elevations)
+    return sum(rises[rises > 0].tolist(), 0.0)
+
+def _mcg_window_gradient(elevations: list[float], segment_distances_m: list[float], i: int):
+    """Walks forward from point i to cover up to MCG_SEGMENT_TARGET_DISTANCE_M and returns the window's climb gradient (or None)."""
+    current_segment_dist_m = 0.0
+    end_point_idx = i 
+    for j in range(i + 1, len(elevations)): 
+        dist_between_m = segment_distances_m[j-1]
+        if current_segment_dist_m + dist_between_m <= config.MCG_SEGMENT_TARGET_DISTANCE_M:
+            current_segment_dist_m += dist_between_m
+            end_point_idx = j
+        else: 
+            if dist_between_m > 0 and current_segment_dist_m == 0 : 
+                current_segment_dist_m = dist_between_m
                 end_point_idx = j
-            else: 
-                if dist_between_m > 0 and current_segment_dist_m == 0 : 
-                    current_segment_dist_m = dist_between_m
-                    end_point_idx = j
-                break 
-        if end_point_idx > i and current_segment_dist_m >= config.MIN_DIST_FOR_MCG_GRADIENT_CALC_M:
-            actual_end_point_mcg_segment = points[end_point_idx]
-            if start_point_mcg_segment.elevation is not None and actual_end_point_mcg_segment.elevation is not None:
-                elevation_change_m = actual_end_point_mcg_segment.elevation - start_point_mcg_segment.elevation
-                if elevation_change_m > 0: 
-                    gradient_percent = (elevation_change_m / current_segment_dist_m) * 100.0
-                    if gradient_percent > mcg_metric:
-                        mcg_metric = gradient_percent
+            break 
+    if end_point_idx > i and current_segment_dist_m >= config.MIN_DIST_FOR_MCG_GRADIENT_CALC_M:
+        elevation_change_m = elevations[end_point_idx] - elevations[i]
+        if elevation_change_m > 0: # False when either elevation is NaN
+            return (elevation_change_m / current_segment_dist_m) * 100.0
+    return None
+
+# Windows whose length lands this close to a threshold are re-walked point by point,
+# so rounding differences between the cumulative-sum lookup and a running sum can't change MCg
+_MCG_TIE_TOLERANCE_M = 1e-4
+
+def _mcg_window_lookup(elevations: np.ndarray, segment_distances_m: np.ndarray):
+    """
+    Every start point's ~100 m window gradient at once, found by searching a
+    cumulative-distance array instead of walking forward from each start.
+
+    Returns (gradients, ties): 0.0 where a start has no climbing window, and
+    a mask of the windows whose length sits on a threshold. Those have their
+    gradient set to 0.0 here and must be re-walked with _mcg_window_gradient.
+    """
+    n = len(elevations)
+    cumulative_m = np.zeros(n)
+    np.cumsum(segment_distances_m, out=cumulative_m[1:])
+    target_m, min_m = config.MCG_SEGMENT_TARGET_DISTANCE_M, config.MIN_DIST_FOR_MCG_GRADIENT_CALC_M
+
+    starts = np.arange(n - 1)
+    ends = np.searchsorted(cumulative_m, cumulative_m[:-1] + target_m, side='right') - 1
+    window_m = cumulative_m[ends] - cumulative_m[starts]
+    # A window that can't fit its first non-zero segment takes that segment alone
+    lone = (window_m == 0) & (ends < n - 1)
+    ends = np.where(lone, ends + 1, ends)
+    window_m = cumulative_m[ends] - cumulative_m[starts]
+
+    next_window_m = cumulative_m[np.minimum(ends + 1, n - 1)] - cumulative_m[starts]
+    ties = ((np.abs(window_m - target_m) < _MCG_TIE_TOLERANCE_M)
+            | (np.abs(next_window_m - target_m) < _MCG_TIE_TOLERANCE_M)
+            | (np.abs(window_m - min_m) < _MCG_TIE_TOLERANCE_M)
+            | (window_m < _MCG_TIE_TOLERANCE_M))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rises = elevations[ends] - elevations[starts]
+        gradients = np.where((ends > starts) & (window_m >= min_m) & (rises > 0), rises / window_m * 100.0, 0.0)
+    gradients[ties] = 0.0
+    return gradients, ties
+
+def _calculate_mcg(elevations: np.ndarray, segment_distances_m: np.ndarray) -> float:
+    """
+    Steepest climb over any ~100 m window (MCG_SEGMENT_TARGET_DISTANCE_M).
+
+    The window gradients come from _mcg_window_lookup. The few windows that
+    could be the maximum, plus any whose length sits on a threshold, are
+    then re-measured with the original forward walk, so the result is
+    identical to it bit for bit.
+    """
+    mcg_metric = 0.0
+    if len(elevations) < 2: return mcg_metric
+    gradients, ties = _mcg_window_lookup(elevations, segment_distances_m)
+    best = gradients.max()
+    candidates = np.flatnonzero(ties | ((gradients > 0) & (gradients >= best * (1 - 1e-9))))
+
+    elevation_list, segment_list = elevations.tolist(), np.asarray(segment_distances_m).tolist()
+    for i in candidates.tolist():
+        gradient_percent = _mcg_window_gradient(elevation_list, segment_list, i)
+        if gradient_percent is not None and gradient_percent > mcg_metric:
+            mcg_metric = gradient_percent
     return mcg_metric
 
-def _calculate_acg_or_adg(points: list[TrackPoint], cumulative_distances_km: list[float], is_climb: bool) -> float:
-    significant_segment_gradients = []
-    current_segment_points = [] 
+# Slack for the vectorised run-length pre-filter; runs within it are measured exactly
+_RUN_LENGTH_TOLERANCE_M = 1e-3
+
+def _run_mask(rises: np.ndarray, segment_distances_m: np.ndarray, is_climb: bool):
+    """
+    Marks the segments that can be part of a climb (or descent): each rising
+    at POTENTIAL_CLIMB_START_GRADIENT_THRESHOLD or more (descents mirror
+    this). A segment touching a missing elevation counts as flat. Returns
+    (mask, elevation changes with NaN as 0.0).
+    """
     potential_start_threshold = config.POTENTIAL_CLIMB_START_GRADIENT_THRESHOLD if is_climb else config.POTENTIAL_DESCENT_START_GRADIENT_THRESHOLD
+    elevation_changes_m = np.nan_to_num(rises, nan=0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gradients = np.where(segment_distances_m > 0, elevation_changes_m / segment_distances_m * 100.0, 0.0)
+    if is_climb:
+        in_run = (elevation_changes_m > 0) & (gradients >= potential_start_threshold)
+    else:
+        in_run = (elevation_changes_m < 0) & (gradients <= potential_start_threshold)
+    return in_run, elevation_changes_m
+
+def _significant_runs(elevations: np.ndarray, rises: np.ndarray, segment_distances_m: np.ndarray, is_climb: bool):
+    """
+    Finds the candidate climbs (or descents), maximal runs of segments in
+    _run_mask, with one vectorised pass, and qualifies each on its length,
+    average gradient and, for climbs, climb factor. Returns the first
+    segment of each significant run and its average gradient (absolute),
+    as two lists in track order.
+    """
     min_segment_dist_m = config.SIG_CLIMB_MIN_DISTANCE_M if is_climb else config.SIG_DESCENT_MIN_DISTANCE_M
     min_segment_grad_percent = config.SIG_CLIMB_MIN_GRADIENT_PERCENT if is_climb else config.SIG_DESCENT_MIN_GRADIENT_PERCENT
     factor_threshold = config.SIG_CLIMB_FACTOR_THRESHOLD if is_climb else None 
-    if len(points) < 2: return 0.0
-    for i in range(len(points) - 1):
-        p1, p2 = points[i], points[i+1]
-        segment_dist_m = 0.0
-        if p1.latitude is not None and p1.longitude is not None and \
-           p2.latitude is not None and p2.longitude is not None:
-            segment_dist_m = haversine_distance(p1.latitude, p1.longitude, p2.latitude, p2.longitude) * 1000
-        elevation_change_m = 0.0
-        if p1.elevation is not None and p2.elevation is not None:
-            elevation_change_m = p2.elevation - p1.elevation
-        current_segment_gradient = (elevation_change_m / segment_dist_m * 100.0) if segment_dist_m > 0 else 0
-        condition_met = (is_climb and elevation_change_m > 0 and current_segment_gradient >= potential_start_threshold) or \
-                        (not is_climb and elevation_change_m < 0 and current_segment_gradient <= potential_start_threshold)
-        if condition_met:
-            if not current_segment_points: 
-                current_segment_points.append(p1)
-            current_segment_points.append(p2)
-        else: 
-            if len(current_segment_points) >= 2: 
-                seg_start_point = current_segment_points[0]
-                seg_end_point = current_segment_points[-1]
-                seg_total_dist_m = 0
-                seg_total_ele_change_for_grad_calc = 0 
-                if is_climb: 
-                    current_gain_in_segment = 0
-                    for k in range(len(current_segment_points) - 1):
-                        cp1, cp2 = current_segment_points[k], current_segment_points[k+1]
-                        d = haversine_distance(cp1.latitude, cp1.longitude, cp2.latitude, cp2.longitude) * 1000 if (cp1.latitude and cp2.latitude) else 0
-                        seg_total_dist_m += d
-                        if cp1.elevation is not None and cp2.elevation is not None:
-                            current_gain_in_segment += max(0, cp2.elevation - cp1.elevation)
-                    seg_total_ele_change_for_grad_calc = current_gain_in_segment
-                else: 
-                    if seg_start_point.elevation is not None and seg_end_point.elevation is not None:
-                         seg_total_ele_change_for_grad_calc = seg_end_point.elevation - seg_start_point.elevation 
-                    for k in range(len(current_segment_points) - 1):
-                        cp1, cp2 = current_segment_points[k], current_segment_points[k+1]
-                        d = haversine_distance(cp1.latitude, cp1.longitude, cp2.latitude, cp2.longitude) * 1000 if (cp1.latitude and cp2.latitude) else 0
-                        seg_total_dist_m += d
-                if seg_total_dist_m > 0:
-                    avg_grad_of_segment = (seg_total_ele_change_for_grad_calc / seg_total_dist_m) * 100.0
-                    qualified = False
-                    if is_climb:
-                        climb_factor = seg_total_dist_m * avg_grad_of_segment 
-                        if seg_total_dist_m >= min_segment_dist_m and \
-                           avg_grad_of_segment >= min_segment_grad_percent and \
-                           (factor_threshold is None or climb_factor >= factor_threshold):
-                            qualified = True
-                    else: 
-                        if seg_total_dist_m >= min_segment_dist_m and \
-                           avg_grad_of_segment <= min_segment_grad_percent: 
-                            qualified = True
-                    if qualified:
-                        significant_segment_gradients.append(abs(avg_grad_of_segment))
-            current_segment_points = [] 
-    if len(current_segment_points) >= 2:
-        seg_start_point = current_segment_points[0]
-        seg_end_point = current_segment_points[-1]
-        seg_total_dist_m = 0
-        seg_total_ele_change_for_grad_calc = 0
+    if len(elevations) < 2: return [], []
+
+    in_run, elevation_changes_m = _run_mask(rises, segment_distances_m, is_climb)
+    edges = np.diff(np.concatenate(([0], in_run.astype(np.int8), [0])))
+    run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    # Most runs are a few metres long; drop those clearly under the minimum length
+    # before measuring the rest exactly
+    cumulative_m = np.concatenate(([0.0], np.cumsum(segment_distances_m)))
+    long_enough = cumulative_m[run_ends] - cumulative_m[run_starts] >= min_segment_dist_m - _RUN_LENGTH_TOLERANCE_M
+    run_starts, run_ends = run_starts[long_enough], run_ends[long_enough]
+
+    significant_starts, significant_segment_gradients = [], []
+    for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+        # Points start..end, segments start..end-1
+        seg_total_dist_m = sum(segment_distances_m[start:end].tolist())
         if is_climb:
-            current_gain_in_segment = 0
-            for k in range(len(current_segment_points) - 1):
-                cp1, cp2 = current_segment_points[k], current_segment_points[k+1]
-                d = haversine_distance(cp1.latitude, cp1.longitude, cp2.latitude, cp2.longitude) * 1000 if (cp1.latitude and cp2.latitude) else 0
-                seg_total_dist_m += d
-                if cp1.elevation is not None and cp2.elevation is not None: current_gain_in_segment += max(0, cp2.elevation - cp1.elevation)
-            seg_total_ele_change_for_grad_calc = current_gain_in_segment
-        else: 
-            if seg_start_point.elevation is not None and seg_end_point.elevation is not None:
-                 seg_total_ele_change_for_grad_calc = seg_end_point.elevation - seg_start_point.elevation
-            for k in range(len(current_segment_points) - 1):
-                cp1, cp2 = current_segment_points[k], current_segment_points[k+1]
-                d = haversine_distance(cp1.latitude, cp1.longitude, cp2.latitude, cp2.longitude) * 1000 if (cp1.latitude and cp2.latitude) else 0
-                seg_total_dist_m += d
+            seg_total_ele_change_for_grad_calc = sum(elevation_changes_m[start:end].tolist())
+        else:
+            seg_total_ele_change_for_grad_calc = float(elevations[end] - elevations[start])
         if seg_total_dist_m > 0:
             avg_grad_of_segment = (seg_total_ele_change_for_grad_calc / seg_total_dist_m) * 100.0
             qualified = False
             if is_climb:
-                climb_factor = seg_total_dist_m * avg_grad_of_segment
-                if seg_total_dist_m >= min_segment_dist_m and avg_grad_of_segment >= min_segment_grad_percent and (factor_threshold is None or climb_factor >= factor_threshold): qualified = True
+                climb_factor = seg_total_dist_m * avg_grad_of_segment 
+                if seg_total_dist_m >= min_segment_dist_m and \
+                   avg_grad_of_segment >= min_segment_grad_percent and \
+                   (factor_threshold is None or climb_factor >= factor_threshold):
+                    qualified = True
             else: 
-                if seg_total_dist_m >= min_segment_dist_m and avg_grad_of_segment <= min_segment_grad_percent: qualified = True
-            if qualified: significant_segment_gradients.append(abs(avg_grad_of_segment))
+                if seg_total_dist_m >= min_segment_dist_m and \
+                   avg_grad_of_segment <= min_segment_grad_percent: 
+                    qualified = True
+            if qualified:
+                significant_starts.append(start)
+                significant_segment_gradients.append(abs(avg_grad_of_segment))
+    return significant_starts, significant_segment_gradients
+
+def _calculate_acg_or_adg(elevations: np.ndarray, rises: np.ndarray, segment_distances_m: np.ndarray, is_climb: bool) -> float:
+    """Average gradient of the significant climbs (or descents); see _significant_runs."""
+    _, significant_segment_gradients = _significant_runs(elevations, rises, segment_distances_m, is_climb)
     return sum(significant_segment_gradients) / len(significant_segment_gradients) if significant_segment_gradients else 0.0
 
 def get_route_metrics(file_path: str, file_extension: str, apply_smoothing: bool = True):
     route_name_from_file = "N/A"
-    all_points_original_parsed: list[TrackPoint] = [] 
+    parsed_track = Track.empty()
     metrics_result = { 
         "route_name": route_name_from_file, "distance_km": 0.0, "TEGa": 0.0, 
         "TEGa_raw": 0.0, "TEGa_smoothed": 0.0, "PDD": 0.0, 
         "MCg": 0.0, "ACg": 0.0, "ADg": 0.0, 
         "raw_points_count": 0,
-        "track_points": [],
+        "track_points": Track.empty(),
         "start_lat": None, 
         "start_lon": None  
     }
     try:
-        if file_extension == 'gpx':
-            route_name_from_file, all_points_original_parsed = _extract_trackpoints_from_gpx(file_path)
-        elif file_extension == 'tcx':
-            route_name_from_file, all_points_original_parsed = _extract_trackpoints_from_tcx(file_path)
-            if "Error)" in route_name_from_file and not all_points_original_parsed: 
-                 metrics_result["route_name"] = route_name_from_file 
-                 return metrics_result 
-        else:
+        extract_track = TRACK_EXTRACTORS.get(file_extension)
+        if extract_track is None:
             print(f"Error: Unsupported file extension: {file_extension}")
             metrics_result["route_name"] = f"Unsupported File Type ({file_extension})"
             return metrics_result 
+        route_name_from_file, parsed_track = extract_track(file_path)
+        if "Error)" in route_name_from_file and not parsed_track: 
+             metrics_result["route_name"] = route_name_from_file 
+             return metrics_result 
         
         metrics_result["route_name"] = route_name_from_file
-        metrics_result["raw_points_count"] = len(all_points_original_parsed)
+        metrics_result["raw_points_count"] = len(parsed_track)
 
-        if not all_points_original_parsed or len(all_points_original_parsed) < 2:
+        if len(parsed_track) < 2:
             print(f"Warning: No usable points after parsing {file_extension.upper()} file: {file_path}")
             if not ("Error)" in metrics_result["route_name"] or "Unsupported" in metrics_result["route_name"]): 
                 metrics_result["route_name"] = f"N/A (No Points in {file_extension.upper()})"
             return metrics_result 
 
-        if all_points_original_parsed:
-            metrics_result["start_lat"] = all_points_original_parsed[0].latitude
-            metrics_result["start_lon"] = all_points_original_parsed[0].longitude
-
-        points_for_elevation_metrics = [copy.deepcopy(p) for p in all_points_original_parsed]
-        if apply_smoothing and len(points_for_elevation_metrics) >= config.SMOOTHING_WINDOW_SIZE:
-            original_elevations = [p.elevation for p in points_for_elevation_metrics if p.elevation is not None]
-            if len(original_elevations) >= config.SMOOTHING_WINDOW_SIZE: 
-                smoothed_elevation_values = get_smoothed_elevations(original_elevations, config.SMOOTHING_WINDOW_SIZE)
-                ele_idx = 0 
-                for p_obj in points_for_elevation_metrics:
-                    if p_obj.elevation is not None: 
-                        if ele_idx < len(smoothed_elevation_values):
-                            p_obj.elevation = smoothed_elevation_values[ele_idx]
-                        ele_idx +=1 
-        try: metrics_result["TEGa_raw"] = _calculate_tega(all_points_original_parsed)
+        metrics_result["start_lat"] = parsed_track.lat[0].item()
+        metrics_result["start_lon"] = parsed_track.lon[0].item()
+
+        # Shared arrays: every metric below is derived from these, computed once.
+        # Smoothing writes a separate elevation array; the parsed points are never modified.
+        latitudes, longitudes, raw_elevations = parsed_track.lat, parsed_track.lon, parsed_track.ele
+        elevations = _smoothed_elevation_array(raw_elevations, apply_smoothing)
+        segment_distances_km = haversine_distances(latitudes, longitudes)
+        segment_distances_m = segment_distances_km * 1000
+        rises = np.diff(elevations)
+        cumulative_distances_km = np.zeros(len(latitudes))
+
+        try: metrics_result["TEGa_raw"] = _calculate_tega(raw_elevations)
         except Exception as e: print(f"Error calculating TEGa_raw: {e}\n{traceback.format_exc()}")
         try:
-            tega_smoothed = _calculate_tega(points_for_elevation_metrics)
+            tega_smoothed = _calculate_tega(elevations)
             metrics_result["TEGa_smoothed"] = tega_smoothed
             metrics_result["TEGa"] = tega_smoothed 
         except Exception as e: print(f"Error calculating TEGa_smoothed: {e}\n{traceback.format_exc()}")
-        total_dist_km_list = [0.0] 
-        total_downhill_distance_km_list = [0.0] 
-        cumulative_distances_km = [0.0] * len(points_for_elevation_metrics) 
         try:
-            _calculate_distances_and_pdd(points_for_elevation_metrics, 
-                                         total_dist_km_list, 
-                                         total_downhill_distance_km_list, 
-                                         cumulative_distances_km)
-            metrics_result["distance_km"] = total_dist_km_list[0]
+            cumulative_distances_km, total_distance_km, total_downhill_distance_km = \
+                _calculate_distances_and_pdd(segment_distances_km, rises)
+            metrics_result["distance_km"] = total_distance_km
             if metrics_result["distance_km"] > 0:
-                metrics_result["PDD"] = total_downhill_distance_km_list[0] / metrics_result["distance_km"]
+                metrics_result["PDD"] = total_downhill_distance_km / metrics_result["distance_km"]
             else:
                 metrics_result["PDD"] = 0.0
         except Exception as e: 
             print(f"Error calculating total distance or PDD: {e}\n{traceback.format_exc()}")
             if "distance_km" not in metrics_result or metrics_result["distance_km"] == 0.0:
-                 metrics_result["distance_km"] = sum(haversine_distance(points_for_elevation_metrics[i].latitude, points_for_elevation_metrics[i].longitude, 
-                                                                        points_for_elevation_metrics[i+1].latitude, points_for_elevation_metrics[i+1].longitude)
-                                                     for i in range(len(points_for_elevation_metrics)-1) 
-                                                     if points_for_elevation_metrics[i].latitude is not None and points_for_elevation_metrics[i+1].latitude is not None)
-        try: metrics_result["MCg"] = _calculate_mcg(points_for_elevation_metrics, cumulative_distances_km)
+                 metrics_result["distance_km"] = sum(segment_distances_km.tolist())
+        try: metrics_result["MCg"] = _calculate_mcg(elevations, segment_distances_m)
         except Exception as e: print(f"Error calculating MCg: {e}\n{traceback.format_exc()}")
-        try: metrics_result["ACg"] = _calculate_acg_or_adg(points_for_elevation_metrics, cumulative_distances_km, is_climb=True)
+        try: metrics_result["ACg"] = _calculate_acg_or_adg(elevations, rises, segment_distances_m, is_climb=True)
         except Exception as e: print(f"Error calculating ACg: {e}\n{traceback.format_exc()}")
-        try: metrics_result["ADg"] = _calculate_acg_or_adg(points_for_elevation_metrics, cumulative_distances_km, is_climb=False)
+        try: metrics_result["ADg"] = _calculate_acg_or_adg(elevations, rises, segment_distances_m, is_climb=False)
         except Exception as e: print(f"Error calculating ADg: {e}\n{traceback.format_exc()}")
-        detailed_track_points = []
-        for i, point_obj in enumerate(points_for_elevation_metrics):
-            detailed_track_points.append({
-                "lat": point_obj.latitude,
-                "lon": point_obj.longitude,
-                "ele": point_obj.elevation, 
-                "dist": cumulative_distances_km[i] 
-            })
-        metrics_result["track_points"] = detailed_track_points
+        # Kept columnar; callers convert with Track.to_dicts() when storing or serialising
+        metrics_result["track_points"] = Track(latitudes, longitudes, elevations, cumulative_distances_km)
         return metrics_result
     except FileNotFoundError: 
         print(f"Error: File not found: {file_path}")
@@ -416,13 +438,6 @@ def get_route_metrics(file_path: str, file_extension: str, apply_smoothing: bool
     except gpxpy.gpx.GPXXMLSyntaxException: 
         print(f"Error: GPX XML Syntax Error for: {file_path}")
         metrics_result["route_name"] = "N/A (GPX Syntax Error)"
-    except ImportError as e_imp: 
-        if 'tcxparser' in str(e_imp).lower():
-            print(f"Error: python-tcxparser library not found. Please install it to process .tcx files ('pip install python-tcxparser').")
-            metrics_result["route_name"] = "N/A (TCX Parser Missing)"
-        else:
-            print(f"Error: Missing import for {file_path}: {e_imp}")
-            metrics_result["route_name"] = "N/A (Import Error)"
     except Exception as e_main: 
         print(f"Error: Unexpected error during metric extraction for {file_path}: {e_main}")
         print(traceback.format_exc()) 
@@ -502,8 +517,6 @@ if __name__ == '__main__':
                     print(f"  {k}: {v_val:.3f}" if isinstance(v_val, float) else f"  {k}: {v_val}")
         else:
             print("  Failed to get TCX Activity metrics.")
-    except ImportError:
-        print("  Skipping TCX Activity test: tcxparser library not found. Install with 'pip install python-tcxparser'")
     except Exception as e_tcx_act:
         print(f"  Error during TCX Activity test: {e_tcx_act}")
     test_tcx_course_file = "metric_extractor_test_course.tcx" 
@@ -528,7 +541,5 @@ if __name__ == '__main__':
                     print(f"  {k}: {v_val:.3f}" if isinstance(v_val, float) else f"  {k}: {v_val}")
         else:
             print("  Failed to get TCX Course metrics.")
-    except ImportError:
-        print("  Skipping TCX Course test: tcxparser library not found.")
     except Exception as e_tcx_crs:
         print(f"  Error during TCX Course test: {e_tcx_crs}")
\ No newline at end of file
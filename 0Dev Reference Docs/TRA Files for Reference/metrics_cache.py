@@ -0,0 +1,152 @@
+# metrics_cache.py - On-disk cache of extracted route metrics, keyed by file content
+
+import hashlib
+import json
+import os
+import time
+import traceback
+import numpy as np
+
+import config
+from common.track import Track
+from metric_extractor import METRICS_VERSION, get_route_metrics
+
+# The config constants metric extraction reads; changing any of them gives new cache keys.
+# The difficulty constants aren't included: scores are recomputed from cached metrics.
+EXTRACTION_CONFIG_KEYS = (
+    "SMOOTHING_WINDOW_SIZE", "SMOOTHING_METHOD", "SMOOTHING_OPTIONS",
+    "MCG_SEGMENT_TARGET_DISTANCE_M", "MIN_DIST_FOR_MCG_GRADIENT_CALC_M",
+    "SIG_CLIMB_FACTOR_THRESHOLD", "SIG_CLIMB_MIN_DISTANCE_M", "SIG_CLIMB_MIN_GRADIENT_PERCENT",
+    "POTENTIAL_CLIMB_START_GRADIENT_THRESHOLD", "SIG_DESCENT_MIN_DISTANCE_M",
+    "SIG_DESCENT_MIN_GRADIENT_PERCENT", "POTENTIAL_DESCENT_START_GRADIENT_THRESHOLD",
+)
+_ENTRY_SUFFIX = '.npz'
+_TRACK_COLUMNS = ("lat", "lon", "ele", "dist")
+
+
+def extraction_config_hash() -> str:
+    """A short hash of the current values of EXTRACTION_CONFIG_KEYS."""
+    values = {key: getattr(config, key, None) for key in EXTRACTION_CONFIG_KEYS}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=repr).encode('utf-8')).hexdigest()[:16]
+
+
+class MetricsCache:
+    """
+    Stores get_route_metrics results in `folder`, one .npz file per entry:
+    the track as float64 columns and the other metrics as JSON.
+
+    Entries are keyed by the SHA-256 of the file's bytes, the extension and
+    smoothing flag, METRICS_VERSION and extraction_config_hash(), so a
+    re-uploaded file is a hit while a parser or config change is a miss.
+    A hit refreshes the entry's modification time; evict() removes entries
+    unused for `max_age_seconds`, then the least recently used ones until
+    the folder is under `max_bytes`. Writes go through a temporary file and
+    os.replace, so concurrent workers never read a partial entry.
+    """
+
+    def __init__(self, folder: str, max_age_seconds: float, max_bytes: int):
+        self.folder = folder
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+
+    def key(self, data: bytes, file_extension: str, apply_smoothing: bool = True) -> str:
+        content_hash = hashlib.sha256(data).hexdigest()
+        return (f"{content_hash}-{file_extension.lower()}-{'s' if apply_smoothing else 'r'}"
+                f"-v{METRICS_VERSION}-{extraction_config_hash()}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key + _ENTRY_SUFFIX)
+
+    def get(self, key: str):
+        """Returns the cached metrics dict for `key`, or None on a miss or unreadable entry."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                metrics = json.loads(entry["metrics"].item())
+                metrics["track_points"] = Track(*(entry[column] for column in _TRACK_COLUMNS))
+            os.utime(path)
+            return metrics
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Discarding unreadable metrics cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key: str, metrics: dict):
+        """Stores `metrics` under `key`, then evicts old entries."""
+        track = metrics["track_points"]
+        scalars = {k: v for k, v in metrics.items() if k != "track_points"}
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = os.path.join(self.folder, f".{key}.{os.getpid()}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, metrics=np.array(json.dumps(scalars)),
+                         **{column: getattr(track, column) for column in _TRACK_COLUMNS})
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            print(f"Warning: Could not write metrics cache entry {key}: {e}")
+            self._remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes entries older than max_age_seconds, then the oldest until under max_bytes."""
+        try:
+            names = [name for name in os.listdir(self.folder) if name.endswith(_ENTRY_SUFFIX)]
+        except FileNotFoundError:
+            return
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        oldest_kept = time.time() - self.max_age_seconds
+        total_bytes = sum(size for _, size, _ in entries)
+        for mtime, size, name in sorted(entries):
+            if mtime >= oldest_kept and total_bytes <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.folder, name))
+            total_bytes -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _default_cache() -> MetricsCache:
+    return MetricsCache(config.METRICS_CACHE_FOLDER, config.METRICS_CACHE_MAX_AGE_DAYS * 86400,
+                        config.METRICS_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_route_metrics_cached(file_path: str, file_extension: str, apply_smoothing: bool = True,
+                             cache: MetricsCache = None):
+    """
+    get_route_metrics, skipping extraction when a file with the same content
+    was already processed under the current parser version and config.
+    Results without usable points (parse errors, missing files) are not
+    cached. Cache failures fall back to extracting.
+    """
+    cache = cache or _default_cache()
+    key = None
+    try:
+        with open(file_path, 'rb') as f:
+            key = cache.key(f.read(), file_extension, apply_smoothing)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    except FileNotFoundError:
+        pass  # get_route_metrics reports it
+    except Exception as e:
+        print(f"Warning: Metrics cache lookup failed for {file_path}: {e}\n{traceback.format_exc()}")
+
+    metrics = get_route_metrics(file_path, file_extension, apply_smoothing)
+    if key is not None and metrics and metrics["track_points"]:
+        cache.put(key, metrics)
+    return metrics
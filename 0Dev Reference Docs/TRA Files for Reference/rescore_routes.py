@@ -0,0 +1,65 @@
+# rescore_routes.py - Recomputes stored difficulty scores in bulk from saved route metrics
+
+import argparse
+from pymongo import UpdateOne
+from difficulty_calculator import calculate_total_difficulties
+
+# metrics_summary fields, in calculate_total_difficulties argument order
+SCORE_METRICS = ("distance_km", "TEGa", "ACg", "MCg", "PDD", "ADg")
+
+def rescore_updates(documents):
+    """
+    Scores every document that has all of SCORE_METRICS in its
+    metrics_summary in one calculate_total_difficulties call. Returns
+    (updates, skipped): UpdateOne operations for the documents whose rounded
+    difficulty_score changed, and the number lacking metrics.
+    """
+    ids, stored_scores, columns = [], [], [[] for _ in SCORE_METRICS]
+    skipped = 0
+    for doc in documents:
+        summary = doc.get("metrics_summary") or {}
+        values = [summary.get(field) for field in SCORE_METRICS]
+        if any(value is None for value in values):
+            skipped += 1
+            continue
+        ids.append(doc["_id"])
+        stored_scores.append(doc.get("difficulty_score"))
+        for column, value in zip(columns, values):
+            column.append(value)
+
+    if not ids:
+        return [], skipped
+    # Python round(), as ingest stores it: np.round differs on half-way values
+    scores = [round(score, 2) for score in calculate_total_difficulties(*columns).tolist()]
+    updates = [UpdateOne({"_id": doc_id}, {"$set": {"difficulty_score": score}})
+               for doc_id, stored, score in zip(ids, stored_scores, scores) if stored != score]
+    return updates, skipped
+
+def rescore_collection(collection, batch_size=1000, dry_run=False):
+    """Re-scores a collection from its stored metrics, writing changed scores back in bulk_write batches."""
+    projection = {"difficulty_score": 1, **{f"metrics_summary.{field}": 1 for field in SCORE_METRICS}}
+    updates, skipped = rescore_updates(collection.find({}, projection))
+    print(f"{collection.name}: {len(updates)} scores changed, {skipped} documents without metrics skipped.")
+    if dry_run:
+        return len(updates)
+
+    modified = 0
+    for start in range(0, len(updates), batch_size):
+        result = collection.bulk_write(updates[start:start + batch_size], ordered=False)
+        modified += result.modified_count
+    print(f"{collection.name}: updated {modified} documents.")
+    return modified
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Re-scores stored routes with the current config.py difficulty settings.")
+    parser.add_argument('--collection', action='append', choices=['routes', 'drafts'],
+                        help="collection to re-score (repeatable; defaults to both)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="updates per bulk_write call")
+    parser.add_argument('--dry-run', action='store_true', help="report changed scores without writing them")
+    args = parser.parse_args()
+
+    from app import app
+    from extensions import mongo
+    with app.app_context():
+        for name in args.collection or ['routes', 'drafts']:
+            rescore_collection(mongo.db[name], args.batch_size, args.dry_run)
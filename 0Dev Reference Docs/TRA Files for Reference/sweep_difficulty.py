@@ -0,0 +1,216 @@
+# sweep_difficulty.py - Scores a route corpus under many difficulty parameter sets in parallel
+
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import config
+from difficulty_calculator import calculate_total_difficulties
+from metrics_cache import get_route_metrics_cached
+from rescore_routes import SCORE_METRICS
+
+# The config.py constants calculate_total_difficulties reads; only these can be swept
+DIFFICULTY_PARAMETERS = (
+    "DISTANCE_BASE_ADDITION", "DISTANCE_DIFFICULTY_COEFFICIENT_A",
+    "MAX_EXPECTED_TEGA", "MAX_EXPECTED_ACG", "MAX_EXPECTED_MCG",
+    "WEIGHT_TEGA", "WEIGHT_ACG", "WEIGHT_MCG", "LINEAR_UF_SLOPE",
+    "PDD_THRESHOLD", "MAX_ASCENT_FOR_DOWNHILL_REDUCTION", "MIN_AVG_DESCENT_GRADIENT_THRESHOLD",
+    "TARGET_ADG_FOR_MAX_REDUCTION", "WEIGHT_PDD_SCORE", "WEIGHT_ADG_SCORE",
+    "MAX_DOWNHILL_REDUCTION_FACTOR", "MIN_DIFFICULTY_SCORE",
+)
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_files_store')
+# Parameter sets handed to a worker at a time
+_CHUNK_SIZE = 64
+
+def _check_parameter_names(names):
+    unknown = sorted(set(names) - set(DIFFICULTY_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Not difficulty parameters in config.py: {', '.join(unknown)}")
+
+# --- Corpus Metrics ---
+
+def _extract_score_metrics(path):
+    """The SCORE_METRICS of one route file, or None if it has no distance. Uses the metrics cache."""
+    extension = path.rsplit('.', 1)[-1].lower()
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = get_route_metrics_cached(path, extension, apply_smoothing=True)
+    if not metrics or not metrics.get("distance_km"):
+        return None
+    return tuple(metrics[field] for field in SCORE_METRICS)
+
+def load_corpus_metrics(paths, workers=None):
+    """
+    Extracts every route's metrics once (in parallel, through the on-disk
+    metrics cache so later sweeps skip parsing). Returns (names, columns):
+    the file names of routes with a distance and a (6, routes) float64 array
+    in calculate_total_difficulties argument order.
+    """
+    if workers == 1:
+        results = list(map(_extract_score_metrics, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_extract_score_metrics, paths, chunksize=4))
+    kept = [(os.path.basename(path), values) for path, values in zip(paths, results) if values is not None]
+    names = [name for name, _ in kept]
+    columns = np.array([values for _, values in kept], dtype=np.float64).T.reshape(len(SCORE_METRICS), len(kept))
+    return names, columns
+
+# --- Parameter Sets ---
+
+def grid_parameter_sets(grid: dict) -> list:
+    """Every combination of the values in `grid` ({name: [values]}), as a list of {name: value} dicts."""
+    _check_parameter_names(grid)
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def random_parameter_sets(ranges: dict, count: int, seed: int = 0) -> list:
+    """`count` parameter sets drawn uniformly from `ranges` ({name: (low, high)})."""
+    _check_parameter_names(ranges)
+    rng = np.random.default_rng(seed)
+    samples = {name: rng.uniform(low, high, count).tolist() for name, (low, high) in ranges.items()}
+    return [{name: samples[name][i] for name in ranges} for i in range(count)]
+
+# --- Scoring ---
+
+_worker_columns = None
+
+def _init_worker(columns):
+    global _worker_columns
+    _worker_columns = columns
+
+def _score_chunk(parameter_sets, columns=None):
+    """Scores the corpus under each parameter set, restoring config.py's values afterwards."""
+    columns = _worker_columns if columns is None else columns
+    baseline = {name: getattr(config, name) for name in DIFFICULTY_PARAMETERS}
+    scores = np.empty((len(parameter_sets), columns.shape[1]))
+    try:
+        for row, parameters in enumerate(parameter_sets):
+            for name in DIFFICULTY_PARAMETERS:
+                setattr(config, name, parameters.get(name, baseline[name]))
+            scores[row] = calculate_total_difficulties(*columns)
+    finally:
+        for name, value in baseline.items():
+            setattr(config, name, value)
+    return scores
+
+def score_parameter_sets(columns, parameter_sets, workers=None) -> np.ndarray:
+    """
+    Scores every route under every parameter set (missing parameters keep
+    their config.py values). Returns a (parameter sets, routes) array.
+    Chunks of parameter sets are scored in parallel worker processes, each
+    given the metric columns once.
+    """
+    for parameters in parameter_sets:
+        _check_parameter_names(parameters)
+    if not parameter_sets:
+        return np.empty((0, columns.shape[1]))
+    chunks = [parameter_sets[i:i + _CHUNK_SIZE] for i in range(0, len(parameter_sets), _CHUNK_SIZE)]
+    if workers == 1 or len(chunks) == 1:
+        return np.vstack([_score_chunk(chunk, columns) for chunk in chunks])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(columns,)) as pool:
+        return np.vstack(list(pool.map(_score_chunk, chunks)))
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """Rank of each route (0 = easiest) along the last axis; ties keep route order."""
+    return np.argsort(np.argsort(scores, axis=-1, kind='stable'), axis=-1, kind='stable')
+
+def ranking_stability(scores: np.ndarray, baseline_scores: np.ndarray):
+    """
+    How much each parameter set reorders the routes compared to the
+    baseline scores. Returns (spearman, max_rank_shift): per parameter set
+    the Spearman rank correlation with the baseline ranking (1.0 = same
+    order) and the furthest any single route moved in the ranking.
+    """
+    ranks = _ranks(scores).astype(np.float64)
+    baseline_ranks = _ranks(baseline_scores).astype(np.float64)
+    n = scores.shape[-1]
+    if n < 2:
+        return np.ones(len(scores)), np.zeros(len(scores), dtype=np.int64)
+    squared_shifts = ((ranks - baseline_ranks) ** 2).sum(axis=-1)
+    spearman = 1 - 6 * squared_shifts / (n * (n * n - 1))
+    max_rank_shift = np.abs(ranks - baseline_ranks).max(axis=-1).astype(np.int64)
+    return spearman, max_rank_shift
+
+# --- Command Line ---
+
+def _parse_assignments(values, parse_value):
+    parsed = {}
+    for value in values or []:
+        name, _, spec = value.partition('=')
+        if not spec:
+            raise argparse.ArgumentTypeError(f"Expected NAME=VALUES, got '{value}'")
+        parsed[name.strip()] = parse_value(spec)
+    return parsed
+
+def _write_scores_csv(path, names, parameter_sets, scores, spearman, max_rank_shift):
+    parameter_names = [name for name in DIFFICULTY_PARAMETERS if any(name in p for p in parameter_sets)]
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(["Set"] + parameter_names + ["Spearman vs config", "Max Rank Shift"] + names)
+        for i, parameters in enumerate(parameter_sets):
+            csvwriter.writerow([i] + [parameters.get(name, getattr(config, name)) for name in parameter_names] +
+                               [round(spearman[i], 4), max_rank_shift[i]] + [round(score, 2) for score in scores[i].tolist()])
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweeps config.py difficulty parameters over a route corpus. Metrics are extracted once "
+                    "(and cached), then every parameter set is scored with the batch scorer in parallel.")
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS, help="folder of GPX/TCX/FIT files")
+    parser.add_argument('--grid', action='append', metavar='NAME=V1,V2,...',
+                        help="values to try for a parameter; the sweep is every combination (repeatable)")
+    parser.add_argument('--range', action='append', metavar='NAME=LOW:HIGH',
+                        help="range to sample a parameter from with --random (repeatable)")
+    parser.add_argument('--random', type=int, default=0, metavar='N', help="number of random parameter sets")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (defaults to the CPU count)")
+    parser.add_argument('--top', type=int, default=10, help="parameter sets to list, most stable ranking first")
+    parser.add_argument('--output', default='sweep_scores.csv', help="CSV of every set's parameters and scores")
+    args = parser.parse_args()
+
+    try:
+        grid = _parse_assignments(args.grid, lambda spec: [float(v) for v in spec.split(',')])
+        ranges = _parse_assignments(args.range, lambda spec: tuple(float(v) for v in spec.split(':', 1)))
+        if grid and args.random:
+            parser.error("use either --grid or --random/--range, not both")
+        if args.random and not ranges:
+            parser.error("--random needs at least one --range")
+        parameter_sets = random_parameter_sets(ranges, args.random, args.seed) if args.random \
+            else grid_parameter_sets(grid)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+    if not grid and not args.random:
+        parser.error("give at least one --grid, or --random with --range")
+
+    paths = sorted(path for ext in ('gpx', 'tcx', 'fit') for path in glob.glob(os.path.join(args.corpus, f'*.{ext}')))
+    if not paths:
+        print(f"No route files found in {args.corpus}")
+        return
+
+    start = time.perf_counter()
+    names, columns = load_corpus_metrics(paths, args.workers)
+    print(f"Loaded metrics for {len(names)} of {len(paths)} routes in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    baseline_scores = _score_chunk([{}], columns)[0]
+    scores = score_parameter_sets(columns, parameter_sets, args.workers)
+    spearman, max_rank_shift = ranking_stability(scores, baseline_scores)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {len(parameter_sets)} parameter sets x {len(names)} routes in {elapsed:.2f}s")
+
+    _write_scores_csv(args.output, names, parameter_sets, scores, spearman, max_rank_shift)
+    print(f"Wrote per-route scores to {args.output}")
+
+    print(f"\nMost stable rankings vs current config.py (Spearman, max rank shift, score range):")
+    for i in np.argsort(-spearman, kind='stable')[:args.top]:
+        print(f"  set {i:5d}: {spearman[i]:.4f}  {max_rank_shift[i]:4d}  "
+              f"{scores[i].min():8.2f} - {scores[i].max():8.2f}  {parameter_sets[i]}")
+
+if __name__ == '__main__':
+    main()
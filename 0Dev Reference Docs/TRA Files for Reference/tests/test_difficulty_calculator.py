@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import config
+from difficulty_calculator import calculate_total_difficulties, calculate_total_difficulty
+from rescore_routes import rescore_updates
+
+
+def _random_metrics(n, seed=0):
+    """Metric columns spanning both sides of every threshold, including zero and negative distances."""
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(-5, 300, n), rng.uniform(0, 5000, n), rng.uniform(0, 15, n),
+            rng.uniform(0, 50, n), rng.uniform(0, 1, n), rng.uniform(-10, 10, n)]
+
+
+def _scalar_scores(columns):
+    return np.array([calculate_total_difficulty(*row) for row in zip(*(c.tolist() for c in columns))])
+
+
+# Test 1: Batch scores equal the scalar scores
+@pytest.mark.parametrize("overrides", [
+    {},
+    {"PDD_THRESHOLD": 1.0},
+    {"TARGET_ADG_FOR_MAX_REDUCTION": 3.0},
+    {"MAX_EXPECTED_TEGA": 0.0, "WEIGHT_TEGA": 0.9, "MIN_DIFFICULTY_SCORE": 20.0},
+], ids=["default", "pdd_threshold_one", "adg_target_at_min", "retuned"])
+def test_batch_scores_match_scalar(monkeypatch, overrides):
+    """
+    GIVEN metric columns for many routes and a config (as shipped, or retuned including degenerate denominators)
+    WHEN they are scored with calculate_total_difficulties
+    THEN each score should equal calculate_total_difficulty for that route.
+    """
+    for name, value in overrides.items():
+        monkeypatch.setattr(config, name, value)
+    columns = _random_metrics(5000)
+    columns[0][:3] = [0.0, -1.0, 1e-9]
+    columns[4][3:6] = [config.PDD_THRESHOLD, 1.0, 0.0]
+    columns[5][6:9] = [config.MIN_AVG_DESCENT_GRADIENT_THRESHOLD, config.TARGET_ADG_FOR_MAX_REDUCTION, 0.0]
+
+    batch = calculate_total_difficulties(*columns)
+    scalar = _scalar_scores(columns)
+    assert batch.shape == scalar.shape
+    assert batch == pytest.approx(scalar, rel=1e-14, abs=1e-12)
+    assert np.array_equal(np.round(batch, 2), np.round(scalar, 2))
+
+
+# Test 2: Re-score updates only for changed scores
+def test_rescore_updates():
+    """
+    GIVEN stored route documents with current, stale and missing scores, and one without metrics
+    WHEN rescore_updates builds the bulk_write operations
+    THEN only documents whose rounded score changed should be updated, and the one without metrics skipped.
+    """
+    summary = {"distance_km": 80.0, "TEGa": 1500.0, "ACg": 6.0, "MCg": 14.0, "PDD": 0.4, "ADg": 5.0}
+    score = round(calculate_total_difficulty(80.0, 1500.0, 6.0, 14.0, 0.4, 5.0), 2)
+    documents = [
+        {"_id": "current", "metrics_summary": summary, "difficulty_score": score},
+        {"_id": "stale", "metrics_summary": summary, "difficulty_score": score + 1},
+        {"_id": "unscored", "metrics_summary": summary},
+        {"_id": "no_metrics", "metrics_summary": {"distance_km": 10.0}},
+    ]
+    updates, skipped = rescore_updates(documents)
+    assert skipped == 1
+    assert [update._filter for update in updates] == [{"_id": "stale"}, {"_id": "unscored"}]
+    assert all(update._doc == {"$set": {"difficulty_score": score}} for update in updates)
+    assert rescore_updates([]) == ([], 0)
+
+
+# Test 3: Re-scored values round like the scores stored at ingest
+def test_rescore_rounds_like_ingest(monkeypatch):
+    """
+    GIVEN raw scores on half-way values, where np.round and Python round() disagree
+    WHEN rescore_updates compares them with scores stored as round(score, 2)
+    THEN no document should be reported as changed.
+    """
+    raw_scores = np.array([2.675, 1.005, 0.125, 8.345])
+    assert np.round(raw_scores, 2).tolist() != [round(score, 2) for score in raw_scores.tolist()]
+    monkeypatch.setattr("rescore_routes.calculate_total_difficulties", lambda *columns: raw_scores)
+    summary = {"distance_km": 80.0, "TEGa": 1500.0, "ACg": 6.0, "MCg": 14.0, "PDD": 0.4, "ADg": 5.0}
+    documents = [{"_id": i, "metrics_summary": summary, "difficulty_score": round(score, 2)}
+                 for i, score in enumerate(raw_scores.tolist())]
+    assert rescore_updates(documents) == ([], 0)
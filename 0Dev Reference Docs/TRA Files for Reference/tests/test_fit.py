@@ -0,0 +1,174 @@
+import contextlib
+import glob
+import io
+import math
+import os
+import struct
+import pytest
+from common.fit import FitDecodeError, decode_fit_track
+from metric_extractor import get_route_metrics
+
+
+ROUTE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'route_files_store', '*.gpx')))
+
+_CRC_TABLE = [0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+              0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400]
+
+
+def _fit_crc(data, crc=0):
+    """The FIT CRC-16, a nibble at a time."""
+    for byte in data:
+        for nibble in (byte & 0x0F, byte >> 4):
+            tmp = _CRC_TABLE[crc & 0x0F]
+            crc = ((crc >> 4) & 0x0FFF) ^ tmp ^ _CRC_TABLE[nibble]
+    return crc
+
+
+def _encode_fit(lats, lons, eles, course_name=None, big_endian=False, compressed_timestamps=False,
+                developer_field=False, enhanced_altitude=False):
+    """
+    Writes a FIT file holding the given points as record messages, the way a
+    device or route planner would. None coordinates or elevations are
+    written as FIT invalid values.
+    """
+    endian = '>' if big_endian else '<'
+    records = bytearray()
+
+    def define(local_type, global_num, fields, developer_fields=()):
+        header = 0x40 | local_type | (0x20 if developer_fields else 0)
+        records.extend(struct.pack(f'{endian}BBBHB', header, 0, 1 if big_endian else 0, global_num, len(fields)))
+        for field in fields:
+            records.extend(bytes(field))
+        if developer_fields:
+            records.append(len(developer_fields))
+            for field in developer_fields:
+                records.extend(bytes(field))
+
+    # file_id: type = activity (4) or course (6)
+    define(0, 0, [(0, 1, 0x00)])
+    records.extend(struct.pack('BB', 0, 6 if course_name else 4))
+    if course_name:
+        define(1, 31, [(5, 16, 0x07)])
+        records.append(1)
+        records.extend(course_name.encode('utf-8')[:15].ljust(16, b'\x00'))
+
+    altitude_field = (78, 4, 0x86) if enhanced_altitude else (2, 2, 0x84)
+    altitude_code, invalid_altitude = ('I', 0xFFFFFFFF) if enhanced_altitude else ('H', 0xFFFF)
+    record_fields = [(0, 4, 0x85), (1, 4, 0x85), altitude_field]
+    if not compressed_timestamps:
+        record_fields.insert(0, (253, 4, 0x86))
+    developer_fields = [(0, 1, 0)] if developer_field else []
+    define(2, 20, record_fields, developer_fields)
+
+    timestamp = 1_000_000_000
+    for i, (lat, lon, ele) in enumerate(zip(lats, lons, eles)):
+        lat_sc = 0x7FFFFFFF if lat is None else round(lat * 2**31 / 180)
+        lon_sc = 0x7FFFFFFF if lon is None else round(lon * 2**31 / 180)
+        altitude = invalid_altitude if ele is None else round((ele + 500) * 5)
+        if compressed_timestamps:
+            records.append(0x80 | (2 << 5) | (i & 0x1F))
+            records.extend(struct.pack(f'{endian}ii{altitude_code}', lat_sc, lon_sc, altitude))
+        else:
+            records.append(2)
+            records.extend(struct.pack(f'{endian}Iii{altitude_code}', timestamp + i, lat_sc, lon_sc, altitude))
+        if developer_field:
+            records.append(i & 0xFF)
+
+    header = bytearray(struct.pack('<BBHI4s', 14, 0x20, 2132, len(records), b'.FIT'))
+    header.extend(struct.pack('<H', _fit_crc(header)))
+    body = bytes(header) + bytes(records)
+    return body + struct.pack('<H', _fit_crc(body))
+
+
+def _gpx_columns(path):
+    """The GPX file's points as the extractor reads them, before any smoothing."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        track = get_route_metrics(path, 'gpx', apply_smoothing=False)["track_points"]
+    return track.lat.tolist(), track.lon.tolist(), [None if math.isnan(e) else e for e in track.ele.tolist()]
+
+
+# Test 1: FIT versions of the reference routes decode and score like the GPX originals
+@pytest.mark.parametrize("path", ROUTE_FILES[::10], ids=os.path.basename)
+def test_fit_matches_gpx_route(tmp_path, path):
+    """
+    GIVEN a reference GPX route re-encoded as a FIT course
+    WHEN it is decoded and scored with get_route_metrics
+    THEN points should match to FIT's resolution and the metrics should match the GPX ones closely.
+    """
+    lats, lons, eles = _gpx_columns(path)
+    fit_path = tmp_path / "route.fit"
+    fit_path.write_bytes(_encode_fit(lats, lons, eles, course_name="Test Course"))
+
+    name, fit_lats, fit_lons, fit_eles = decode_fit_track(fit_path.read_bytes())
+    assert name == "Test Course"
+    assert len(fit_lats) == len(lats)
+    assert max(abs(a - b) for a, b in zip(fit_lats, lats)) < 1e-7
+    assert max(abs(a - b) for a, b in zip(fit_lons, lons)) < 1e-7
+    assert all(math.isnan(f) if e is None else abs(f - e) <= 0.1 + 1e-9 for f, e in zip(fit_eles, eles))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        gpx_metrics = get_route_metrics(path, 'gpx')
+        fit_metrics = get_route_metrics(str(fit_path), 'fit')
+    assert fit_metrics["route_name"] == "Test Course"
+    assert fit_metrics["raw_points_count"] == gpx_metrics["raw_points_count"]
+    assert fit_metrics["distance_km"] == pytest.approx(gpx_metrics["distance_km"], rel=1e-4)
+    assert fit_metrics["TEGa"] == pytest.approx(gpx_metrics["TEGa"], rel=0.02, abs=1.0)
+
+
+# Test 2: Encoding variants
+@pytest.mark.parametrize("options", [
+    {"big_endian": True},
+    {"compressed_timestamps": True},
+    {"developer_field": True},
+    {"enhanced_altitude": True},
+], ids=lambda options: next(iter(options)))
+def test_fit_record_variants(options):
+    """
+    GIVEN records written big-endian, with compressed timestamp headers, with developer fields or with enhanced altitude
+    WHEN the file is decoded
+    THEN positioned records should be read, unpositioned ones skipped and missing altitudes NaN.
+    """
+    lats = [54.2, None, 54.201, 54.202]
+    lons = [-2.8, None, -2.801, -2.802]
+    eles = [100.4, 101.0, None, 104.0]
+    name, fit_lats, fit_lons, fit_eles = decode_fit_track(_encode_fit(lats, lons, eles, **options))
+    assert name is None
+    assert list(fit_lats) == pytest.approx([54.2, 54.201, 54.202], abs=1e-7)
+    assert list(fit_lons) == pytest.approx([-2.8, -2.801, -2.802], abs=1e-7)
+    assert fit_eles[0] == pytest.approx(100.4) and math.isnan(fit_eles[1]) and fit_eles[2] == pytest.approx(104.0)
+
+
+# Test 3: Chained FIT files
+def test_fit_chained_files():
+    """
+    GIVEN two FIT files concatenated into one
+    WHEN it is decoded
+    THEN the records of both should be read in order.
+    """
+    first = _encode_fit([54.2, 54.201], [-2.8, -2.801], [100.0, 101.0], course_name="Part One")
+    second = _encode_fit([54.202], [-2.802], [102.0], big_endian=True)
+    name, fit_lats, _, fit_eles = decode_fit_track(first + second)
+    assert name == "Part One"
+    assert list(fit_lats) == pytest.approx([54.2, 54.201, 54.202], abs=1e-7)
+    assert list(fit_eles) == pytest.approx([100.0, 101.0, 102.0])
+
+
+# Test 4: Files that aren't valid FIT
+def test_fit_invalid_files(tmp_path):
+    """
+    GIVEN a file that isn't FIT, and a truncated FIT file
+    WHEN they are decoded or scored
+    THEN FitDecodeError should be raised, and get_route_metrics should report a parse error with no points.
+    """
+    valid = _encode_fit([54.2, 54.201], [-2.8, -2.801], [100.0, 101.0])
+    with pytest.raises(FitDecodeError):
+        decode_fit_track(b'<?xml version="1.0"?><gpx/>')
+    with pytest.raises(FitDecodeError):
+        decode_fit_track(valid[:-8])
+
+    path = tmp_path / "broken.fit"
+    path.write_bytes(valid[:20])
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        metrics = get_route_metrics(str(path), 'fit')
+    assert metrics["route_name"] == "N/A (FIT Parse Error)"
+    assert metrics["raw_points_count"] == 0
@@ -0,0 +1,125 @@
+import contextlib
+import glob
+import io
+import os
+import random
+import numpy as np
+import pytest
+from incremental_metrics import IncrementalRouteMetrics
+from metric_extractor import get_route_metrics
+
+
+ROUTE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'route_files_store', '*.gpx')))
+METRIC_KEYS = ["distance_km", "TEGa", "TEGa_raw", "PDD", "MCg", "ACg", "ADg", "raw_points_count"]
+
+
+def _from_file(path, apply_smoothing=True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return IncrementalRouteMetrics.from_file(path, 'gpx', apply_smoothing)
+
+
+def _assert_same_metrics(actual, expected):
+    for key in METRIC_KEYS:
+        assert actual[key] == pytest.approx(expected[key], rel=1e-9, abs=1e-9), key
+
+
+def _random_edit(metrics, rng):
+    """Replaces, inserts or deletes a short run of points somewhere along the route, including at either end."""
+    n = len(metrics)
+    _random_edit_at(metrics, rng, rng.choice([0, n, rng.randrange(0, n + 1)]))
+
+
+def _random_edit_at(metrics, rng, start):
+    """Replaces, inserts or deletes a short run of points starting at `start`."""
+    n = len(metrics)
+    stop = min(n, start + rng.choice([0, 1, rng.randrange(0, 60)]))
+    count = rng.choice([0, 1, rng.randrange(0, 30)])
+    if n - (stop - start) + count < 2:
+        stop, count = start, 5
+    anchor = max(min(start, n - 1) - 1, 0)
+    step_lat, step_lon = rng.uniform(-3e-4, 3e-4), rng.uniform(-3e-4, 3e-4)
+    latitudes = metrics.lat[anchor] + step_lat * np.arange(1, count + 1)
+    longitudes = metrics.lon[anchor] + step_lon * np.arange(1, count + 1)
+    elevations = [None if rng.random() < 0.05 else rng.uniform(0, 500) for _ in range(count)]
+    metrics.splice(start, stop, latitudes, longitudes, elevations)
+
+
+# Test 1: A fresh build matches get_route_metrics
+@pytest.mark.parametrize("path", ROUTE_FILES[::8], ids=os.path.basename)
+def test_build_matches_get_route_metrics(path):
+    """
+    GIVEN a reference GPX route
+    WHEN incremental metrics are built from it
+    THEN every metric should match get_route_metrics to within rounding.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = get_route_metrics(path, 'gpx')
+    _assert_same_metrics(_from_file(path).metrics(), expected)
+
+
+# Test 2: Splices match a rebuild from the edited points
+@pytest.mark.parametrize("apply_smoothing", [True, False])
+@pytest.mark.parametrize("path", ROUTE_FILES[::16], ids=os.path.basename)
+def test_splices_match_rebuild(path, apply_smoothing):
+    """
+    GIVEN a reference route being edited with random replacements, insertions and deletions
+    WHEN the metrics are updated by splicing after each edit
+    THEN the smoothed elevations and partial aggregates should equal a fresh build of the edited points,
+    and every metric should match it to within rounding.
+    """
+    metrics = _from_file(path, apply_smoothing)
+    rng = random.Random(os.path.basename(path))
+    for _ in range(25):
+        _random_edit(metrics, rng)
+        fresh = IncrementalRouteMetrics(metrics.lat, metrics.lon, metrics.raw_ele, apply_smoothing)
+        _assert_same_metrics(metrics.metrics(), fresh.metrics())
+        for column in ('ele', '_seg_km', '_rises', '_climbs', '_descents'):
+            assert np.array_equal(getattr(metrics, column), getattr(fresh, column), equal_nan=True), column
+        assert np.asarray(metrics._mcg) == pytest.approx(np.asarray(fresh._mcg), rel=1e-9, abs=1e-9)
+
+
+# Test 3: Insert, delete and short routes
+def test_insert_delete_and_short_routes():
+    """
+    GIVEN a route edited with insert() and delete(), down to fewer points than the incremental path needs
+    WHEN metrics are read after each edit
+    THEN they should match a fresh build, a route of under two points should score zero, and a bad range should raise.
+    """
+    metrics = _from_file(ROUTE_FILES[0])
+    lat, lon, ele = metrics.lat[10], metrics.lon[10], metrics.raw_ele[10]
+    metrics.insert(10, [lat + 1e-4, lat + 2e-4], [lon, lon], [ele + 5, ele + 9])
+    _assert_same_metrics(metrics.metrics(), IncrementalRouteMetrics(metrics.lat, metrics.lon, metrics.raw_ele).metrics())
+
+    metrics.delete(40, len(metrics))
+    assert len(metrics) == 40
+    _assert_same_metrics(metrics.metrics(), IncrementalRouteMetrics(metrics.lat, metrics.lon, metrics.raw_ele).metrics())
+
+    metrics.delete(1, len(metrics))
+    assert metrics.metrics()["distance_km"] == 0.0 and metrics.metrics()["MCg"] == 0.0
+    with pytest.raises(IndexError):
+        metrics.delete(0, 5)
+    with pytest.raises(ValueError):
+        metrics.insert(0, [50.0], [0.0, 0.1], [10.0])
+
+
+# Test 4: Dragged points and edits clustered in one place
+@pytest.mark.parametrize("apply_smoothing", [True, False])
+def test_drags_and_clustered_edits_match_rebuild(apply_smoothing):
+    """
+    GIVEN a route whose points are dragged one at a time, then edited repeatedly around one place
+    WHEN the metrics are updated by splicing after each edit
+    THEN the points, smoothed elevations and metrics should equal a fresh build of the edited points.
+    """
+    metrics = _from_file(ROUTE_FILES[0], apply_smoothing)
+    rng = random.Random(4)
+    for _ in range(20):
+        index = rng.randrange(0, len(metrics))
+        metrics.splice(index, index + 1, [metrics.lat[index] + 1e-4], [metrics.lon[index]],
+                       [rng.uniform(0, 500)])
+    for _ in range(20):
+        index = len(metrics) // 2 + rng.randrange(-40, 40)
+        _random_edit_at(metrics, rng, index)
+    fresh = IncrementalRouteMetrics(metrics.lat, metrics.lon, metrics.raw_ele, apply_smoothing)
+    _assert_same_metrics(metrics.metrics(), fresh.metrics())
+    for column in ('lat', 'lon', 'raw_ele', 'ele', '_seg_km', '_climbs', '_descents'):
+        assert np.array_equal(getattr(metrics, column), getattr(fresh, column), equal_nan=True), column
@@ -0,0 +1,200 @@
+import contextlib
+import glob
+import io
+import math
+import os
+import numpy as np
+import pytest
+from lxml import etree
+import config
+from common.utils import haversine_distances
+from metric_extractor import TrackPoint, _calculate_mcg, _extract_track_from_tcx, get_route_metrics
+
+
+ROUTE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'route_files_store', '*.gpx')))
+TCX_ROUTE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'route_files_store', '*.tcx')))
+TCX_NAMESPACE = 'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2'
+
+ACTIVITY_TCX = f"""<?xml version="1.0" encoding="UTF-8"?>
+<TrainingCenterDatabase xmlns="{TCX_NAMESPACE}">
+  <Activities>
+    <Activity Sport="Biking">
+      <Id>2025-05-14T11:03:04Z</Id>
+      <Lap StartTime="2025-05-14T11:03:04Z">
+        <Track>
+          <Trackpoint><Time>2025-05-14T11:03:04Z</Time>
+            <Position><LatitudeDegrees>54.2</LatitudeDegrees><LongitudeDegrees>-2.8</LongitudeDegrees></Position>
+            <AltitudeMeters>100.5</AltitudeMeters></Trackpoint>
+          <Trackpoint><Time>2025-05-14T11:03:10Z</Time><AltitudeMeters>101.0</AltitudeMeters></Trackpoint>
+          <Trackpoint><Time>2025-05-14T11:03:16Z</Time>
+            <Position><LatitudeDegrees>54.201</LatitudeDegrees><LongitudeDegrees>-2.801</LongitudeDegrees></Position></Trackpoint>
+        </Track>
+      </Lap>
+      <Lap StartTime="2025-05-14T11:04:00Z">
+        <Track>
+          <Trackpoint><Time>2025-05-14T11:04:00Z</Time>
+            <Position><LatitudeDegrees>54.202</LatitudeDegrees><LongitudeDegrees>-2.802</LongitudeDegrees></Position>
+            <AltitudeMeters>104.0</AltitudeMeters></Trackpoint>
+        </Track>
+      </Lap>
+    </Activity>
+  </Activities>
+</TrainingCenterDatabase>
+"""
+
+
+def _reference_mcg(points, segment_distances_km):
+    """The original nested-loop MCg, kept as the oracle for the sliding-window version."""
+    mcg_metric = 0.0
+    if len(points) < 2: return mcg_metric
+    for i in range(len(points) - 1):
+        current_segment_dist_m = 0.0
+        end_point_idx = i
+        for j in range(i + 1, len(points)):
+            dist_between_m = segment_distances_km[j-1] * 1000
+            if current_segment_dist_m + dist_between_m <= config.MCG_SEGMENT_TARGET_DISTANCE_M:
+                current_segment_dist_m += dist_between_m
+                end_point_idx = j
+            else:
+                if dist_between_m > 0 and current_segment_dist_m == 0:
+                    current_segment_dist_m = dist_between_m
+                    end_point_idx = j
+                break
+        if end_point_idx > i and current_segment_dist_m >= config.MIN_DIST_FOR_MCG_GRADIENT_CALC_M:
+            start_ele, end_ele = points[i].elevation, points[end_point_idx].elevation
+            if start_ele is not None and end_ele is not None and end_ele - start_ele > 0:
+                mcg_metric = max(mcg_metric, (end_ele - start_ele) / current_segment_dist_m * 100.0)
+    return mcg_metric
+
+
+def _mcg(points, segment_distances_km):
+    """Calls _calculate_mcg with the arrays get_route_metrics builds from the points."""
+    elevations = np.array([np.nan if p.elevation is None else p.elevation for p in points], dtype=np.float64)
+    return _calculate_mcg(elevations, np.asarray(segment_distances_km, dtype=np.float64) * 1000)
+
+
+def _points_and_segments(path):
+    """Returns the smoothed points and segment distances get_route_metrics computes MCg from."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = get_route_metrics(path, 'gpx')
+    track = metrics["track_points"]
+    points = [TrackPoint(lat, lon, None if math.isnan(ele) else ele)
+              for lat, lon, ele in zip(track.lat.tolist(), track.lon.tolist(), track.ele.tolist())]
+    return metrics, points, haversine_distances(track.lat, track.lon).tolist()
+
+
+# Test 1: Identical MCg on every reference route
+@pytest.mark.parametrize("path", ROUTE_FILES, ids=os.path.basename)
+def test_mcg_matches_reference_on_route_files(path):
+    """
+    GIVEN a GPX file from the reference route store
+    WHEN MCg is computed with the sliding-window implementation
+    THEN it should equal the original nested-loop result exactly, both directly and via get_route_metrics.
+    """
+    metrics, points, segments = _points_and_segments(path)
+    expected = _reference_mcg(points, segments)
+    assert _mcg(points, segments) == expected
+    assert metrics["MCg"] == expected
+
+
+# Test 2: Identical MCg on synthetic edge cases
+@pytest.mark.parametrize("segments_km, elevations", [
+    # Segments that sum to exactly the target and minimum distances
+    ([0.025] * 12, [0, 1, 3, 4, 8, 9, 9, 12, 15, 15, 16, 20, 21]),
+    # Segments that don't add up exactly in floating point
+    ([0.1 / 3] * 12, [0, 2, 3, 5, 8, 9, 9, 12, 15, 14, 16, 20, 26]),
+    # A segment longer than the target, and zero-length segments before it
+    ([0.0, 0.0, 0.15, 0.02, 0.0, 0.06, 0.12], [10, 10, 10, 25, 26, 26, 30, 42]),
+    # Missing elevations
+    ([0.03] * 6, [0, None, 5, 9, None, 14, 20]),
+    # Only descents
+    ([0.03] * 6, [50, 45, 40, 35, 30, 25, 20]),
+])
+def test_mcg_matches_reference_on_edge_cases(segments_km, elevations):
+    """
+    GIVEN synthetic segments that hit the window thresholds exactly, or are zero, long, or missing elevation
+    WHEN MCg is computed with the sliding-window implementation
+    THEN it should equal the original nested-loop result exactly.
+    """
+    points = [TrackPoint(50.0, 0.0, ele) for ele in elevations]
+    assert _mcg(points, segments_km) == _reference_mcg(points, segments_km)
+
+
+# Test 3: Degenerate tracks
+def test_mcg_short_tracks():
+    """
+    GIVEN tracks with fewer than two points
+    WHEN MCg is computed
+    THEN it should be 0.0.
+    """
+    assert _mcg([], []) == 0.0
+    assert _mcg([TrackPoint(50.0, 0.0, 10.0)], []) == 0.0
+
+
+def _reference_tcx_course_points(path):
+    """Trackpoints of the first Course read from the full tree, as the old objectify fallback did."""
+    ns = {'tcx': TCX_NAMESPACE}
+    course = etree.parse(path).getroot().xpath('//tcx:Courses/tcx:Course', namespaces=ns)[0]
+    points = []
+    for tp in course.xpath('.//tcx:Trackpoint[tcx:Position]', namespaces=ns):
+        ele = tp.findtext('tcx:AltitudeMeters', namespaces=ns)
+        points.append((float(tp.findtext('tcx:Position/tcx:LatitudeDegrees', namespaces=ns)),
+                       float(tp.findtext('tcx:Position/tcx:LongitudeDegrees', namespaces=ns)),
+                       float(ele) if ele else None))
+    return course.findtext('tcx:Name', namespaces=ns), points
+
+
+# Test 4: Streaming TCX reader on course files
+@pytest.mark.parametrize("path", TCX_ROUTE_FILES, ids=os.path.basename)
+def test_tcx_course_matches_full_tree_parse(path):
+    """
+    GIVEN a TCX course file from the reference route store
+    WHEN it is read with the streaming TCX reader and scored with get_route_metrics
+    THEN the name and points should match a full-tree parse of the first Course, and metrics should be computed.
+    """
+    expected_name, expected_points = _reference_tcx_course_points(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        name, track = _extract_track_from_tcx(path)
+        metrics = get_route_metrics(path, 'tcx')
+    assert name == expected_name
+    assert [(lat, lon, None if math.isnan(ele) else ele)
+            for lat, lon, ele in zip(track.lat.tolist(), track.lon.tolist(), track.ele.tolist())] == expected_points
+    assert metrics["route_name"] == expected_name
+    assert metrics["raw_points_count"] == len(expected_points)
+    assert metrics["distance_km"] > 0 and metrics["TEGa"] > 0
+
+
+# Test 5: Streaming TCX reader on activities
+def test_tcx_activity_across_laps(tmp_path):
+    """
+    GIVEN a TCX activity with two laps, a point without a position and a point without an altitude
+    WHEN it is read with the streaming TCX reader
+    THEN points from every lap should be read, the position-less point skipped and the missing altitude NaN.
+    """
+    path = tmp_path / "activity.tcx"
+    path.write_text(ACTIVITY_TCX)
+    with contextlib.redirect_stdout(io.StringIO()):
+        name, track = _extract_track_from_tcx(str(path))
+    assert name == "TCX Activity: biking"
+    assert track.lat.tolist() == [54.2, 54.201, 54.202]
+    assert track.lon.tolist() == [-2.8, -2.801, -2.802]
+    assert track.ele[0] == 100.5 and math.isnan(track.ele[1]) and track.ele[2] == 104.0
+
+
+# Test 6: Unreadable TCX files
+@pytest.mark.parametrize("content, expected_name", [
+    ('<TrainingCenterDatabase><Activities><Activity>', "N/A (TCX Parse Error)"),
+    (f'<TrainingCenterDatabase xmlns="{TCX_NAMESPACE}"><Folders/></TrainingCenterDatabase>', "N/A (No Points in TCX)"),
+])
+def test_tcx_unreadable_files(tmp_path, content, expected_name):
+    """
+    GIVEN a truncated TCX file, or one with no activities or courses
+    WHEN it is scored with get_route_metrics
+    THEN it should be reported by name with no points rather than raising.
+    """
+    path = tmp_path / "broken.tcx"
+    path.write_text(content)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        metrics = get_route_metrics(str(path), 'tcx')
+    assert metrics["raw_points_count"] == 0
+    assert metrics["route_name"] == expected_name
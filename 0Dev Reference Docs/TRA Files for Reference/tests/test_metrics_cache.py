@@ -0,0 +1,118 @@
+import contextlib
+import glob
+import io
+import os
+import shutil
+import time
+import numpy as np
+import config
+import metrics_cache
+from metrics_cache import MetricsCache, get_route_metrics_cached
+from metric_extractor import get_route_metrics
+
+
+ROUTE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'route_files_store', '*.gpx')))
+
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def _fail_extraction(*args, **kwargs):
+    raise AssertionError("get_route_metrics should not run on a cache hit")
+
+
+# Test 1: A re-processed file is served from the cache unchanged
+def test_cache_hit_returns_same_metrics(tmp_path, monkeypatch):
+    """
+    GIVEN a route processed once through get_route_metrics_cached
+    WHEN a copy of the same file is processed again
+    THEN the metrics and track should equal a fresh extraction, without running extraction.
+    """
+    cache = MetricsCache(str(tmp_path / "cache"), max_age_seconds=3600, max_bytes=1 << 30)
+    expected = _quiet(get_route_metrics, ROUTE_FILES[0], 'gpx')
+    _quiet(get_route_metrics_cached, ROUTE_FILES[0], 'gpx', cache=cache)
+
+    copy_path = tmp_path / "reuploaded.gpx"
+    shutil.copyfile(ROUTE_FILES[0], copy_path)
+    monkeypatch.setattr(metrics_cache, "get_route_metrics", _fail_extraction)
+    cached = _quiet(get_route_metrics_cached, str(copy_path), 'gpx', cache=cache)
+
+    assert {k: v for k, v in cached.items() if k != "track_points"} == \
+           {k: v for k, v in expected.items() if k != "track_points"}
+    for column in ("lat", "lon", "ele", "dist"):
+        assert np.array_equal(getattr(cached["track_points"], column), getattr(expected["track_points"], column),
+                              equal_nan=True)
+
+
+# Test 2: Parser version, config and smoothing changes are misses
+def test_cache_key_changes(tmp_path, monkeypatch):
+    """
+    GIVEN the same file bytes
+    WHEN the extraction config, METRICS_VERSION or the smoothing flag changes
+    THEN the cache key should change, while a difficulty-only config change should keep it.
+    """
+    cache = MetricsCache(str(tmp_path), max_age_seconds=3600, max_bytes=1 << 30)
+    data = b"<gpx/>"
+    key = cache.key(data, 'gpx')
+    assert cache.key(data, 'gpx') == key
+    assert cache.key(data + b" ", 'gpx') != key
+    assert cache.key(data, 'gpx', apply_smoothing=False) != key
+
+    monkeypatch.setattr(config, "MAX_EXPECTED_TEGA", config.MAX_EXPECTED_TEGA + 1)
+    assert cache.key(data, 'gpx') == key
+    monkeypatch.setattr(config, "SMOOTHING_WINDOW_SIZE", config.SMOOTHING_WINDOW_SIZE + 2)
+    changed_config_key = cache.key(data, 'gpx')
+    assert changed_config_key != key
+    monkeypatch.setattr(metrics_cache, "METRICS_VERSION", metrics_cache.METRICS_VERSION + 1)
+    assert cache.key(data, 'gpx') not in (key, changed_config_key)
+
+
+# Test 3: Eviction by age and by size
+def test_cache_eviction(tmp_path):
+    """
+    GIVEN a cache holding several entries of different ages
+    WHEN evict() runs
+    THEN entries past the maximum age should go first, then the least recently used until under the size limit.
+    """
+    cache = MetricsCache(str(tmp_path), max_age_seconds=3600, max_bytes=1 << 30)
+    metrics = _quiet(get_route_metrics, ROUTE_FILES[0], 'gpx')
+    now = time.time()
+    for n, age in enumerate([7200, 1800, 600, 60]):
+        cache.put(f"entry{n}", metrics)
+        os.utime(cache._path(f"entry{n}"), (now - age, now - age))
+    entry_size = os.path.getsize(cache._path("entry3"))
+
+    # put() already evicted entry0 once entry1 was written
+    assert sorted(os.listdir(tmp_path)) == ["entry1.npz", "entry2.npz", "entry3.npz"]
+
+    assert cache.get("entry1") is not None  # refreshes entry1, so entry2 is now the oldest
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["entry1.npz", "entry3.npz"]
+
+
+# Test 4: Failed extractions and unreadable entries
+def test_cache_skips_failures(tmp_path):
+    """
+    GIVEN a file that fails to parse, and a corrupt cache entry
+    WHEN they are looked up
+    THEN the failure should not be cached, and the corrupt entry should be discarded and re-extracted.
+    """
+    cache = MetricsCache(str(tmp_path / "cache"), max_age_seconds=3600, max_bytes=1 << 30)
+    broken = tmp_path / "broken.gpx"
+    broken.write_text("<gpx")
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        metrics = get_route_metrics_cached(str(broken), 'gpx', cache=cache)
+    assert not metrics["track_points"]
+    assert not os.path.exists(cache.folder) or not os.listdir(cache.folder)
+
+    with open(ROUTE_FILES[0], 'rb') as f:
+        key = cache.key(f.read(), 'gpx')
+    os.makedirs(cache.folder, exist_ok=True)
+    with open(cache._path(key), 'wb') as f:
+        f.write(b"not an npz file")
+    metrics = _quiet(get_route_metrics_cached, ROUTE_FILES[0], 'gpx', cache=cache)
+    assert metrics["raw_points_count"] > 0
+    assert cache.get(key) is not None
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import config
+from difficulty_calculator import calculate_total_difficulty
+from sweep_difficulty import (grid_parameter_sets, random_parameter_sets, ranking_stability,
+                              score_parameter_sets)
+
+
+def _corpus_columns(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.array([rng.uniform(10, 250, n), rng.uniform(0, 4500, n), rng.uniform(0, 12, n),
+                     rng.uniform(0, 40, n), rng.uniform(0.3, 0.8, n), rng.uniform(0, 9, n)])
+
+
+# Test 1: Grid and random parameter sets
+def test_parameter_set_generation():
+    """
+    GIVEN a grid of parameter values and sampling ranges
+    WHEN parameter sets are generated
+    THEN the grid should give every combination, random sets should stay in range and repeat per seed,
+    and unknown parameter names should be rejected.
+    """
+    sets = grid_parameter_sets({"LINEAR_UF_SLOPE": [0.8, 1.2], "WEIGHT_TEGA": [0.4, 0.5, 0.6]})
+    assert len(sets) == 6
+    assert {"LINEAR_UF_SLOPE": 1.2, "WEIGHT_TEGA": 0.4} in sets
+
+    sampled = random_parameter_sets({"MAX_EXPECTED_MCG": (20.0, 60.0)}, 100, seed=3)
+    assert len(sampled) == 100 and all(20.0 <= s["MAX_EXPECTED_MCG"] < 60.0 for s in sampled)
+    assert sampled == random_parameter_sets({"MAX_EXPECTED_MCG": (20.0, 60.0)}, 100, seed=3)
+
+    with pytest.raises(ValueError):
+        grid_parameter_sets({"SMOOTHING_WINDOW_SIZE": [5, 7]})
+
+
+# Test 2: Swept scores equal scoring with config.py set to each parameter set
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_scores_match_scalar(monkeypatch, workers):
+    """
+    GIVEN a corpus of route metrics and more parameter sets than fit in one worker chunk
+    WHEN the sets are scored serially or in worker processes
+    THEN each row should equal calculate_total_difficulty with config.py set to that parameter set,
+    and config.py should be left unchanged.
+    """
+    columns = _corpus_columns()
+    parameter_sets = random_parameter_sets({"LINEAR_UF_SLOPE": (0.6, 1.4), "PDD_THRESHOLD": (0.4, 0.7)}, 150, seed=1)
+    original_slope = config.LINEAR_UF_SLOPE
+    scores = score_parameter_sets(columns, parameter_sets, workers=workers)
+    assert scores.shape == (150, columns.shape[1])
+    assert config.LINEAR_UF_SLOPE == original_slope
+
+    for row in (0, 77, 149):
+        for name, value in parameter_sets[row].items():
+            monkeypatch.setattr(config, name, value)
+        expected = [calculate_total_difficulty(*route) for route in columns.T.tolist()]
+        assert scores[row] == pytest.approx(expected, rel=1e-12)
+        monkeypatch.undo()
+
+
+# Test 3: Ranking stability
+def test_ranking_stability():
+    """
+    GIVEN baseline scores, the same order rescaled, the order reversed and one pair swapped
+    WHEN ranking stability is measured
+    THEN Spearman should be 1, -1 and just under 1, with the matching maximum rank shifts.
+    """
+    baseline = np.array([10.0, 20.0, 30.0, 40.0, 50.0])
+    scores = np.array([baseline * 2 + 1, baseline[::-1], [10.0, 30.0, 20.0, 40.0, 50.0]])
+    spearman, max_rank_shift = ranking_stability(scores, baseline)
+    assert spearman == pytest.approx([1.0, -1.0, 0.9])
+    assert max_rank_shift.tolist() == [0, 4, 1]
@@ -0,0 +1,197 @@
+import glob
+import math
+import os
+import random
+import numpy as np
+import pytest
+from common.utils import (haversine_distance, haversine_distances, get_smoothed_elevations, smooth_elevations,
+                          savitzky_golay_coefficients)
+from metric_extractor import get_route_metrics
+
+ROUTE_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'route_files_store', '*.gpx')))
+
+
+# A short ride along the Sussex coast, with one point missing its coordinates
+LATS = [50.8225, 50.8214, 50.8301, 50.8412, None, 50.8500]
+LONS = [-0.1446, -0.1478, -0.1302, -0.1101, None, -0.0950]
+
+
+
+def _reference_smoothed_elevations(original_elevations, window_size):
+    """The original per-window moving average, kept as the oracle for the vectorised version."""
+    if not original_elevations or window_size < 2 or len(original_elevations) < window_size:
+        return list(original_elevations)
+    smoothed_elevations = list(original_elevations)
+    half_window = window_size // 2
+    for i in range(half_window, len(original_elevations) - half_window):
+        window_values = original_elevations[i - half_window : i + half_window + 1]
+        valid_window_values = [v for v in window_values if isinstance(v, (int, float))]
+        if len(valid_window_values) == window_size:
+            smoothed_elevations[i] = sum(valid_window_values) / len(valid_window_values)
+    return smoothed_elevations
+
+
+def _elevation_profile(n, seed, gap_every=None):
+    """A random climb-and-descend profile to two decimals, with None every `gap_every` points and a flat stretch."""
+    rng = random.Random(seed)
+    elevations, ele = [], 100.0
+    for i in range(n):
+        ele = ele if n // 3 <= i < n // 2 else round(ele + rng.uniform(-2.5, 2.5), 2)
+        elevations.append(None if gap_every and i % gap_every == gap_every - 1 else ele)
+    return elevations
+
+
+def _assert_matches_scalar(lats, lons):
+    batched = haversine_distances(lats, lons)
+    assert len(batched) == len(lats) - 1
+    scalar = [haversine_distance(lats[i], lons[i], lats[i + 1], lons[i + 1]) for i in range(len(lats) - 1)]
+    np.testing.assert_allclose(batched, scalar, rtol=1e-8, atol=0)
+
+
+# Test 1: Batched kernel matches the scalar function within its documented tolerance
+@pytest.mark.skipif(not ROUTE_FILES, reason="no reference GPX files")
+def test_haversine_distances_matches_scalar():
+    """
+    GIVEN the short segments of real recorded routes, and random pairs of points anywhere on the globe
+    WHEN segment distances are computed in one batched call
+    THEN each value should match haversine_distance for that pair to a relative 1e-8.
+    """
+    for path in ROUTE_FILES[:3]:
+        track = get_route_metrics(path, 'gpx')["track_points"]
+        _assert_matches_scalar(track.lat.tolist(), track.lon.tolist())
+
+    rng = np.random.default_rng(0)
+    _assert_matches_scalar(rng.uniform(-90, 90, 20000).tolist(), rng.uniform(-180, 180, 20000).tolist())
+
+
+# Test 2: Missing coordinates give zero-length segments
+def test_haversine_distances_missing_coordinates():
+    """
+    GIVEN a track where one point has no coordinates
+    WHEN segment distances are computed
+    THEN both segments touching that point should be 0.0 and the rest positive.
+    """
+    batched = haversine_distances(LATS, LONS)
+    assert batched[3] == 0.0 and batched[4] == 0.0
+    assert all(d > 0 for d in batched[:3])
+    assert not any(math.isnan(d) for d in batched)
+
+
+# Test 3: Degenerate tracks
+def test_haversine_distances_short_tracks():
+    """
+    GIVEN tracks with fewer than two points
+    WHEN segment distances are computed
+    THEN an empty result should be returned.
+    """
+    assert len(haversine_distances([], [])) == 0
+    assert len(haversine_distances([50.0], [0.0])) == 0
+
+
+# Test 4: Moving average matches the original loop
+@pytest.mark.parametrize("window_size", [3, 4, 5, 6, 7, 15, 31])
+@pytest.mark.parametrize("gap_every", [None, 11, 40])
+def test_moving_average_matches_reference(window_size, gap_every):
+    """
+    GIVEN an elevation profile, with and without missing values
+    WHEN it is smoothed with the default moving average
+    THEN the list and array versions should both equal the original per-window loop exactly.
+    """
+    elevations = _elevation_profile(2000, seed=window_size, gap_every=gap_every)
+    expected = _reference_smoothed_elevations(elevations, window_size)
+    assert get_smoothed_elevations(elevations, window_size) == expected
+    array_result = smooth_elevations(elevations, window_size)
+    assert [None if math.isnan(v) else v for v in array_result.tolist()] == expected
+
+
+# Test 5: Edge and missing-value semantics
+def test_smoothing_edges_and_gaps():
+    """
+    GIVEN short lists, ints, and values that aren't numbers
+    WHEN they are smoothed
+    THEN edge points, points near a gap and non-numbers should be returned unchanged.
+    """
+    assert get_smoothed_elevations([], 7) == []
+    assert get_smoothed_elevations([1, 2, 3], 7) == [1, 2, 3]
+    assert get_smoothed_elevations([1, 2, 3, 4, 5], 1) == [1, 2, 3, 4, 5]
+    values = [10, 20, 30, 40, 'n/a', 60, 70, 80, 90]
+    assert get_smoothed_elevations(values, 3) == [10, 20.0, 30.0, 40, 'n/a', 60, 70.0, 80.0, 90]
+    assert get_smoothed_elevations(values, 3) == _reference_smoothed_elevations(values, 3)
+    # Even windows behave as the original loop did: a gap-free profile is left unsmoothed,
+    # and a point is averaged only when its window_size + 1 span has exactly one gap
+    gap_free = [1.0, 5.0, 2.0, 8.0, 3.0, 9.0, 4.0]
+    assert get_smoothed_elevations(gap_free, 6) == gap_free
+    assert smooth_elevations(gap_free, 6).tolist() == gap_free
+    assert get_smoothed_elevations(values, 6) == _reference_smoothed_elevations(values, 6) != values
+    assert get_smoothed_elevations(values, 2) == _reference_smoothed_elevations(values, 2)
+    with pytest.raises(ValueError):
+        smooth_elevations(gap_free, 6, 'median')
+
+
+# Test 6: Wide windows use the running sum
+def test_moving_average_wide_window():
+    """
+    GIVEN a long profile and a window wider than the exact-summing limit
+    WHEN it is smoothed with the moving average
+    THEN each value should match the original loop to within rounding.
+    """
+    elevations = _elevation_profile(5000, seed=1, gap_every=300)
+    expected = _reference_smoothed_elevations(elevations, 101)
+    actual = get_smoothed_elevations(elevations, 101)
+    assert [e is None for e in expected] == [a is None for a in actual]
+    assert all(a == pytest.approx(e, abs=1e-9) for a, e in zip(actual, expected) if e is not None)
+
+
+# Test 7: Median and Savitzky-Golay smoothers
+def test_median_and_savitzky_golay_smoothers():
+    """
+    GIVEN an elevation profile with gaps
+    WHEN it is smoothed with the median and Savitzky-Golay smoothers
+    THEN full interior windows should hold the window median / the centre of a least-squares polynomial fit,
+    and every other point its original value.
+    """
+    elevations = _elevation_profile(400, seed=2, gap_every=37)
+    window_size, half_window = 9, 4
+    median = smooth_elevations(elevations, window_size, 'median')
+    savgol = smooth_elevations(elevations, window_size, 'savitzky_golay', polyorder=3)
+    offsets = np.arange(-half_window, half_window + 1)
+    for i, ele in enumerate(elevations):
+        window = elevations[max(0, i - half_window):i + half_window + 1]
+        if half_window <= i < len(elevations) - half_window and None not in window:
+            assert median[i] == np.median(window)
+            assert savgol[i] == pytest.approx(np.polyval(np.polyfit(offsets, window, 3), 0), abs=1e-9)
+        else:
+            assert (math.isnan(median[i]) and math.isnan(savgol[i])) if ele is None else median[i] == savgol[i] == ele
+
+
+# Test 8: Savitzky-Golay weights and bad settings
+def test_savitzky_golay_coefficients_and_errors():
+    """
+    GIVEN Savitzky-Golay settings
+    WHEN the convolution weights are built, or an invalid smoother is asked for
+    THEN the weights should match the textbook 5-point quadratic ones, and bad settings should raise ValueError.
+    """
+    assert savitzky_golay_coefficients(5, 2) == pytest.approx(np.array([-3, 12, 17, 12, -3]) / 35)
+    with pytest.raises(ValueError):
+        smooth_elevations([1.0] * 10, 5, 'gaussian')
+    with pytest.raises(ValueError):
+        smooth_elevations([1.0] * 10, 5, 'savitzky_golay', polyorder=5)
+
+
+# Test 9: Wide median windows use the sorted running window
+@pytest.mark.parametrize("window_size", [31, 33, 101])
+def test_wide_median_window(window_size):
+    """
+    GIVEN a long profile with gaps and median windows on both sides of the running-median threshold
+    WHEN it is smoothed with the median smoother
+    THEN full interior windows should hold exactly the window median, and every other point its original value.
+    """
+    elevations = _elevation_profile(3000, seed=window_size, gap_every=700)
+    half_window = window_size // 2
+    median = smooth_elevations(elevations, window_size, 'median')
+    for i, ele in enumerate(elevations):
+        window = elevations[max(0, i - half_window):i + half_window + 1]
+        if half_window <= i < len(elevations) - half_window and None not in window:
+            assert median[i] == np.median(window)
+        else:
+            assert math.isnan(median[i]) if ele is None else median[i] == ele
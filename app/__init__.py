@@ -7,6 +7,10 @@ from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 from flask_mail import Mail
 from config import config
+from .utils.route_cache import RouteCache
+from .utils.route_artifacts import RouteProfile
+from .utils.query_stats import QueryCounter
+from .utils.hotel_index import HotelIndex
 import markdown
 
 mongo = PyMongo()
@@ -15,6 +19,9 @@ login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 mail = Mail()
+route_cache = RouteCache(value_type=RouteProfile)
+query_counter = QueryCounter()
+hotel_index = HotelIndex()
 
 def create_app(config_name):
     """
@@ -25,10 +32,13 @@ def create_app(config_name):
     config[config_name].init_app(app)
 
     # Initialize extensions
-    mongo.init_app(app)
+    mongo.init_app(app, event_listeners=[query_counter])
     bcrypt.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
+    route_cache.init_app(app)
+    query_counter.init_app(app)
+    hotel_index.init_app(app)
     
     # MOVED: These are moved inside the factory to prevent circular imports
     from .models import User
@@ -58,4 +68,12 @@ def create_app(config_name):
     from .blog import blog as blog_blueprint
     app.register_blueprint(blog_blueprint, url_prefix='/blog')
 
+    # Build the map's hotel index now rather than on the first map request
+    if app.config.get('HOTEL_INDEX_PRELOAD'):
+        from .services import load_map_hotels, hotels_version
+        try:
+            hotel_index.snapshot(load_map_hotels, hotels_version)
+        except Exception as e:
+            print(f"Error preloading hotel index: {e}")
+
     return app
@@ -4,12 +4,13 @@ import os
 import shortuuid
 import secrets
 import datetime
-from flask import render_template, request, flash, redirect, url_for, current_app, abort
+from flask import render_template, request, flash, redirect, url_for, current_app, abort, jsonify
 from flask_login import login_required
 from . import admin
-from .. import mongo
+from .. import mongo, route_cache, hotel_index
 from .forms import AddHotelForm, AddRouteForm, EditRouteForm, InviteHotelForm
-from ..utils.gpx_utils import parse_gpx_file
+from ..services import adjust_route_counts, archive_route, bump_hotels_version
+from ..utils.route_artifacts import ingest_route_file
 from werkzeug.utils import secure_filename
 
 @admin.route('/')
@@ -18,6 +19,12 @@ def dashboard():
     """Renders the admin dashboard."""
     return render_template('admin/dashboard.html')
 
+@admin.route('/cache-stats')
+@login_required
+def cache_stats():
+    """Returns hit/miss counters for the in-process caches as JSON."""
+    return jsonify({'route_cache': route_cache.stats(), 'hotel_tile_cache': hotel_index.tile_cache.stats()})
+
 # --- Hotel Management ---
 
 @admin.route('/manage-hotels')
@@ -52,9 +59,12 @@ def add_hotel():
             'star_rating': form.star_rating.data,
             'price_range': form.price_range.data,
             'google_rating': float(form.google_rating.data) if form.google_rating.data else None,
-            'facilities': form.facilities.data
+            'facilities': form.facilities.data,
+            'route_count': 0,
+            'active_route_count': 0
         }
         mongo.db.hotels.insert_one(new_hotel)
+        bump_hotels_version()
         flash('Hotel added successfully!', 'success')
         return redirect(url_for('admin.manage_hotels'))
 
@@ -89,6 +99,7 @@ def edit_hotel(hotel_id):
         }
 
         mongo.db.hotels.update_one({'_id': hotel_id}, {'$set': update_data})
+        bump_hotels_version()
         flash('Hotel updated successfully!', 'success')
         return redirect(url_for('admin.manage_hotels'))
 
@@ -110,6 +121,7 @@ def edit_hotel(hotel_id):
 def delete_hotel(hotel_id):
     """Soft deletes a hotel by setting its status to 'offline'."""
     mongo.db.hotels.update_one({'_id': hotel_id}, {'$set': {'status': 'offline'}})
+    bump_hotels_version()
     flash('Hotel has been set to offline.', 'success')
     return redirect(url_for('admin.manage_hotels'))
 
@@ -133,9 +145,8 @@ def add_route(hotel_id):
         # Save the file
         gpx_file.save(file_path)
         
-        # Process the saved file
-        with open(file_path, 'r') as f:
-            route_data = parse_gpx_file(f)
+        # Process the saved file and write its profile artifact
+        route_data = ingest_route_file(file_path)
 
         new_route = {
             '_id': shortuuid.uuid(),
@@ -145,11 +156,12 @@ def add_route(hotel_id):
             'surface_type': form.surface_type.data,
             'gpx_file_path': os.path.join('uploads', 'routes', filename).replace("\\", "/"), # Store relative path
             'distance_km': route_data.get('distance_km', 0),
-            'elevation_m': route_data.get('elevation_gain_m', 0), # Use .get() with a default of 0
+            'elevation_m': route_data.get('elevation_m', 0), # Use .get() with a default of 0
             'difficulty': route_data.get('difficulty', 'moderate'), # Use .get() with a default
             'status': 'active'
         }
         mongo.db.routes.insert_one(new_route)
+        adjust_route_counts(hotel_id, total=1, active=1)
         flash('Route added successfully!', 'success')
         return redirect(url_for('admin.edit_hotel', hotel_id=hotel_id))
 
@@ -176,8 +188,7 @@ def edit_route(route_id):
             file_path = os.path.join(upload_folder, filename)
             gpx_file.save(file_path)
 
-            with open(file_path, 'r') as f:
-                route_data = parse_gpx_file(f)
+            route_data = ingest_route_file(file_path)
             
             update_data['gpx_file_path'] = os.path.join('uploads', 'routes', filename).replace("\\", "/")
             update_data['distance_km'] = route_data.get('distance_km', 0)
@@ -195,8 +206,9 @@ def edit_route(route_id):
 @login_required
 def delete_route(route_id):
     """Soft deletes a route by setting its status to 'archived'."""
-    route = mongo.db.routes.find_one_or_404({'_id': route_id})
-    mongo.db.routes.update_one({'_id': route_id}, {'$set': {'status': 'archived'}})
+    route = archive_route(route_id)
+    if route is None:
+        abort(404)
     flash('Route has been archived.', 'success')
     return redirect(url_for('admin.edit_hotel', hotel_id=route['hotel_id']))
 
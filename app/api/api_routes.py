@@ -1,8 +1,15 @@
 # app/api/api_routes.py
 
+import math
+import os
 from flask import jsonify, request, abort, current_app
 from . import api
-from .. import mongo
+from .. import mongo, route_cache, hotel_index
+from ..services import hotels_version, load_map_hotels
+from ..utils.http_cache import cached_json_response
+from ..utils.route_artifacts import (DEFAULT_PROFILE_ZOOM, TRACK_FORMATS, clamp_chart_points,
+                                     load_route_profile, profile_artifact_path)
+from ..utils.simplify import level_for_zoom
 
 @api.route('/map-data')
 def get_map_data():
@@ -25,45 +32,94 @@ def get_map_data():
 def get_hotels_in_view():
     """
     Retrieves hotels that are within the current visible map area.
-    Expects north, south, east, and west query parameters.
+    Expects north, south, east, and west query parameters. With an optional
+    zoom at or below HOTEL_CLUSTER_MAX_ZOOM, returns precomputed clusters
+    (centroid, count, featured count) instead of individual hotels. Both
+    are answered from the in-memory hotel index (see app/services.py). With
+    HOTEL_TILE_CACHE_ENABLED and a zoom, the view is widened to the map
+    tiles covering it, so responses are cached per tile and may include
+    hotels just outside the view.
     """
     try:
         north = float(request.args.get('north'))
         south = float(request.args.get('south'))
         east = float(request.args.get('east'))
         west = float(request.args.get('west'))
-    except (TypeError, ValueError):
+        zoom = request.args.get('zoom')
+        zoom = math.floor(float(zoom)) if zoom is not None else None
+    except (TypeError, ValueError, OverflowError):
         return abort(400, description="Invalid or missing bounding box coordinates.")
 
-    bounding_box = [[west, south], [east, north]]
-
     try:
-        query = {
-            'location': { '$geoWithin': { '$box': bounding_box } },
-            'status': 'approved'
-        }
-        # Define which fields to return
-        projection = {
-            'name': 1,
-            'location': 1,
-            'is_featured': 1,
-            'price_range': 1,
-            'accommodation_type': 1,
-            'facilities': 1
-        }
-        hotels_cursor = mongo.db.hotels.find(query, projection)
-        
-        hotels_list = []
-        for hotel in hotels_cursor:
-            hotel['_id'] = str(hotel['_id'])
-            # Get the count of active routes for this hotel
-            hotel['route_count'] = mongo.db.routes.count_documents({
-                'hotel_id': hotel['_id'],
-                'status': 'active'
-            })
-            hotels_list.append(hotel)
-            
-        return jsonify({'hotels': hotels_list})
+        body = hotel_index.view_json(west, south, east, north, zoom, load_map_hotels, hotels_version)
+        return current_app.response_class(body, mimetype='application/json')
     except Exception as e:
         print(f"Error fetching hotels in view: {e}")
         return jsonify({'error': 'Could not fetch hotels in view'}), 500
+
+def _route_gpx_path(route_id):
+    """The absolute path of a route's GPX file; aborts with 404 for an unknown route."""
+    route = mongo.db.routes.find_one_or_404({'_id': route_id}, {'gpx_file_path': 1})
+    return os.path.join(current_app.static_folder, route['gpx_file_path'])
+
+def _get_route_profile(gpx_file_path):
+    """Loads a route's precomputed profile artifact through the route cache."""
+    return route_cache.get_or_load(profile_artifact_path(gpx_file_path), load_route_profile)
+
+@api.route('/route/<route_id>/track')
+def get_route_track(route_id):
+    """
+    Returns a route's map geometry and elevation chart series.
+    Optional zoom and chart_points query parameters pick the level of detail,
+    and format=polyline selects the compact encoded format.
+    A v parameter matching the route's content version makes the response
+    immutable; otherwise clients revalidate with the ETag.
+    """
+    zoom = request.args.get('zoom', DEFAULT_PROFILE_ZOOM, type=int)
+    chart_points = clamp_chart_points(request.args.get('chart_points', current_app.config['ROUTE_CHART_POINTS'], type=int))
+    fmt = request.args.get('format', 'json')
+    if fmt not in TRACK_FORMATS:
+        return abort(400, description="Unknown track format.")
+
+    # Outside the try so an unknown route stays a 404
+    gpx_file_path = _route_gpx_path(route_id)
+    try:
+        profile = _get_route_profile(gpx_file_path)
+        etag = f"{profile.content_version}-z{level_for_zoom(zoom)}-c{chart_points}-{fmt}"
+        return cached_json_response(lambda: profile.to_dict(zoom=zoom, chart_points=chart_points, fmt=fmt), etag,
+                                    immutable=request.args.get('v') == profile.content_version)
+    except OSError as e:
+        print(f"Profile artifact unavailable for route {route_id} (run 'flask build-route-artifacts'): {e}")
+        return jsonify({'error': 'Route track is not available yet'}), 503
+    except Exception as e:
+        print(f"Error fetching track for route {route_id}: {e}")
+        return jsonify({'error': 'Could not fetch route track'}), 500
+
+@api.route('/route/<route_id>/geometry')
+def get_route_geometry(route_id):
+    """
+    Returns a route's simplified map geometry for the viewer's zoom level.
+    Expects a zoom query parameter; the response echoes the level actually served.
+    Accepts format=polyline and is cached like the track endpoint.
+    """
+    zoom = request.args.get('zoom', type=int)
+    if zoom is None:
+        return abort(400, description="Invalid or missing zoom level.")
+    fmt = request.args.get('format', 'json')
+    if fmt not in TRACK_FORMATS:
+        return abort(400, description="Unknown track format.")
+
+    # Outside the try so an unknown route stays a 404
+    gpx_file_path = _route_gpx_path(route_id)
+    try:
+        profile = _get_route_profile(gpx_file_path)
+        level = level_for_zoom(zoom)
+        return cached_json_response(lambda: {'zoom': level, 'geometry': profile.geometry_for_zoom(zoom, fmt)},
+                                    f"{profile.content_version}-z{level}-{fmt}",
+                                    immutable=request.args.get('v') == profile.content_version)
+    except OSError as e:
+        print(f"Profile artifact unavailable for route {route_id} (run 'flask build-route-artifacts'): {e}")
+        return jsonify({'error': 'Route geometry is not available yet'}), 503
+    except Exception as e:
+        print(f"Error fetching geometry for route {route_id}: {e}")
+        return jsonify({'error': 'Could not fetch route geometry'}), 500
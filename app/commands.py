@@ -1,8 +1,18 @@
 # app/commands.py
 
+import json
+import os
+import time
 import click
+import shortuuid
+from flask import current_app
 from flask.cli import with_appcontext
+from pymongo.errors import BulkWriteError
+from . import mongo
 from .models import User
+from .services import adjust_route_counts, reconcile_route_counts
+from .utils.bulk_ingest import find_route_files, ingest_files
+from .utils.route_artifacts import artifact_is_current, ingest_route_file, profile_artifact_path
 
 @click.command('create-admin')
 @with_appcontext
@@ -25,3 +35,119 @@ def create_admin_command(username, password):
     
     click.echo(f"Admin user '{username}' created successfully.")
 
+
+@click.command('build-route-artifacts')
+@with_appcontext
+@click.option('--force', is_flag=True, help='Rebuild artifacts that are already up to date.')
+def build_route_artifacts_command(force):
+    """Writes the precomputed profile artifact for every stored route's GPX file, replacing stale ones."""
+    built, skipped, failed = 0, 0, 0
+    for route in mongo.db.routes.find({}, {'gpx_file_path': 1}):
+        gpx_path = os.path.join(current_app.static_folder, route.get('gpx_file_path', ''))
+        if not os.path.isfile(gpx_path):
+            click.echo(f"Missing GPX file for route {route['_id']}: {gpx_path}")
+            failed += 1
+            continue
+
+        artifact_path = profile_artifact_path(gpx_path)
+        if (not force and artifact_is_current(artifact_path)
+                and os.path.getmtime(artifact_path) >= os.path.getmtime(gpx_path)):
+            skipped += 1
+            continue
+
+        try:
+            ingest_route_file(gpx_path)
+            built += 1
+        except Exception as e:
+            click.echo(f"Could not build artifact for route {route['_id']}: {e}")
+            failed += 1
+
+    click.echo(f"Built {built} artifacts, {skipped} already up to date, {failed} failed.")
+
+
+def _insert_route_batch(docs, sources, failures):
+    """Writes a batch of route documents, recording any rejected ones as failures. Returns the count inserted."""
+    try:
+        return len(mongo.db.routes.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        for error in e.details.get('writeErrors', []):
+            failures.append({'file': sources[error['index']], 'error': error.get('errmsg', 'write error')})
+        return e.details.get('nInserted', 0)
+
+
+@click.command('ingest-routes')
+@with_appcontext
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--hotel-id', required=True, help='The hotel the routes belong to.')
+@click.option('--surface-type', default='Road', type=click.Choice(['Road', 'Gravel', 'Mixed']))
+@click.option('--workers', type=int, default=None, help='Worker processes (defaults to the CPU count).')
+@click.option('--batch-size', default=50, show_default=True, help='Routes per insert_many call.')
+@click.option('--manifest', default='ingest-manifest.json', show_default=True, help='Where to write where each file was stored, and which failed.')
+def ingest_routes_command(directory, hotel_id, surface_type, workers, batch_size, manifest):
+    """Bulk-imports every GPX/TCX file in DIRECTORY as routes for a hotel."""
+    if not mongo.db.hotels.find_one({'_id': hotel_id}, {'_id': 1}):
+        click.echo(f"Error: Hotel '{hotel_id}' not found.")
+        return
+
+    paths = find_route_files(directory)
+    if not paths:
+        click.echo(f"No GPX or TCX files found in {directory}.")
+        return
+
+    upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'routes')
+    docs, sources, stored, failures = [], [], [], []
+    inserted = 0
+    start = time.perf_counter()
+
+    with click.progressbar(length=len(paths), label='Ingesting routes') as bar:
+        for path, result, error in ingest_files(paths, upload_folder, workers):
+            bar.update(1)
+            if error:
+                failures.append({'file': path, 'error': error})
+                continue
+
+            filename, route_data = result
+            gpx_file_path = os.path.join('uploads', 'routes', filename).replace("\\", "/")
+            docs.append({
+                '_id': shortuuid.uuid(),
+                'hotel_id': hotel_id,
+                'name': os.path.splitext(os.path.basename(path))[0],
+                'description': '',
+                'surface_type': surface_type,
+                'gpx_file_path': gpx_file_path,
+                'distance_km': route_data.get('distance_km', 0),
+                'elevation_m': route_data.get('elevation_m', 0),
+                'difficulty': route_data.get('difficulty', 'moderate'),
+                'status': 'active'
+            })
+            sources.append(path)
+            stored.append({'file': path, 'stored_as': gpx_file_path, 'route_id': docs[-1]['_id']})
+            if len(docs) >= batch_size:
+                inserted += _insert_route_batch(docs, sources, failures)
+                docs, sources = [], []
+
+    if docs:
+        inserted += _insert_route_batch(docs, sources, failures)
+    adjust_route_counts(hotel_id, total=inserted, active=inserted)
+
+    elapsed = time.perf_counter() - start
+    megabytes = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+    click.echo(f"Ingested {inserted} of {len(paths)} files in {elapsed:.1f}s "
+               f"({len(paths) / elapsed:.1f} files/s, {megabytes / elapsed:.1f} MB/s).")
+
+    failed_files = {failure['file'] for failure in failures}
+    with open(manifest, 'w') as f:
+        json.dump({'ingested': [entry for entry in stored if entry['file'] not in failed_files],
+                   'failed': failures}, f, indent=2)
+    if failures:
+        click.echo(f"{len(failures)} files failed; see {manifest}.")
+    else:
+        click.echo(f"Stored files are listed in {manifest}.")
+
+
+@click.command('reconcile-route-counts')
+@with_appcontext
+def reconcile_route_counts_command():
+    """Recomputes every hotel's route_count and active_route_count from the routes collection."""
+    checked, corrected = reconcile_route_counts()
+    click.echo(f"Checked {checked} hotels, corrected route counts on {corrected}.")
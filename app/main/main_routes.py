@@ -1,7 +1,6 @@
 # app/main/main_routes.py
 
 import os
-import json
 import secrets
 import datetime
 import shortuuid
@@ -10,8 +9,9 @@ from werkzeug.utils import secure_filename
 from flask_mail import Message
 from app import mail
 from . import main
-from .. import mongo
-from ..utils.gpx_utils import parse_gpx_file
+from .. import mongo, route_cache
+from ..services import adjust_route_counts
+from ..utils.route_artifacts import ingest_route_file, load_route_profile, profile_artifact_path
 from bson.objectid import ObjectId
 from .forms import HotelSignupForm, HotelOnboardingForm
 
@@ -58,26 +58,28 @@ def route_profile(route_id):
     # We need the hotel's name for a breadcrumb link
     hotel = mongo.db.hotels.find_one({'_id': route['hotel_id']})
 
-    # Read the GPX file to get the track points for the map and chart
-    track_points = []
+    # The map and chart data are fetched from the track API; the page only
+    # needs the artifact's content version to build an immutable URL for it
+    track_url = None
+    geometry_url = None
     try:
-        # Construct the full path to the GPX file
         gpx_file_path = os.path.join(current_app.static_folder, route['gpx_file_path'])
-        with open(gpx_file_path, 'r') as f:
-            # We re-parse here to get the detailed points for the chart
-            gpx_data = parse_gpx_file(f)
-            track_points = gpx_data['track_points']
+        profile = route_cache.get_or_load(profile_artifact_path(gpx_file_path), load_route_profile)
+        track_url = url_for('api.get_route_track', route_id=route_id, v=profile.content_version,
+                            format='polyline', chart_points=request.args.get('chart_points', type=int))
+        geometry_url = url_for('api.get_route_geometry', route_id=route_id, v=profile.content_version,
+                               format='polyline')
     except Exception as e:
-        print(f"Could not read or parse GPX file for route {route_id}: {e}")
+        print(f"Could not load profile artifact for route {route_id} (run 'flask build-route-artifacts'?): {e}")
 
     jawg_token = os.getenv('JAWG_ACCESS_TOKEN')
     
-    # Pass track_points as a JSON string to the template
     return render_template('route_profile.html', 
                            route=route, 
                            hotel=hotel, 
                            jawg_token=jawg_token,
-                           track_points_json=json.dumps(track_points))
+                           track_url=track_url,
+                           geometry_url=geometry_url)
 
 @main.route('/signup', methods=['GET', 'POST'])
 def signup():
@@ -167,17 +169,20 @@ def onboarding(token):
             'facilities': form.facilities.data,
             'photos': photo_filenames, # Store relative paths to photos
             'status': 'pending', # Set status to pending for approval
-            'is_featured': onboarding_token.get('plan') == 'premium' # Also set featured status
+            'is_featured': onboarding_token.get('plan') == 'premium', # Also set featured status
+            'route_count': 0,
+            'active_route_count': 0
             # Other fields like star_rating can be added by admin later
         }
         mongo.db.hotels.insert_one(new_hotel)
         
         # --- Add submitted routes to the routes collection ---
+        routes_added = 0
         for route_path in route_filenames:
             full_path = os.path.join(current_app.root_path, 'static', route_path)
             try:
-                with open(full_path, 'r') as f:
-                    route_data = parse_gpx_file(f)
+                # Parses once and writes the profile artifact next to the GPX
+                route_data = ingest_route_file(full_path)
                 
                 new_route = {
                     '_id': shortuuid.uuid(),
@@ -188,13 +193,15 @@ def onboarding(token):
                     'surface_type': 'Mixed', # Default surface type
                     'gpx_file_path': route_path,
                     'distance_km': route_data.get('distance_km', 0),
-                    'elevation_m': route_data.get('elevation_gain_m', 0), # Use .get() with a default of 0
+                    'elevation_m': route_data.get('elevation_m', 0), # Use .get() with a default of 0
                     'difficulty': route_data.get('difficulty', 'moderate'), # Use .get() with a default
                     'status': 'active'
                 }
                 mongo.db.routes.insert_one(new_route)
+                routes_added += 1
             except Exception as e:
                 print(f"Error processing GPX file {route_path}: {e}")
+        adjust_route_counts(new_hotel['_id'], total=routes_added, active=routes_added)
 
 
         # --- Mark token as used ---
@@ -0,0 +1,110 @@
+# app/services.py
+
+from pymongo import ReturnDocument, UpdateOne
+from app import mongo, hotel_index
+
+# --- Hotel Map Index ---
+# The home map answers viewport queries from an in-memory index of the
+# approved hotels (app/utils/hotel_index.py). Every write that changes
+# what the map shows bumps a version counter in the `counters`
+# collection, so each worker process notices the change and rebuilds
+# its index within HOTEL_INDEX_VERSION_CHECK_SECONDS.
+
+# Fields of the hotel cards the map shows
+MAP_HOTEL_PROJECTION = {
+    'name': 1,
+    'location': 1,
+    'is_featured': 1,
+    'price_range': 1,
+    'accommodation_type': 1,
+    'facilities': 1,
+    'active_route_count': 1
+}
+
+
+def load_map_hotels():
+    """The map cards of every approved hotel with valid coordinates."""
+    hotels = []
+    for hotel in mongo.db.hotels.find({'status': 'approved'}, MAP_HOTEL_PROJECTION):
+        coordinates = (hotel.get('location') or {}).get('coordinates')
+        if not coordinates or len(coordinates) != 2:
+            continue
+        hotel['_id'] = str(hotel['_id'])
+        # Cards show active routes; the count is kept on the hotel document
+        hotel['route_count'] = hotel.pop('active_route_count', 0)
+        hotels.append(hotel)
+    return hotels
+
+
+def hotels_version():
+    """The current hotels version counter (0 before the first hotel write)."""
+    counter = mongo.db.counters.find_one({'_id': 'hotels'})
+    return counter['version'] if counter else 0
+
+
+def bump_hotels_version():
+    """Marks the hotels as changed for every process's map index. Returns the new version."""
+    counter = mongo.db.counters.find_one_and_update(
+        {'_id': 'hotels'}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+    # This process sees its own writes at once; the others on their next version check
+    hotel_index.invalidate()
+    return counter['version']
+
+
+# --- Hotel Route Counts ---
+# Each hotel document carries `route_count` (all of its routes) and
+# `active_route_count` (those with status 'active'), so pages listing
+# hotels never count routes on read. Every write that adds routes or
+# changes a route's status adjusts them with an atomic $inc;
+# reconcile_route_counts() repairs any drift in bulk.
+
+def adjust_route_counts(hotel_id, total=0, active=0):
+    """Atomically adds `total` to a hotel's route_count and `active` to its active_route_count."""
+    increments = {field: delta for field, delta in (('route_count', total), ('active_route_count', active)) if delta}
+    if increments:
+        mongo.db.hotels.update_one({'_id': hotel_id}, {'$inc': increments})
+        # Map cards show active_route_count
+        bump_hotels_version()
+
+
+def archive_route(route_id):
+    """
+    Archives a route and, if it was active until now, decrements its
+    hotel's active_route_count. Returns the route as it was before, or None
+    if it doesn't exist.
+    """
+    route = mongo.db.routes.find_one_and_update(
+        {'_id': route_id}, {'$set': {'status': 'archived'}}, projection={'hotel_id': 1, 'status': 1})
+    if route is not None and route.get('status') == 'active':
+        adjust_route_counts(route['hotel_id'], active=-1)
+    return route
+
+
+def reconcile_route_counts(batch_size=500):
+    """
+    Recomputes every hotel's route counts from the routes collection with
+    one aggregation, and writes back only the hotels whose stored counts
+    differ. Returns (hotels checked, hotels corrected).
+    """
+    pipeline = [{'$group': {
+        '_id': '$hotel_id',
+        'total': {'$sum': 1},
+        'active': {'$sum': {'$cond': [{'$eq': ['$status', 'active']}, 1, 0]}}
+    }}]
+    counts = {row['_id']: (row['total'], row['active']) for row in mongo.db.routes.aggregate(pipeline)}
+
+    checked, corrected, updates = 0, 0, []
+    for hotel in mongo.db.hotels.find({}, {'route_count': 1, 'active_route_count': 1}):
+        checked += 1
+        total, active = counts.get(hotel['_id'], (0, 0))
+        if hotel.get('route_count') != total or hotel.get('active_route_count') != active:
+            updates.append(UpdateOne({'_id': hotel['_id']},
+                                     {'$set': {'route_count': total, 'active_route_count': active}}))
+        if len(updates) >= batch_size:
+            corrected += mongo.db.hotels.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        corrected += mongo.db.hotels.bulk_write(updates, ordered=False).modified_count
+    if corrected:
+        bump_hotels_version()
+    return checked, corrected
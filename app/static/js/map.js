@@ -35,6 +35,8 @@ document.addEventListener('DOMContentLoaded', function () {
 
     const markers = L.markerClusterGroup();
     leafletMap.addLayer(markers);
+    // Clusters computed by the server at low zoom are drawn as they are, not re-clustered
+    const clusterLayer = L.layerGroup().addTo(leafletMap);
 
     // --- ENHANCED: This function now also checks if the user is at the bottom ---
     function checkScrollIndicator() {
@@ -63,7 +65,9 @@ document.addEventListener('DOMContentLoaded', function () {
         const east = bounds.getEast();
         const west = bounds.getWest();
 
-        const apiUrl = `/api/hotels-in-view?north=${north}&south=${south}&east=${east}&west=${west}`;
+        const zoom = leafletMap.getZoom();
+
+        const apiUrl = `/api/hotels-in-view?north=${north}&south=${south}&east=${east}&west=${west}&zoom=${zoom}`;
 
         fetch(apiUrl)
             .then(response => response.json())
@@ -73,8 +77,26 @@ document.addEventListener('DOMContentLoaded', function () {
 
                 hotelListContainer.innerHTML = '';
                 markers.clearLayers();
-
-                if (hotels && hotels.length > 0) {
+                clusterLayer.clearLayers();
+
+                if (data.clusters) {
+                    // Zoomed out: the server sends clusters; cards are only listed once zoomed in
+                    data.clusters.forEach(cluster => {
+                        const size = cluster.count < 10 ? 32 : cluster.count < 100 ? 40 : 48;
+                        const ringClass = cluster.featured_count > 0 ? 'ring-2 ring-amber-400' : '';
+                        const clusterIcon = L.divIcon({
+                            className: 'custom-icon-only',
+                            html: `<div class="flex items-center justify-center rounded-full bg-slate-800/90 text-white font-poppins font-bold text-sm shadow ${ringClass}" style="width:${size}px;height:${size}px">${cluster.count}</div>`,
+                            iconSize: [size, size], iconAnchor: [size / 2, size / 2]
+                        });
+                        const marker = L.marker([cluster.lat, cluster.lon], { icon: clusterIcon });
+                        marker.on('click', () => leafletMap.setView([cluster.lat, cluster.lon], Math.min(zoom + 2, leafletMap.getMaxZoom())));
+                        clusterLayer.addLayer(marker);
+                    });
+                    hotelListContainer.innerHTML = data.hotel_count > 0
+                        ? `<p class="text-gray-500 text-center py-8 px-4">${data.hotel_count} hotel${data.hotel_count !== 1 ? 's' : ''} in this area. Zoom in on the map to browse them.</p>`
+                        : '<p class="text-gray-500 text-center py-8 px-4">No hotels found in the current map area.</p>';
+                } else if (hotels && hotels.length > 0) {
                     const facilityIcons = {
                         'secure_storage': { icon: 'fa-shield-halved', title: 'Secure Bike Storage' },
                         'bike_wash': { icon: 'fa-shower', title: 'Bike Wash Station' },
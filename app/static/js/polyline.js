@@ -0,0 +1,61 @@
+// app/static/js/polyline.js
+
+// Decoders for the compact track format (?format=polyline), mirroring
+// app/utils/polyline.py.
+const TrackCodec = (function() {
+    // Reads the polyline varint stream into signed integer deltas.
+    function decodeInts(encoded) {
+        const values = [];
+        let value = 0;
+        let shift = 0;
+        for (let i = 0; i < encoded.length; i++) {
+            const byte = encoded.charCodeAt(i) - 63;
+            value |= (byte & 0x1f) << shift;
+            shift += 5;
+            if (byte < 0x20) {
+                values.push(value & 1 ? ~(value >>> 1) : value >>> 1);
+                value = 0;
+                shift = 0;
+            }
+        }
+        return values;
+    }
+
+    // Decodes a Google encoded polyline into [[lat, lon], ...].
+    function decodePolyline(encoded, precision = 5) {
+        const factor = Math.pow(10, precision);
+        const deltas = decodeInts(encoded);
+        const coords = new Array(deltas.length / 2);
+        let lat = 0;
+        let lon = 0;
+        for (let i = 0; i < deltas.length; i += 2) {
+            lat += deltas[i];
+            lon += deltas[i + 1];
+            coords[i / 2] = [lat / factor, lon / factor];
+        }
+        return coords;
+    }
+
+    // Decodes a delta-encoded integer series, dividing each value by `scale`.
+    function decodeDeltas(encoded, scale = 1) {
+        const deltas = decodeInts(encoded);
+        const values = new Array(deltas.length);
+        let total = 0;
+        for (let i = 0; i < deltas.length; i++) {
+            total += deltas[i];
+            values[i] = total / scale;
+        }
+        return values;
+    }
+
+    // Turns a format=polyline track or geometry response into the plain JSON shape.
+    function decodeProfile(data) {
+        if (typeof data.geometry !== 'string') return data;
+        const profile = { zoom: data.zoom, geometry: decodePolyline(data.geometry) };
+        if (data.distance_m !== undefined) profile.distance_km = decodeDeltas(data.distance_m, 1000);
+        if (data.elevation_dm !== undefined) profile.elevation_m = decodeDeltas(data.elevation_dm, 10);
+        return profile;
+    }
+
+    return { decodePolyline, decodeDeltas, decodeProfile };
+})();
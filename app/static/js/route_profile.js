@@ -10,17 +10,29 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     const jawgAccessToken = mapContainer.dataset.jawgToken;
-    const trackPointsJson = mapContainer.dataset.trackPoints;
+    const trackUrl = mapContainer.dataset.trackUrl;
+    const geometryUrl = mapContainer.dataset.geometryUrl;
 
-    if (!jawgAccessToken || !trackPointsJson) {
+    if (!jawgAccessToken || !trackUrl) {
         if (mapContainer) mapContainer.innerHTML = '<p class="text-red-500 p-4">Map data is missing.</p>';
         return;
     }
 
-    try {
-        const trackPoints = JSON.parse(trackPointsJson);
+    // The track is served separately (and cached by the browser) rather than embedded in the page
+    fetch(trackUrl)
+        .then(response => {
+            if (!response.ok) throw new Error(`Track request failed with status ${response.status}`);
+            return response.json();
+        })
+        .then(data => renderProfile(TrackCodec.decodeProfile(data)))
+        .catch(error => {
+            console.error("Failed to load route profile or initialize map/chart:", error);
+            mapContainer.innerHTML = '<p class="text-red-500 p-4">Error loading map.</p>';
+        });
 
-        if (trackPoints.length === 0) {
+    function renderProfile(profile) {
+        // { zoom, geometry: [[lat, lon], ...], distance_km: [...], elevation_m: [...] }
+        if (profile.geometry.length === 0) {
             mapContainer.innerHTML = '<p class="text-gray-500 p-4">No track points available for this route.</p>';
             return;
         }
@@ -33,16 +45,34 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         ).addTo(map);
 
-        const latLngs = trackPoints.map(p => [p.lat, p.lon]);
-        const polyline = L.polyline(latLngs, { color: '#ef4444', weight: 4 }).addTo(map);
+        const polyline = L.polyline(profile.geometry, { color: '#ef4444', weight: 4 }).addTo(map);
         map.fitBounds(polyline.getBounds().pad(0.1));
 
+        // --- Level of Detail ---
+        // The track comes with a coarse geometry; swap in the level matching the current zoom.
+        let currentLevel = profile.zoom;
+        const refreshGeometry = () => {
+            const zoom = map.getZoom();
+            fetch(`${geometryUrl}&zoom=${zoom}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error || data.zoom === currentLevel) return;
+                    currentLevel = data.zoom;
+                    polyline.setLatLngs(TrackCodec.decodeProfile(data).geometry);
+                })
+                .catch(error => console.error('Error fetching route geometry:', error));
+        };
+        if (geometryUrl) {
+            map.on('zoomend', refreshGeometry);
+            refreshGeometry();
+        }
+
         // --- Initialize Elevation Chart ---
         const chartData = {
-            labels: trackPoints.map(p => p.dist.toFixed(1)), // Distance for x-axis
+            labels: profile.distance_km.map(d => d.toFixed(1)), // Distance for x-axis
             datasets: [{
                 label: 'Elevation (m)',
-                data: trackPoints.map(p => p.ele), // Elevation for y-axis
+                data: profile.elevation_m, // Elevation for y-axis
                 borderColor: '#2c3e50',
                 backgroundColor: 'rgba(44, 62, 80, 0.1)',
                 fill: true,
@@ -75,10 +105,5 @@ document.addEventListener('DOMContentLoaded', function() {
         };
 
         new Chart(chartCanvas, chartConfig);
-
-
-    } catch (error) {
-        console.error("Failed to parse track points or initialize map/chart:", error);
-        if (mapContainer) mapContainer.innerHTML = '<p class="text-red-500 p-4">Error loading map.</p>';
     }
 });
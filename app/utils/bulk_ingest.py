@@ -0,0 +1,55 @@
+# app/utils/bulk_ingest.py
+
+import os
+import shutil
+import shortuuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from werkzeug.utils import secure_filename
+from .gpx_utils import ROUTE_FILE_PARSERS
+from .route_artifacts import ingest_route_file
+
+ROUTE_FILE_EXTENSIONS = tuple(ROUTE_FILE_PARSERS)
+
+
+def find_route_files(directory):
+    """Returns every GPX/TCX file under `directory`, sorted by path."""
+    paths = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.lower().endswith(ROUTE_FILE_EXTENSIONS):
+                paths.append(os.path.join(root, filename))
+    return sorted(paths)
+
+
+def ingest_one(src_path, dest_dir):
+    """
+    Worker for a single file: copies it into `dest_dir` under a new unique
+    name, then parses it and writes its profile artifact. Returns (stored
+    filename, route stats).
+
+    Files with the same name from different subdirectories, or matching an
+    earlier upload, each get their own copy and artifact, so no two workers
+    ever write the same path. Runs in a pool process, so it only touches
+    the filesystem; the parent does all the database writes.
+    """
+    filename = f"{shortuuid.uuid()[:10]}_{secure_filename(os.path.basename(src_path))}"
+    dest_path = os.path.join(dest_dir, filename)
+    shutil.copyfile(src_path, dest_path)
+    return filename, ingest_route_file(dest_path)
+
+
+def ingest_files(paths, dest_dir, workers=None):
+    """
+    Fans `paths` across a process pool and yields (path, result, error)
+    as each file finishes, in completion order. `result` is what
+    `ingest_one` returns; `error` is a message string when it raised.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(ingest_one, path, dest_dir): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, f"{type(e).__name__}: {e}"
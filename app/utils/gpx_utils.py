@@ -1,25 +1,70 @@
 # app/utils/gpx_utils.py
 
+import mmap
+import xml.etree.ElementTree as ET
 import gpxpy
 import gpxpy.gpx
-from math import radians, sin, cos, sqrt, atan2
+import numpy as np
+from math import pi, sin, cos, sqrt, atan2
+from .track import Track
+
+# Tags are compared by local name so GPX 1.0, GPX 1.1 and un-namespaced
+# files are all handled by the same streaming parser.
+GPX_TRACK_POINT_TAG = 'trkpt'
+GPX_ELEVATION_TAG = 'ele'
+GPX_SEGMENT_TAG = 'trkseg'
+
+# TCX tags (Garmin Training Center), used by the same streaming approach
+TCX_TRACK_TAG = 'Track'
+TCX_TRACK_POINT_TAG = 'Trackpoint'
+TCX_LATITUDE_TAG = 'LatitudeDegrees'
+TCX_LONGITUDE_TAG = 'LongitudeDegrees'
+TCX_ELEVATION_TAG = 'AltitudeMeters'
+
+EARTH_RADIUS_KM = 6371.0  # Radius of earth in kilometers
+_DEG_TO_RAD = pi / 180.0
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great-circle distance between two points
     on the earth (specified in decimal degrees).
-    """
-    R = 6371  # Radius of earth in kilometers
-    lat1_rad, lon1_rad, lat2_rad, lon2_rad = map(radians, [lat1, lon1, lat2, lon2])
 
-    dlon = lon2_rad - lon1_rad
+    This is the scalar fast path for one-off pairs; whole tracks should go
+    through `haversine_distances`, which agrees with it to a relative 1e-8.
+    """
+    lat1_rad = lat1 * _DEG_TO_RAD
+    lat2_rad = lat2 * _DEG_TO_RAD
     dlat = lat2_rad - lat1_rad
+    dlon = (lon2 - lon1) * _DEG_TO_RAD
 
     a = sin(dlat / 2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a))
 
-    distance = R * c
-    return distance
+def haversine_distances(lats, lons):
+    """
+    Returns the great-circle distance in km of every segment in a track.
+
+    `lats` and `lons` are equal-length sequences in decimal degrees; the
+    result has one fewer element, where item i is the distance from point i
+    to point i + 1. A segment touching a missing (NaN) coordinate counts
+    as 0.0 km, so one bad point can't turn a route's total distance into
+    NaN. Track.from_points uses this for every parsed track.
+
+    NumPy's vectorised sin/cos/arctan2 round differently from the math
+    module, so results are within a relative 1e-8 of `haversine_distance`
+    rather than identical; the largest differences show up on the
+    few-metre segments typical of recorded GPX tracks.
+    """
+    lat_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lons, dtype=np.float64))
+    if len(lat_rad) < 2:
+        return np.zeros(0)
+
+    dlat = np.diff(lat_rad)
+    dlon = np.diff(lon_rad)
+    a = np.sin(dlat / 2)**2 + np.cos(lat_rad[:-1]) * np.cos(lat_rad[1:]) * np.sin(dlon / 2)**2
+    distances = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.nan_to_num(distances, nan=0.0)
 
 def calculate_difficulty(distance, elevation):
     """
@@ -32,45 +77,173 @@ def calculate_difficulty(distance, elevation):
     else:
         return 'Easy'
 
-def parse_gpx_file(file_stream):
+def lttb_downsample(x, y, n_out):
     """
-    Parses a GPX file stream to extract key metrics and detailed track points.
+    Picks `n_out` points of a series with Largest-Triangle-Three-Buckets.
+
+    The series is split into equal buckets and from each the point forming
+    the largest triangle with the previous pick and the next bucket's mean
+    is kept, so peaks and the shape of climbs survive where plain striding
+    would skip them. Points with a NaN value are left out. Returns indices
+    into the original arrays; the first and last valid points are always
+    included.
     """
-    gpx = gpxpy.parse(file_stream)
-    
-    total_distance_km = 0.0
-    total_elevation_gain = 0.0
-    track_points = []
-    
-    last_point = None
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    xv, yv = x[valid], y[valid]
+
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = xv[end:next_end].mean()
+        avg_y = yv[end:next_end].mean()
+        areas = np.abs((xv[a] - avg_x) * (yv[start:end] - yv[a]) - (xv[a] - xv[start:end]) * (avg_y - yv[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return valid[selected]
+
+def _local_name(tag):
+    """Strips the '{namespace}' prefix ElementTree adds to tag names."""
+    return tag.rsplit('}', 1)[-1]
+
+def iter_gpx_points(source, use_mmap=False):
+    """
+    Streams (lat, lon, ele) tuples for every track point in a GPX file.
 
+    `source` may be a file path or an open file object. The XML is parsed
+    incrementally and each <trkpt> is discarded as soon as it has been
+    yielded, so memory stays flat regardless of file size. With
+    `use_mmap=True` a path is memory-mapped instead of read through a
+    buffered file. `ele` is None when a point has no elevation.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            if use_mmap:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield from iter_gpx_points(mapped)
+            else:
+                yield from iter_gpx_points(f)
+        return
+
+    segment = None
+    elevation = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        name = _local_name(elem.tag)
+        if event == 'start':
+            if name == GPX_SEGMENT_TAG:
+                segment = elem
+            elif name == GPX_TRACK_POINT_TAG:
+                elevation = None
+            continue
+
+        if name == GPX_ELEVATION_TAG:
+            if elem.text and elem.text.strip():
+                elevation = float(elem.text)
+        elif name == GPX_TRACK_POINT_TAG:
+            yield float(elem.get('lat')), float(elem.get('lon')), elevation
+            # Drop the finished point from the tree to keep memory flat
+            elem.clear()
+            if segment is not None:
+                segment.remove(elem)
+
+def iter_tcx_points(source):
+    """
+    Streams (lat, lon, ele) tuples for every track point in a TCX file.
+
+    Works for both activities and courses, since both keep their points in
+    <Track><Trackpoint> elements. Trackpoints without a <Position> (e.g.
+    pauses recorded by some devices) are skipped. Like `iter_gpx_points`,
+    each finished point is dropped from the tree as it is yielded.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield from iter_tcx_points(f)
+        return
+
+    track = None
+    lat = lon = elevation = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        name = _local_name(elem.tag)
+        if event == 'start':
+            if name == TCX_TRACK_TAG:
+                track = elem
+            elif name == TCX_TRACK_POINT_TAG:
+                lat = lon = elevation = None
+            continue
+
+        if name == TCX_LATITUDE_TAG and lat is None:
+            lat = float(elem.text)
+        elif name == TCX_LONGITUDE_TAG and lon is None:
+            lon = float(elem.text)
+        elif name == TCX_ELEVATION_TAG:
+            if elem.text and elem.text.strip():
+                elevation = float(elem.text)
+        elif name == TCX_TRACK_POINT_TAG:
+            if lat is not None and lon is not None:
+                yield lat, lon, elevation
+            elem.clear()
+            if track is not None:
+                track.remove(elem)
+
+def _iter_gpxpy_points(file_stream):
+    """Yields (lat, lon, ele) tuples via gpxpy's full object model."""
+    gpx = gpxpy.parse(file_stream)
     for track in gpx.tracks:
         for segment in track.segments:
             for point in segment.points:
-                if last_point:
-                    # Calculate distance
-                    segment_distance = haversine_distance(last_point.latitude, last_point.longitude, point.latitude, point.longitude)
-                    total_distance_km += segment_distance
-                    
-                    # Calculate elevation gain
-                    elevation_diff = point.elevation - last_point.elevation
-                    if elevation_diff > 0:
-                        total_elevation_gain += elevation_diff
-                
-                track_points.append({
-                    'lat': point.latitude,
-                    'lon': point.longitude,
-                    'ele': point.elevation,
-                    'dist': total_distance_km  # Cumulative distance
-                })
-                
-                last_point = point
-
-    difficulty = calculate_difficulty(total_distance_km, total_elevation_gain)
+                yield point.latitude, point.longitude, point.elevation
 
+def parse_gpx_track(file_stream, streaming=True):
+    """
+    Parses a GPX file stream into a columnar Track.
+
+    By default the file is read with the streaming parser. Pass
+    `streaming=False` to build the full gpxpy object tree instead.
+    """
+    points = iter_gpx_points(file_stream) if streaming else _iter_gpxpy_points(file_stream)
+    return Track.from_points(points, haversine_distances)
+
+def parse_tcx_track(file_stream):
+    """
+    Parses a TCX file stream into a columnar Track.
+    """
+    return Track.from_points(iter_tcx_points(file_stream), haversine_distances)
+
+# Track parsers by file extension, for paths that accept more than GPX
+ROUTE_FILE_PARSERS = {
+    '.gpx': parse_gpx_track,
+    '.tcx': parse_tcx_track,
+}
+
+def summarize_track(track):
+    """
+    Returns the summary stats stored on a route document for a Track.
+    """
+    total_distance_km = track.distance_km
+    total_elevation_gain = track.elevation_gain_m
     return {
         'distance_km': round(total_distance_km, 1),
         'elevation_m': round(total_elevation_gain, 1),
-        'difficulty': difficulty,
-        'track_points': track_points
+        'difficulty': calculate_difficulty(total_distance_km, total_elevation_gain)
     }
+
+def parse_gpx_file(file_stream, streaming=True):
+    """
+    Parses a GPX file stream to extract key metrics and detailed track points.
+
+    This is the dict-based compatibility layer over `parse_gpx_track`;
+    `track_points` is a list of {'lat', 'lon', 'ele', 'dist'} dicts.
+    """
+    track = parse_gpx_track(file_stream, streaming=streaming)
+    route_data = summarize_track(track)
+    route_data['track_points'] = track.to_dicts()
+    return route_data
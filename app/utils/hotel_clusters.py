@@ -0,0 +1,140 @@
+# app/utils/hotel_clusters.py
+
+import math
+import numpy as np
+
+# Web Mercator tiles are 256 px; clusters group hotels within cells this many pixels across
+TILE_SIZE_PX = 256
+DEFAULT_CELL_PX = 64
+# Leaflet's Web Mercator projection is undefined beyond this latitude
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+def mercator_cells(lons, lats, level):
+    """
+    The (x, y) cell of each point in the 2**level x 2**level Web Mercator
+    grid; at level = zoom these are the points' slippy-map tiles.
+    """
+    n = 1 << level
+    lat_rad = np.radians(np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = np.floor((lons + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_range(west, south, east, north, zoom):
+    """The (x_min, y_min, x_max, y_max) slippy-map tiles at `zoom` covering the bounding box."""
+    x, y = mercator_cells(np.array([west, east], dtype=np.float64), np.array([north, south], dtype=np.float64), zoom)
+    return int(x[0]), int(y[0]), int(x[1]), int(y[1])
+
+
+def tile_bounds(zoom, x, y):
+    """The (west, south, east, north) of a slippy-map tile, in degrees."""
+    n = 1 << zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * row / n))))
+
+    return x / n * 360.0 - 180.0, latitude(y + 1), (x + 1) / n * 360.0 - 180.0, latitude(y)
+
+
+def in_tile(lons, lats, zoom, x, y):
+    """A mask of the points that fall in tile (x, y) at `zoom`."""
+    tile_x, tile_y = mercator_cells(lons, lats, zoom)
+    return (tile_x == x) & (tile_y == y)
+
+
+class _GridLevel:
+    """The clusters of one grid level as parallel arrays (one entry per occupied cell)."""
+    __slots__ = ("keys", "count", "featured", "lon_sum", "lat_sum")
+
+    def __init__(self, keys, count, featured, lon_sum, lat_sum):
+        self.keys = keys
+        self.count = count
+        self.featured = featured
+        self.lon_sum = lon_sum
+        self.lat_sum = lat_sum
+
+    @classmethod
+    def aggregate(cls, keys, count, featured, lon_sum, lat_sum):
+        """Sums entries that share a cell key into one entry per cell."""
+        cell_keys, inverse = np.unique(keys, return_inverse=True)
+        size = len(cell_keys)
+        return cls(cell_keys,
+                   np.bincount(inverse, weights=count, minlength=size).astype(np.int64),
+                   np.bincount(inverse, weights=featured, minlength=size).astype(np.int64),
+                   np.bincount(inverse, weights=lon_sum, minlength=size),
+                   np.bincount(inverse, weights=lat_sum, minlength=size))
+
+
+class HotelGridIndex:
+    """
+    Precomputed hotel clusters for every zoom from 0 to `max_zoom`.
+
+    Hotels are bucketed into Web Mercator cells `cell_px` pixels across at
+    the finest zoom, and each coarser zoom is built by merging the four
+    child cells of every parent cell, so the whole hierarchy costs one
+    pass over the hotels. A cluster is a cell's centroid (the mean of its
+    hotels' positions), hotel count and featured-hotel count.
+    """
+
+    def __init__(self, lons, lats, featured, max_zoom, cell_px=DEFAULT_CELL_PX):
+        self.max_zoom = max_zoom
+        self.level_offset = max(0, int(round(math.log2(TILE_SIZE_PX / cell_px))))
+        self.total = len(lons)
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        featured = np.asarray(featured, dtype=np.float64)
+
+        finest = max_zoom + self.level_offset
+        x, y = mercator_cells(lons, lats, finest)
+        level = _GridLevel.aggregate((x << finest) | y, np.ones(len(lons)), featured, lons, lats)
+        self._levels = {max_zoom: level}
+        for zoom in range(max_zoom - 1, -1, -1):
+            grid_level = zoom + self.level_offset
+            child_level = grid_level + 1
+            child_x, child_y = level.keys >> child_level, level.keys & ((1 << child_level) - 1)
+            level = _GridLevel.aggregate(((child_x >> 1) << grid_level) | (child_y >> 1),
+                                         level.count, level.featured, level.lon_sum, level.lat_sum)
+            self._levels[zoom] = level
+
+    def clusters(self, west, south, east, north, zoom):
+        """Returns the clusters at `zoom` whose centroid lies inside the bounding box, as dicts."""
+        level = self._levels[min(max(int(zoom), 0), self.max_zoom)]
+        if not len(level.keys):
+            return []
+        lons = level.lon_sum / level.count
+        lats = level.lat_sum / level.count
+        inside = np.flatnonzero((lons >= west) & (lons <= east) & (lats >= south) & (lats <= north))
+        return self._cluster_dicts(level, inside)
+
+    def count_in_view(self, west, south, east, north, zoom):
+        """The number of hotels in the clusters `clusters()` returns for the same arguments."""
+        level = self._levels[min(max(int(zoom), 0), self.max_zoom)]
+        if not len(level.keys):
+            return 0
+        lons = level.lon_sum / level.count
+        lats = level.lat_sum / level.count
+        return int(level.count[(lons >= west) & (lons <= east) & (lats >= south) & (lats <= north)].sum())
+
+    def tile_clusters(self, zoom, x, y):
+        """
+        Returns the clusters at `zoom` in slippy-map tile (x, y) at that
+        zoom, as dicts. Cells nest in tiles, so every cluster belongs to
+        exactly one tile.
+        """
+        zoom = min(max(int(zoom), 0), self.max_zoom)
+        level = self._levels[zoom]
+        grid_level = zoom + self.level_offset
+        cell_x, cell_y = level.keys >> grid_level, level.keys & ((1 << grid_level) - 1)
+        inside = np.flatnonzero(((cell_x >> self.level_offset) == x) & ((cell_y >> self.level_offset) == y))
+        return self._cluster_dicts(level, inside)
+
+    @staticmethod
+    def _cluster_dicts(level, inside):
+        lons = level.lon_sum[inside] / level.count[inside]
+        lats = level.lat_sum[inside] / level.count[inside]
+        return [{'lat': round(lat, 5), 'lon': round(lon, 5), 'count': count, 'featured_count': featured}
+                for lat, lon, count, featured in zip(lats.tolist(), lons.tolist(),
+                                                     level.count[inside].tolist(), level.featured[inside].tolist())]
+
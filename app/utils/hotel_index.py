@@ -0,0 +1,267 @@
+# app/utils/hotel_index.py
+
+import json
+import math
+import threading
+import time
+import numpy as np
+from .hotel_clusters import DEFAULT_CELL_PX, HotelGridIndex, in_tile, tile_bounds, tile_range
+from .tile_cache import TileCache
+
+# Side of the lon/lat grid cells the viewport index buckets hotels into;
+# a street-level map view spans a handful of cells
+DEFAULT_CELL_DEG = 0.1
+# Views are answered tile by tile up to this zoom and this many tiles;
+# beyond either they are queried directly
+MAX_TILE_ZOOM = 22
+DEFAULT_MAX_VIEW_TILES = 128
+# A snapshot change moving more hotel positions than this (old and new
+# positions of each changed hotel) clears the tile cache instead of
+# invalidating tile by tile
+MAX_INVALIDATED_POSITIONS = 1000
+# Tile bounds are padded by this much before the exact per-tile filter,
+# so rounding at tile edges can't drop a hotel
+TILE_EDGE_DEG = 1e-9
+
+
+class HotelViewportIndex:
+    """
+    A static grid index of hotel cards for bounding-box queries.
+
+    Hotels are sorted by the key of the DEFAULT_CELL_DEG grid cell they
+    fall in (row-major), so the hotels of any run of cells along a row are
+    one contiguous slice found with searchsorted. A query looks up one
+    slice per grid row the box covers, all rows at once, then keeps the
+    candidates actually inside the box. Each card is serialised to JSON
+    once, at build time.
+    """
+
+    def __init__(self, cards, cell_deg=DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.columns = int(math.ceil(360.0 / cell_deg))
+        self.rows = int(math.ceil(180.0 / cell_deg))
+        lons = np.array([card['location']['coordinates'][0] for card in cards], dtype=np.float64)
+        lats = np.array([card['location']['coordinates'][1] for card in cards], dtype=np.float64)
+        keys = self._row(lats) * self.columns + self._column(lons)
+
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._lons = lons[order]
+        self._lats = lats[order]
+        self._ids = [cards[i]['_id'] for i in order.tolist()]
+        self._load_order = order  # position of each sorted hotel in `cards`, so results keep load order
+        self._card_json = [json.dumps(cards[i], sort_keys=True, separators=(',', ':')) for i in order.tolist()]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _column(self, lons):
+        return np.clip(np.floor((np.asarray(lons) + 180.0) / self.cell_deg), 0, self.columns - 1).astype(np.int64)
+
+    def _row(self, lats):
+        return np.clip(np.floor((np.asarray(lats) + 90.0) / self.cell_deg), 0, self.rows - 1).astype(np.int64)
+
+    def query(self, west, south, east, north):
+        """Returns the positions (in the sorted arrays) of hotels inside the box, in load order."""
+        if not len(self._keys) or west > east or south > north:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(self._row(south), self._row(north) + 1)
+        starts = np.searchsorted(self._keys, rows * self.columns + self._column(west), side='left')
+        ends = np.searchsorted(self._keys, rows * self.columns + self._column(east), side='right')
+        lengths = ends - starts
+        # Concatenate the [start, end) slices of every row without a Python loop
+        offsets = np.cumsum(lengths) - lengths
+        candidates = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+        lons, lats = self._lons[candidates], self._lats[candidates]
+        inside = candidates[(lons >= west) & (lons <= east) & (lats >= south) & (lats <= north)]
+        return inside[np.argsort(self._load_order[inside], kind='stable')]
+
+    def hotels_json(self, west, south, east, north):
+        """The JSON array of the cards of hotels inside the box, as a string."""
+        card_json = self._card_json
+        return '[' + ','.join([card_json[i] for i in self.query(west, south, east, north).tolist()]) + ']'
+
+    def tile_json(self, zoom, x, y):
+        """Returns (the comma-joined JSON cards, count) of the hotels in slippy-map tile (x, y) at `zoom`."""
+        west, south, east, north = tile_bounds(zoom, x, y)
+        candidates = self.query(west - TILE_EDGE_DEG, south - TILE_EDGE_DEG, east + TILE_EDGE_DEG, north + TILE_EDGE_DEG)
+        inside = candidates[in_tile(self._lons[candidates], self._lats[candidates], zoom, x, y)]
+        card_json = self._card_json
+        return ','.join([card_json[i] for i in inside.tolist()]), len(inside)
+
+    def cards_by_id(self):
+        """Maps each hotel's id to (its JSON card, lon, lat)."""
+        return dict(zip(self._ids, zip(self._card_json, self._lons.tolist(), self._lats.tolist())))
+
+
+class HotelTile:
+    """A tile's share of a view response: comma-joined JSON objects and the number of hotels they cover."""
+    __slots__ = ("json", "count")
+
+    def __init__(self, json, count):
+        self.json = json
+        self.count = count
+
+    @property
+    def nbytes(self):
+        return len(self.json)
+
+
+class HotelSnapshot:
+    """The hotels as loaded at one version: a viewport index of their cards and their clusters."""
+
+    def __init__(self, cards, version, max_cluster_zoom, cluster_cell_px):
+        self.version = version
+        self.viewport = HotelViewportIndex(cards)
+        self.clusters = HotelGridIndex([card['location']['coordinates'][0] for card in cards],
+                                       [card['location']['coordinates'][1] for card in cards],
+                                       [bool(card.get('is_featured')) for card in cards],
+                                       max_cluster_zoom, cluster_cell_px)
+
+    def clusters_in_view(self, west, south, east, north, zoom):
+        """Returns (clusters, hotel count) for the bounding box at `zoom`."""
+        clusters = self.clusters.clusters(west, south, east, north, zoom)
+        return clusters, sum(cluster['count'] for cluster in clusters)
+
+    def tile(self, zoom, x, y, clusters):
+        """The HotelTile of slippy-map tile (x, y) at `zoom`, of clusters or of hotel cards."""
+        if clusters:
+            tile_clusters = self.clusters.tile_clusters(zoom, x, y)
+            return HotelTile(','.join([json.dumps(cluster, separators=(',', ':')) for cluster in tile_clusters]),
+                             sum(cluster['count'] for cluster in tile_clusters))
+        return HotelTile(*self.viewport.tile_json(zoom, x, y))
+
+
+def changed_positions(old, new):
+    """The (lons, lats) of hotels added, removed or changed between two snapshots, at old and new positions."""
+    old_cards, new_cards = old.viewport.cards_by_id(), new.viewport.cards_by_id()
+    positions = [card[1:] for hotel_id, card in old_cards.items() if new_cards.get(hotel_id) != card]
+    positions += [card[1:] for hotel_id, card in new_cards.items() if old_cards.get(hotel_id) != card]
+    return [lon for lon, _ in positions], [lat for _, lat in positions]
+
+
+class HotelIndex:
+    """
+    Answers map viewport queries from an in-memory snapshot of the
+    approved hotels instead of querying MongoDB on every pan and zoom.
+
+    `snapshot(loader, version_loader)` returns the current HotelSnapshot.
+    `loader()` returns the hotel cards (dicts with at least
+    `location.coordinates` and `is_featured`) and `version_loader()` the
+    hotels version counter, which every hotel write bumps. The version is
+    re-read at most every `HOTEL_INDEX_VERSION_CHECK_SECONDS`, and the
+    snapshot is rebuilt when it has changed; `invalidate()` makes this
+    process re-read it on the next query. At `HOTEL_CLUSTER_MAX_ZOOM` and
+    below the map is sent clusters instead of individual hotels.
+
+    With `HOTEL_TILE_CACHE_ENABLED`, `view_json()` snaps a view to the
+    slippy-map tiles covering it at its zoom and joins the tiles' responses,
+    which are kept in `tile_cache`. Neighbouring and repeated views share
+    tiles even though their bounding boxes never match exactly. When a
+    rebuild changes hotels, only the tiles holding their old and new
+    positions are dropped. The tile path is off by default: against this
+    in-memory index it is slower per request than the exact query (see
+    benchmarks/hotel_index_benchmark.py), and it only pays off where
+    building a view is expensive.
+    """
+
+    def __init__(self, app=None):
+        self.max_cluster_zoom = 12
+        self.cluster_cell_px = DEFAULT_CELL_PX
+        self.version_check_seconds = 5.0
+        self.tiles_enabled = False
+        self.max_view_tiles = DEFAULT_MAX_VIEW_TILES
+        self.tile_cache = TileCache()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.builds = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_cluster_zoom = app.config.get('HOTEL_CLUSTER_MAX_ZOOM', 12)
+        self.cluster_cell_px = app.config.get('HOTEL_CLUSTER_CELL_PX', DEFAULT_CELL_PX)
+        self.version_check_seconds = app.config.get('HOTEL_INDEX_VERSION_CHECK_SECONDS', 5.0)
+        self.tiles_enabled = app.config.get('HOTEL_TILE_CACHE_ENABLED', False)
+        self.max_view_tiles = app.config.get('HOTEL_TILE_CACHE_MAX_VIEW_TILES', DEFAULT_MAX_VIEW_TILES)
+        self.tile_cache.init_app(app)
+
+    def use_clusters(self, zoom):
+        """Whether the map at `zoom` should get clusters rather than individual hotels."""
+        return zoom is not None and zoom <= self.max_cluster_zoom
+
+    def invalidate(self):
+        # The snapshot is kept so the rebuild can tell which tiles changed
+        with self._lock:
+            self._checked_at = float('-inf')
+
+    def snapshot(self, loader, version_loader):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.version_check_seconds:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.version_check_seconds:
+                return self._snapshot
+            # Read the version before the hotels: a write in between only causes an extra rebuild later
+            version = version_loader()
+            if self._snapshot is None or self._snapshot.version != version:
+                snapshot = HotelSnapshot(loader(), version, self.max_cluster_zoom, self.cluster_cell_px)
+                self._invalidate_tiles(self._snapshot, snapshot)
+                self._snapshot = snapshot
+                self.builds += 1
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def _invalidate_tiles(self, old, new):
+        if old is None:
+            self.tile_cache.clear()
+            return
+        lons, lats = changed_positions(old, new)
+        if len(lons) > MAX_INVALIDATED_POSITIONS:
+            self.tile_cache.clear()
+        else:
+            self.tile_cache.invalidate_points(lons, lats)
+
+    def _tile(self, snapshot, zoom, x, y, clusters):
+        key = (zoom, x, y)
+        tile = self.tile_cache.get(key)
+        if tile is None:
+            tile = snapshot.tile(zoom, x, y, clusters)
+            with self._lock:
+                # A tile built from a snapshot that has since been replaced may be stale
+                if snapshot is self._snapshot:
+                    self.tile_cache.put(key, tile)
+        return tile
+
+    def view_json(self, west, south, east, north, zoom, loader, version_loader):
+        """
+        The JSON response body for a map view: {"clusters", "hotel_count",
+        "zoom"} at cluster zooms, otherwise {"hotels"}. With the tile cache
+        enabled, hotels and clusters are widened to the tiles covering the
+        view, but hotel_count stays exact for the view; without a zoom, or
+        covering too many tiles, views are answered exactly and without the
+        tile cache.
+        """
+        snapshot = self.snapshot(loader, version_loader)
+        clusters = self.use_clusters(zoom)
+        tile_zoom = max(zoom, 0) if zoom is not None else None
+        tiles = None
+        if (self.tiles_enabled and tile_zoom is not None and tile_zoom <= MAX_TILE_ZOOM
+                and west <= east and south <= north):
+            x_min, y_min, x_max, y_max = tile_range(west, south, east, north, tile_zoom)
+            if (x_max - x_min + 1) * (y_max - y_min + 1) <= self.max_view_tiles:
+                tiles = [self._tile(snapshot, tile_zoom, x, y, clusters)
+                         for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+        if clusters:
+            if tiles is None:
+                cluster_list, hotel_count = snapshot.clusters_in_view(west, south, east, north, zoom)
+                return json.dumps({'clusters': cluster_list, 'hotel_count': hotel_count, 'zoom': zoom})
+            return '{"clusters":[%s],"hotel_count":%d,"zoom":%d}' % (
+                ','.join([tile.json for tile in tiles if tile.count]),
+                snapshot.clusters.count_in_view(west, south, east, north, zoom), zoom)
+        if tiles is None:
+            return '{"hotels":' + snapshot.viewport.hotels_json(west, south, east, north) + '}'
+        return '{"hotels":[' + ','.join([tile.json for tile in tiles if tile.count]) + ']}'
@@ -0,0 +1,62 @@
+# app/utils/http_cache.py
+
+import gzip
+import json
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Cache-Control for a URL that carries the content version, e.g. ?v=<hash>
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Cache-Control for an unversioned URL: browsers may keep it but must revalidate
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+_ENCODING_SUFFIXES = {'br': 'br', 'gzip': 'gz', 'identity': 'id'}
+
+
+def _negotiate_encoding():
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered) or 'identity'
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def cached_json_response(build_payload, etag, immutable=False):
+    """
+    Returns a compressed, conditionally cacheable JSON response.
+
+    `etag` must change whenever the payload would; `build_payload()` is
+    only called when the client's If-None-Match doesn't already match, so
+    revalidations answer 304 without serialising anything. The ETag sent
+    is strong and includes the content coding, so a gzip and a brotli body
+    never share a validator.
+    """
+    encoding = _negotiate_encoding()
+    etag = f"{etag}-{_ENCODING_SUFFIXES[encoding]}"
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body = json.dumps(build_payload(), separators=(',', ':')).encode('utf-8')
+        if len(body) < MIN_COMPRESS_BYTES:
+            encoding = 'identity'
+        response = Response(_compress(body, encoding), mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,69 @@
+# app/utils/polyline.py
+
+import numpy as np
+
+# Google's encoded polyline precision: 1e-5 degrees, about 1.1 m
+POLYLINE_PRECISION = 5
+# Elevations are sent as whole decimetres
+ELEVATION_SCALE = 10
+
+
+def _encode_ints(deltas):
+    """
+    Encodes signed integers with the polyline varint scheme: zig-zag the
+    sign into the low bit, then emit 5-bit chunks offset by 63, with 0x20
+    marking that another chunk follows.
+    """
+    chars = []
+    append = chars.append
+    for value in deltas:
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        append(chr(value + 63))
+    return ''.join(chars)
+
+
+def _decode_ints(encoded):
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    return values
+
+
+def encode_deltas(values, scale=1):
+    """
+    Delta-encodes a numeric series as a polyline-style string after scaling
+    and rounding it to integers. Deltas are taken between the rounded
+    values, so rounding errors never accumulate.
+    """
+    ints = np.round(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+    return _encode_ints(np.diff(ints, prepend=0).tolist())
+
+
+def decode_deltas(encoded, scale=1):
+    """Inverse of `encode_deltas`; returns a float64 array."""
+    return np.cumsum(_decode_ints(encoded), dtype=np.int64) / scale
+
+
+def encode_polyline(lats, lons, precision=POLYLINE_PRECISION):
+    """Encodes coordinates as a Google encoded polyline string."""
+    factor = 10 ** precision
+    lat_ints = np.round(np.asarray(lats, dtype=np.float64) * factor).astype(np.int64)
+    lon_ints = np.round(np.asarray(lons, dtype=np.float64) * factor).astype(np.int64)
+    # Interleave the lat/lon deltas: lat0, lon0, lat1, lon1, ...
+    deltas = np.column_stack((np.diff(lat_ints, prepend=0), np.diff(lon_ints, prepend=0))).ravel()
+    return _encode_ints(deltas.tolist())
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """Decodes a Google encoded polyline; returns (lats, lons) float64 arrays."""
+    coords = np.cumsum(np.array(_decode_ints(encoded), dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return coords[:, 0], coords[:, 1]
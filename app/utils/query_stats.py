@@ -0,0 +1,45 @@
+# app/utils/query_stats.py
+
+from flask import g, has_app_context
+from pymongo import monitoring
+
+# Response header carrying the number of MongoDB commands a request issued
+QUERY_COUNT_HEADER = 'X-Mongo-Query-Count'
+
+
+class QueryCounter(monitoring.CommandListener):
+    """
+    Counts the MongoDB commands (finds, aggregates, getMores, writes...)
+    issued while handling each request, so endpoints can be checked for
+    N+1 query patterns.
+
+    pymongo publishes command events on the thread that sent the command,
+    so the count is kept on `flask.g`. The listener must be passed to the
+    MongoClient (`mongo.init_app(app, event_listeners=[query_counter])`);
+    `init_app` adds the count to responses as QUERY_COUNT_HEADER when
+    `MONGO_QUERY_COUNT_HEADER` is enabled.
+    """
+
+    def init_app(self, app):
+        if not app.config.get('MONGO_QUERY_COUNT_HEADER'):
+            return
+
+        @app.after_request
+        def add_query_count_header(response):
+            response.headers[QUERY_COUNT_HEADER] = str(query_count())
+            return response
+
+    def started(self, event):
+        if has_app_context():
+            g.mongo_query_count = g.get('mongo_query_count', 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def query_count():
+    """The number of MongoDB commands issued so far in the current app context."""
+    return g.get('mongo_query_count', 0)
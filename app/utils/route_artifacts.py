@@ -0,0 +1,162 @@
+# app/utils/route_artifacts.py
+
+import hashlib
+import io
+import os
+import numpy as np
+from .gpx_utils import ROUTE_FILE_PARSERS, lttb_downsample, parse_gpx_track, summarize_track
+from .polyline import ELEVATION_SCALE, encode_deltas, encode_polyline
+from .simplify import indices_for_zoom, level_for_zoom, visvalingam_whyatt
+from .track import Track
+
+# Written next to each GPX file, e.g. routes/Easy_Long.gpx.profile.npz
+PROFILE_ARTIFACT_SUFFIX = '.profile.npz'
+PROFILE_ARTIFACT_VERSION = 2
+
+# Level of detail embedded in the page before the map knows its real zoom
+DEFAULT_PROFILE_ZOOM = 10
+
+# Size of the elevation chart series; Chart.js slows down badly past a few thousand points
+DEFAULT_CHART_POINTS = 800
+MAX_CHART_POINTS = 5000
+
+# Wire formats for track responses: plain JSON arrays, or encoded polyline
+# strings with delta-encoded integer series (decoded by static/js/polyline.js)
+TRACK_FORMATS = ('json', 'polyline')
+
+
+def profile_artifact_path(gpx_path):
+    """Returns the path of the precomputed profile artifact for a GPX file."""
+    return gpx_path + PROFILE_ARTIFACT_SUFFIX
+
+
+def clamp_chart_points(n_points):
+    return max(3, min(n_points, MAX_CHART_POINTS))
+
+
+class RouteProfile:
+    """
+    Everything the route profile page needs, precomputed at upload time.
+
+    Holds the full-resolution Track (elevation series and cumulative
+    distance), the Visvalingam-Whyatt significance of every point, from
+    which the map geometry for any zoom is selected, and the SHA-256 of
+    the source GPX bytes.
+    """
+    __slots__ = ('track', 'significance', 'sha256')
+
+    def __init__(self, track, significance, sha256):
+        self.track = track
+        self.significance = np.asarray(significance, dtype=np.float32)
+        self.sha256 = sha256
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(Track.from_arrays(arrays), arrays['significance'], str(arrays['sha256']))
+
+    def to_arrays(self):
+        arrays = self.track.to_arrays()
+        arrays['significance'] = self.significance
+        arrays['sha256'] = np.array(self.sha256)
+        arrays['version'] = np.array(PROFILE_ARTIFACT_VERSION)
+        return arrays
+
+    @property
+    def nbytes(self):
+        return self.track.nbytes + self.significance.nbytes
+
+    @property
+    def content_version(self):
+        """A short token that changes whenever the GPX content or artifact format does; used in URLs and ETags."""
+        return f"{self.sha256[:16]}.{PROFILE_ARTIFACT_VERSION}"
+
+    def geometry_for_zoom(self, zoom, fmt='json'):
+        """
+        Returns the simplified geometry to draw at the given map zoom, as
+        [lat, lon] pairs or, for fmt='polyline', an encoded polyline string.
+        """
+        idx = indices_for_zoom(self.significance, self.track.lat, zoom)
+        if fmt == 'polyline':
+            return encode_polyline(self.track.lat[idx], self.track.lon[idx])
+        return np.column_stack((self.track.lat[idx], self.track.lon[idx])).tolist()
+
+    def chart_indices(self, n_points):
+        """Returns the indices of the LTTB-downsampled elevation series, capped at MAX_CHART_POINTS."""
+        return lttb_downsample(self.track.dist, self.track.ele, clamp_chart_points(n_points))
+
+    def to_dict(self, zoom=DEFAULT_PROFILE_ZOOM, chart_points=DEFAULT_CHART_POINTS, fmt='json'):
+        """
+        Returns the JSON-ready profile: simplified geometry for the map at
+        `zoom` plus a `chart_points`-long distance/elevation series.
+
+        With fmt='polyline' the geometry is an encoded polyline and the chart
+        series are delta-encoded whole metres (distance) and decimetres
+        (elevation). Distance is sent rather than derived from coordinates
+        because the chart points are too sparse to measure the route from.
+        """
+        idx = self.chart_indices(chart_points)
+        if fmt == 'polyline':
+            return {
+                'format': 'polyline',
+                'zoom': level_for_zoom(zoom),
+                'geometry': self.geometry_for_zoom(zoom, fmt),
+                'distance_m': encode_deltas(self.track.dist[idx], 1000),
+                'elevation_dm': encode_deltas(self.track.ele[idx], ELEVATION_SCALE)
+            }
+        return {
+            'zoom': level_for_zoom(zoom),
+            'geometry': self.geometry_for_zoom(zoom),
+            'distance_km': self.track.dist[idx].tolist(),
+            'elevation_m': self.track.ele[idx].tolist()
+        }
+
+
+def ingest_route_file(gpx_path):
+    """
+    Parses a saved GPX (or TCX) file once and writes its profile artifact alongside it.
+
+    Returns the summary stats (distance_km, elevation_m, difficulty) to be
+    stored on the route document, so upload paths never parse twice.
+    """
+    with open(gpx_path, 'rb') as f:
+        data = f.read()
+    parse_track = ROUTE_FILE_PARSERS.get(os.path.splitext(gpx_path)[1].lower(), parse_gpx_track)
+    track = parse_track(io.BytesIO(data))
+    profile = RouteProfile(track,
+                           visvalingam_whyatt(track.lat, track.lon),
+                           hashlib.sha256(data).hexdigest())
+
+    artifact_path = profile_artifact_path(gpx_path)
+    tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **profile.to_arrays())
+    os.replace(tmp_path, artifact_path)
+
+    return summarize_track(track)
+
+
+class StaleArtifactError(OSError):
+    """A profile artifact written by an older PROFILE_ARTIFACT_VERSION."""
+
+
+def artifact_is_current(artifact_path):
+    """Whether a profile artifact exists and was written by the current PROFILE_ARTIFACT_VERSION."""
+    try:
+        with np.load(artifact_path) as data:
+            return int(data['version']) == PROFILE_ARTIFACT_VERSION
+    except (OSError, KeyError, ValueError):
+        return False
+
+
+def load_route_profile(artifact_path):
+    """
+    Loads a RouteProfile from its artifact file. Raises OSError if it is
+    missing, and StaleArtifactError (an OSError) if an older version wrote
+    it. Requests never parse GPX files: missing and stale artifacts are
+    rebuilt by `flask build-route-artifacts`.
+    """
+    with np.load(artifact_path) as data:
+        if int(data['version']) != PROFILE_ARTIFACT_VERSION:
+            raise StaleArtifactError(f"{artifact_path} has artifact version {int(data['version'])}, "
+                                     f"expected {PROFILE_ARTIFACT_VERSION}")
+        return RouteProfile.from_arrays(data)
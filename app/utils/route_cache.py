@@ -0,0 +1,141 @@
+# app/utils/route_cache.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from .track import Track
+
+
+class RouteCache:
+    """
+    A bounded, in-process LRU cache of route data loaded from files.
+
+    Entries are keyed by (file path, mtime, size), so replacing a file on
+    disk invalidates its entry without any explicit call. Cached values are
+    instances of `value_type` (a Track by default); they must expose
+    `nbytes`, `to_arrays()` and `from_arrays()`. The cache is bounded by the
+    total `nbytes` of its entries and evicts the least recently used first.
+
+    When `ROUTE_CACHE_DIR` is configured, values are also written there as
+    .npz files so a restarted worker can load them without re-reading the
+    source. Like the Flask extensions, an instance is created at import
+    time and bound to the app with `init_app`.
+    """
+
+    def __init__(self, app=None, value_type=Track):
+        self.value_type = value_type
+        self.max_bytes = 0
+        self.disk_dir = None
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('ROUTE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        self.disk_dir = app.config.get('ROUTE_CACHE_DIR')
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def get_or_load(self, path, loader):
+        """
+        Returns the cached value for `path`, calling `loader(path)` on a miss.
+        """
+        key = self._key(path)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._load_from_disk(key)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            value = loader(path)
+            with self._lock:
+                self.misses += 1
+            self._save_to_disk(key, value)
+
+        self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        size = value.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            # Drop any entry for an older version of the same file
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                self._current_bytes -= self._entries.pop(stale).nbytes
+            self._entries[key] = value
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def _disk_path(self, key):
+        # One file per source path; the mtime and size are stored inside it
+        name = hashlib.sha1(key[0].encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.npz")
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        disk_path = self._disk_path(key)
+        try:
+            with np.load(disk_path) as data:
+                if (int(data['mtime_ns']), int(data['size'])) != key[1:]:
+                    return None
+                return self.value_type.from_arrays(data)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _save_to_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, mtime_ns=key[1], size=key[2], **value.to_arrays())
+            os.replace(tmp_path, disk_path)
+        except OSError as e:
+            print(f"Could not write route cache file {disk_path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self):
+        """Returns the hit/miss counters and current size, e.g. for a debug endpoint."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else None
+            }
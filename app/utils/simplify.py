@@ -0,0 +1,146 @@
+# app/utils/simplify.py
+
+import heapq
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+# Web Mercator ground resolution at the equator for zoom 0 with 256 px tiles
+MERCATOR_M_PER_PX_Z0 = 156543.03392
+
+# Zoom levels a route is served at; requests are snapped to the next one up
+LOD_ZOOM_LEVELS = (6, 8, 10, 12, 14, 16)
+
+# A point is drawn at a zoom if its Visvalingam triangle covers at least this many square pixels
+LOD_PIXEL_AREA = 0.5
+
+
+def project_to_metres(lats, lons):
+    """
+    Projects coordinates onto a local equirectangular plane in metres.
+
+    Accurate to well under a metre over the extent of a single ride, which
+    is all the simplifiers need.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if len(lats) == 0:
+        return np.zeros(0), np.zeros(0)
+    lat0 = np.radians(np.nanmean(lats))
+    x = np.radians(lons) * EARTH_RADIUS_M * np.cos(lat0)
+    y = np.radians(lats) * EARTH_RADIUS_M
+    return x, y
+
+
+def douglas_peucker(lats, lons, tolerance_m):
+    """
+    Returns the indices of the points kept by Douglas-Peucker simplification.
+
+    Points closer than `tolerance_m` to the line joining their neighbours
+    are dropped. The first and last points are always kept. An explicit
+    stack is used instead of recursion so long tracks cannot hit the
+    recursion limit.
+    """
+    n = len(lats)
+    if n < 3:
+        return np.arange(n)
+    x, y = project_to_metres(lats, lons)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance_m:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+def visvalingam_whyatt(lats, lons):
+    """
+    Returns the Visvalingam-Whyatt effective area (m²) of every point.
+
+    Points are removed smallest-triangle-first using a heap, with stale
+    entries skipped lazily, so the whole ranking is O(n log n). Areas are
+    made non-decreasing in removal order, which means the points kept for
+    any threshold are exactly those with `significance >= threshold`, and
+    every coarser level is a subset of every finer one. The endpoints
+    are given an infinite area so they are always kept.
+    """
+    n = len(lats)
+    significance = np.full(n, np.inf)
+    if n < 3:
+        return significance
+    x, y = project_to_metres(lats, lons)
+    x, y = x.tolist(), y.tolist()
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    area = [0.0] * n
+
+    def triangle_area(i):
+        a, c = prev[i], nxt[i]
+        return abs((x[a] - x[i]) * (y[c] - y[i]) - (x[c] - x[i]) * (y[a] - y[i])) / 2
+
+    heap = []
+    for i in range(1, n - 1):
+        area[i] = triangle_area(i)
+        heap.append((area[i], i))
+    heapq.heapify(heap)
+
+    removed = [False] * n
+    max_area = 0.0
+    while heap:
+        a, i = heapq.heappop(heap)
+        if removed[i] or a != area[i]:
+            continue
+        removed[i] = True
+        max_area = max(max_area, a)
+        significance[i] = max_area
+
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                area[j] = triangle_area(j)
+                heapq.heappush(heap, (area[j], j))
+
+    return significance
+
+
+def level_for_zoom(zoom):
+    """Snaps a map zoom to the nearest level of detail at or above it."""
+    for level in LOD_ZOOM_LEVELS:
+        if zoom <= level:
+            return level
+    return LOD_ZOOM_LEVELS[-1]
+
+
+def metres_per_pixel(zoom, lat):
+    return MERCATOR_M_PER_PX_Z0 * np.cos(np.radians(lat)) / (2 ** zoom)
+
+
+def area_threshold_for_zoom(zoom, lat):
+    """Returns the smallest effective area (m²) still visible at `zoom` near latitude `lat`."""
+    return LOD_PIXEL_AREA * metres_per_pixel(level_for_zoom(zoom), lat) ** 2
+
+
+def indices_for_zoom(significance, lats, zoom):
+    """Returns the indices of the points to draw for a route viewed at `zoom`."""
+    if len(significance) == 0:
+        return np.arange(0)
+    threshold = area_threshold_for_zoom(zoom, float(np.nanmean(lats)))
+    return np.flatnonzero(significance >= threshold)
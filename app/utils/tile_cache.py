@@ -0,0 +1,109 @@
+# app/utils/tile_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from .hotel_clusters import mercator_cells
+
+
+class TileCache:
+    """
+    A bounded, in-process LRU cache of values keyed by slippy-map tile
+    (zoom, x, y), with a time-to-live.
+
+    Values must expose `nbytes`; the cache is bounded by their total and
+    evicts the least recently used first. Entries older than `ttl` seconds
+    count as misses. `invalidate_points()` drops the tiles, at every cached
+    zoom, that contain any of the given positions.
+    """
+
+    def __init__(self, app=None):
+        self.max_bytes = 16 * 1024 * 1024
+        self.ttl = 600
+        self._entries = OrderedDict()  # (zoom, x, y) -> (value, expires_at)
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('HOTEL_TILE_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        self.ttl = app.config.get('HOTEL_TILE_CACHE_TTL', 600)
+
+    def get(self, key):
+        """Returns the cached value for tile `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = value.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)[1]
+                self._current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._current_bytes -= value.nbytes
+
+    def invalidate_points(self, lons, lats):
+        """Drops every cached tile containing one of the positions. Returns the number dropped."""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        if not len(lons):
+            return 0
+        with self._lock:
+            stale = set()
+            for zoom in {key[0] for key in self._entries}:
+                tile_x, tile_y = mercator_cells(lons, lats, zoom)
+                stale.update(key for key in zip([zoom] * len(lons), tile_x.tolist(), tile_y.tolist())
+                             if key in self._entries)
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self):
+        """Returns the hit/miss counters and current size, e.g. for a debug endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
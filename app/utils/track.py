@@ -0,0 +1,83 @@
+# app/utils/track.py
+
+from array import array
+import numpy as np
+
+
+class Track:
+    """
+    A compact, column-oriented GPS track.
+
+    Points are held as four parallel float64 NumPy arrays rather than a list
+    of dicts: `lat`, `lon`, `ele` (metres, NaN where a point has no
+    elevation) and `dist` (cumulative distance in km). Code that needs the
+    old `{'lat', 'lon', 'ele', 'dist'}` dicts, such as JSON responses,
+    should call `to_dicts()` at the edge.
+    """
+    __slots__ = ('lat', 'lon', 'ele', 'dist')
+
+    def __init__(self, lat, lon, ele, dist):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.ele = np.asarray(ele, dtype=np.float64)
+        self.dist = np.asarray(dist, dtype=np.float64)
+
+    @classmethod
+    def from_points(cls, points, segment_distances_func):
+        """
+        Builds a track from an iterable of (lat, lon, ele) tuples.
+
+        Coordinates are accumulated into typed arrays as they arrive, so no
+        per-point Python objects are kept. `segment_distances_func(lats, lons)`
+        is then called once to get every segment length in km.
+        """
+        lats, lons, eles = array('d'), array('d'), array('d')
+        nan = float('nan')
+        for lat, lon, ele in points:
+            lats.append(lat)
+            lons.append(lon)
+            eles.append(nan if ele is None else ele)
+        lat, lon = np.frombuffer(lats), np.frombuffer(lons)
+        dist = np.zeros(len(lat))
+        if len(lat) > 1:
+            np.cumsum(segment_distances_func(lat, lon), out=dist[1:])
+        return cls(lat, lon, np.frombuffer(eles), dist)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuilds a track from the mapping produced by `to_arrays` (e.g. a loaded .npz)."""
+        return cls(arrays['lat'], arrays['lon'], arrays['ele'], arrays['dist'])
+
+    def to_arrays(self):
+        return {'lat': self.lat, 'lon': self.lon, 'ele': self.ele, 'dist': self.dist}
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __iter__(self):
+        """Yields each point as a dict, for callers written against the old format."""
+        return iter(self.to_dicts())
+
+    @property
+    def distance_km(self):
+        return float(self.dist[-1]) if len(self.dist) else 0.0
+
+    @property
+    def elevation_gain_m(self):
+        """Sum of positive elevation steps, ignoring steps to or from a missing elevation."""
+        if len(self.ele) < 2:
+            return 0.0
+        diffs = np.diff(self.ele)
+        return float(diffs[diffs > 0].sum())
+
+    @property
+    def nbytes(self):
+        return self.lat.nbytes + self.lon.nbytes + self.ele.nbytes + self.dist.nbytes
+
+    def to_dicts(self):
+        """Converts the track to a list of {'lat', 'lon', 'ele', 'dist'} dicts."""
+        eles = [None if e != e else e for e in self.ele.tolist()]
+        return [
+            {'lat': lat, 'lon': lon, 'ele': ele, 'dist': dist}
+            for lat, lon, ele, dist in zip(self.lat.tolist(), self.lon.tolist(), eles, self.dist.tolist())
+        ]
@@ -0,0 +1,89 @@
+# benchmarks/gpx_parse_benchmark.py
+
+"""
+Compares the streaming GPX parser against the gpxpy object-model path.
+
+Usage:
+    python benchmarks/gpx_parse_benchmark.py [corpus_dir] [--repeat N]
+
+For every GPX file in the corpus it records wall time and the tracemalloc
+peak for each parser, then prints per-file rows for the largest files and
+corpus totals.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.gpx_utils import parse_gpx_file, iter_gpx_points
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', '0Dev Reference Docs',
+                              'TRA Files for Reference', 'route_files_store')
+
+def _run_gpxpy(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_gpx_file(f, streaming=False)
+
+def _run_streaming(path):
+    with open(path, 'rb') as f:
+        return parse_gpx_file(f)
+
+def _run_streaming_mmap(path):
+    # Points only, to isolate the cost of the XML read itself
+    return sum(1 for _ in iter_gpx_points(path, use_mmap=True))
+
+PARSERS = [
+    ('gpxpy', _run_gpxpy),
+    ('streaming', _run_streaming),
+    ('streaming-mmap (points only)', _run_streaming_mmap),
+]
+
+def measure(func, path, repeat):
+    """Returns (best wall time in seconds, peak traced bytes) for one file."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--show', type=int, default=5, help='Number of largest files to list individually.')
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')), key=os.path.getsize, reverse=True)
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    totals = {name: [0.0, 0] for name, _ in PARSERS}
+    print(f"{'file':<40} {'size KB':>8}  " + '  '.join(f"{name:>30}" for name, _ in PARSERS))
+    for i, path in enumerate(files):
+        row = []
+        for name, func in PARSERS:
+            seconds, peak = measure(func, path, args.repeat)
+            totals[name][0] += seconds
+            totals[name][1] = max(totals[name][1], peak)
+            row.append(f"{seconds * 1000:>12.1f} ms {peak / 1024:>10.0f} KB")
+        if i < args.show:
+            print(f"{os.path.basename(path):<40} {os.path.getsize(path) / 1024:>8.0f}  " + '  '.join(f"{r:>30}" for r in row))
+
+    print(f"\n{len(files)} files, best of {args.repeat} runs")
+    for name, (seconds, peak) in totals.items():
+        print(f"  {name:<30} total {seconds:>7.2f} s   max peak {peak / 1024 / 1024:>6.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/hotel_index_benchmark.py
+
+"""
+Compares answering /api/hotels-in-view viewport queries from the
+in-memory hotel index with the MongoDB `$geoWithin $box` query it
+replaced, over random map views of synthetic hotels, and times the
+opt-in tile-cached path (HOTEL_TILE_CACHE_ENABLED) against the exact
+path while panning at street zoom. The Mongo path uses a
+temporary collection (with the 2dsphere index seed_db.py creates) in the
+database at MONGO_URI, dropped afterwards; it is skipped if MongoDB is
+unreachable. All paths produce the JSON response body.
+
+Usage:
+    python benchmarks/hotel_index_benchmark.py [--hotels 2000] [--queries 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.hotel_index import HotelIndex, HotelViewportIndex
+
+# Roughly Great Britain
+BOUNDS = (-6.0, 50.0, 1.8, 58.5)
+
+def synthetic_hotels(count, seed=0):
+    rng = np.random.default_rng(seed)
+    lons = rng.uniform(BOUNDS[0], BOUNDS[2], count)
+    lats = rng.uniform(BOUNDS[1], BOUNDS[3], count)
+    return [{'_id': uuid.uuid4().hex[:22], 'name': f"Hotel {i}",
+             'location': {'type': 'Point', 'coordinates': [float(lon), float(lat)]},
+             'is_featured': i % 10 == 0, 'price_range': '££', 'accommodation_type': 'Hotel',
+             'facilities': ['secure_storage', 'drying_room'], 'route_count': i % 6, 'status': 'approved'}
+            for i, (lon, lat) in enumerate(zip(lons.tolist(), lats.tolist()))]
+
+def random_views(count, seed=1):
+    """Views about 60 x 35 km, the home map at zoom 10-11."""
+    rng = np.random.default_rng(seed)
+    wests = rng.uniform(BOUNDS[0], BOUNDS[2] - 0.9, count)
+    souths = rng.uniform(BOUNDS[1], BOUNDS[3] - 0.3, count)
+    return [(w, s, w + 0.9, s + 0.3) for w, s in zip(wests.tolist(), souths.tolist())]
+
+def panning_views(count, seed=2):
+    """A 1280 x 720 px window at zoom 13 panned in small steps from a few starting points."""
+    rng = np.random.default_rng(seed)
+    views = []
+    for _ in range(max(1, count // 50)):
+        west, south = rng.uniform(BOUNDS[0], BOUNDS[2] - 0.5), rng.uniform(BOUNDS[1], BOUNDS[3] - 0.3)
+        for _ in range(50):
+            west += rng.normal(0, 0.03)
+            south += rng.normal(0, 0.01)
+            views.append((west, south, west + 0.22, south + 0.08))
+    return views[:count]
+
+def bench_tiles(cards, count):
+    views = panning_views(count)
+    load = lambda: cards
+    for tiles_enabled in (False, True):
+        index = HotelIndex()
+        index.tiles_enabled = tiles_enabled
+        index.view_json(*views[0], 13, load, lambda: 1)
+        seconds, _ = time_per_query(lambda *view: bool(index.view_json(*view, 13, load, lambda: 1)), views)
+        if not tiles_enabled:
+            print(f"  exact:  {seconds * 1e6:8.1f} us/query panning at zoom 13 (default)")
+            continue
+        stats = index.tile_cache.stats()
+        print(f"  tiles:  {seconds * 1e6:8.1f} us/query panning at zoom 13, hit rate {stats['hit_rate']}, "
+              f"{stats['entries']} tiles, {stats['bytes'] / 1024:.0f} KB cached")
+
+def time_per_query(run, views):
+    start = time.perf_counter()
+    found = sum(run(*view) for view in views)
+    return (time.perf_counter() - start) / len(views), found / len(views)
+
+def bench_mongo(hotels, views):
+    from pymongo import GEOSPHERE, MongoClient
+    from pymongo.errors import PyMongoError
+    from config import Config
+
+    client = MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=2000)
+    collection = client.get_default_database()[f"bench_hotels_{uuid.uuid4().hex[:8]}"]
+    projection = {'name': 1, 'location': 1, 'is_featured': 1, 'price_range': 1,
+                  'accommodation_type': 1, 'facilities': 1, 'route_count': 1}
+    try:
+        collection.create_index([('location', GEOSPHERE)])
+        collection.insert_many(hotels)
+
+        def query(west, south, east, north):
+            cursor = collection.find({'location': {'$geoWithin': {'$box': [[west, south], [east, north]]}},
+                                      'status': 'approved'}, projection)
+            found = list(cursor)
+            json.dumps({'hotels': found})
+            return len(found)
+
+        return time_per_query(query, views)
+    except PyMongoError as e:
+        print(f"  mongo:  skipped ({e.__class__.__name__}: MongoDB not reachable at {Config.MONGO_URI})")
+        return None
+    finally:
+        try:
+            collection.drop()
+        except PyMongoError:
+            pass
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hotels', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    hotels = synthetic_hotels(args.hotels)
+    views = random_views(args.queries)
+    cards = [{key: value for key, value in hotel.items() if key != 'status'} for hotel in hotels]
+
+    start = time.perf_counter()
+    index = HotelViewportIndex(cards)
+    print(f"{args.hotels} hotels, {args.queries} views; index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    seconds, found = time_per_query(lambda *view: len(index.query(*view)), views)
+    print(f"  index:  {seconds * 1e6:8.1f} us/query (lookup only), {found:.1f} hotels/view")
+    index_seconds, _ = time_per_query(lambda *view: len(index.hotels_json(*view)), views)
+    print(f"  index:  {index_seconds * 1e6:8.1f} us/query (with response body)")
+
+    bench_tiles(cards, args.queries)
+
+    result = bench_mongo(hotels, views)
+    if result is not None:
+        mongo_seconds, mongo_found = result
+        print(f"  mongo:  {mongo_seconds * 1e6:8.1f} us/query, {mongo_found:.1f} hotels/view, "
+              f"{mongo_seconds / index_seconds:.0f}x slower")
+
+if __name__ == '__main__':
+    main()
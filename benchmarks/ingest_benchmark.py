@@ -0,0 +1,48 @@
+# benchmarks/ingest_benchmark.py
+
+"""
+Measures bulk ingestion throughput (parse, metrics, difficulty and profile
+artifact per file) for the process-pool path behind `flask ingest-routes`,
+at several worker counts. Files are copied into a temporary directory;
+nothing is written to the database.
+
+Usage:
+    python benchmarks/ingest_benchmark.py [corpus_dir] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.bulk_ingest import find_route_files, ingest_files
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', '0Dev Reference Docs',
+                              'TRA Files for Reference', 'route_files_store')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    paths = find_route_files(args.corpus)
+    if not paths:
+        print(f"No GPX or TCX files found in {args.corpus}")
+        return
+    megabytes = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+    print(f"{len(paths)} files, {megabytes:.1f} MB, {os.cpu_count()} CPUs")
+
+    for workers in sorted(set(args.workers)):
+        with tempfile.TemporaryDirectory() as dest_dir:
+            start = time.perf_counter()
+            failed = sum(1 for _, _, error in ingest_files(paths, dest_dir, workers) if error)
+            elapsed = time.perf_counter() - start
+        print(f"  {workers:2d} workers: {elapsed:6.2f} s, {len(paths) / elapsed:6.1f} files/s, "
+              f"{megabytes / elapsed:5.1f} MB/s, {failed} failed")
+
+if __name__ == '__main__':
+    main()
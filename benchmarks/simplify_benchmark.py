@@ -0,0 +1,62 @@
+# benchmarks/simplify_benchmark.py
+
+"""
+Times Visvalingam-Whyatt ranking and Douglas-Peucker simplification on the
+largest GPX files, and reports how many points each zoom level draws and
+how big its JSON geometry is.
+
+Usage:
+    python benchmarks/simplify_benchmark.py [corpus_dir] [--files N]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.gpx_utils import parse_gpx_track
+from app.utils.simplify import LOD_ZOOM_LEVELS, douglas_peucker, indices_for_zoom, visvalingam_whyatt
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', '0Dev Reference Docs',
+                              'TRA Files for Reference', 'route_files_store')
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def _geometry_bytes(track, idx):
+    return len(json.dumps([[lat, lon] for lat, lon in zip(track.lat[idx].tolist(), track.lon[idx].tolist())]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--files', type=int, default=5, help='Number of largest files to run on.')
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')), key=os.path.getsize, reverse=True)[:args.files]
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    for path in files:
+        with open(path, 'rb') as f:
+            track = parse_gpx_track(f)
+        n = len(track)
+        significance, vw_seconds = _timed(visvalingam_whyatt, track.lat, track.lon)
+        dp_idx, dp_seconds = _timed(douglas_peucker, track.lat, track.lon, 5.0)
+
+        print(f"\n{os.path.basename(path)}: {n} points, raw geometry {_geometry_bytes(track, slice(None)) / 1024:.0f} KB")
+        print(f"  Visvalingam rank: {vw_seconds * 1000:7.1f} ms ({vw_seconds / n * 1e6:.2f} us/point)")
+        print(f"  Douglas-Peucker 5 m: {dp_seconds * 1000:7.1f} ms -> {len(dp_idx)} points")
+        for zoom in LOD_ZOOM_LEVELS:
+            idx, select_seconds = _timed(indices_for_zoom, significance, track.lat, zoom)
+            print(f"  zoom {zoom:2d}: {len(idx):6d} points ({len(idx) / n:6.1%}), "
+                  f"{_geometry_bytes(track, idx) / 1024:7.1f} KB, selected in {select_seconds * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/track_format_benchmark.py
+
+"""
+Compares the JSON and encoded-polyline track formats served by
+/api/route/<id>/track across the GPX corpus: response size (raw and
+gzipped) and the server-side time to build and serialise each response.
+
+Usage:
+    python benchmarks/track_format_benchmark.py [corpus_dir] [--zoom Z] [--chart-points N]
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.gpx_utils import parse_gpx_track
+from app.utils.polyline import decode_deltas, decode_polyline
+from app.utils.route_artifacts import DEFAULT_CHART_POINTS, DEFAULT_PROFILE_ZOOM, TRACK_FORMATS, RouteProfile
+from app.utils.simplify import visvalingam_whyatt
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', '0Dev Reference Docs',
+                              'TRA Files for Reference', 'route_files_store')
+
+def _serialise(profile, zoom, chart_points, fmt):
+    """Mirrors what the endpoint does for a cache miss."""
+    return json.dumps(profile.to_dict(zoom=zoom, chart_points=chart_points, fmt=fmt), separators=(',', ':')).encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    parser.add_argument('--zoom', type=int, default=DEFAULT_PROFILE_ZOOM)
+    parser.add_argument('--chart-points', type=int, default=DEFAULT_CHART_POINTS)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')))
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    totals = {fmt: {'raw': 0, 'gzip': 0, 'seconds': 0.0} for fmt in TRACK_FORMATS}
+    max_decode_error = {'coord_deg': 0.0, 'distance_m': 0.0, 'elevation_m': 0.0}
+    for path in files:
+        with open(path, 'rb') as f:
+            track = parse_gpx_track(f)
+        profile = RouteProfile(track, visvalingam_whyatt(track.lat, track.lon), '0' * 64)
+
+        bodies = {}
+        for fmt in TRACK_FORMATS:
+            start = time.perf_counter()
+            body = _serialise(profile, args.zoom, args.chart_points, fmt)
+            totals[fmt]['seconds'] += time.perf_counter() - start
+            totals[fmt]['raw'] += len(body)
+            totals[fmt]['gzip'] += len(gzip.compress(body, compresslevel=6))
+            bodies[fmt] = json.loads(body)
+
+        # Check the compact format decodes back to the JSON values
+        plain, compact = bodies['json'], bodies['polyline']
+        if plain['geometry']:
+            lats, lons = decode_polyline(compact['geometry'])
+            coords = plain['geometry']
+            max_decode_error['coord_deg'] = max(max_decode_error['coord_deg'],
+                                                max(abs(lat - c[0]) for lat, c in zip(lats, coords)),
+                                                max(abs(lon - c[1]) for lon, c in zip(lons, coords)))
+        if plain['distance_km']:
+            distances = decode_deltas(compact['distance_m'], 1000)
+            elevations = decode_deltas(compact['elevation_dm'], 10)
+            max_decode_error['distance_m'] = max(max_decode_error['distance_m'],
+                                                 max(abs(a - b) * 1000 for a, b in zip(distances, plain['distance_km'])))
+            max_decode_error['elevation_m'] = max(max_decode_error['elevation_m'],
+                                                  max(abs(a - b) for a, b in zip(elevations, plain['elevation_m'])))
+
+    print(f"{len(files)} routes, zoom {args.zoom}, {args.chart_points} chart points")
+    for fmt, t in totals.items():
+        print(f"  {fmt:9s}: {t['raw'] / 1024:8.1f} KB raw, {t['gzip'] / 1024:7.1f} KB gzip, "
+              f"{t['seconds'] / len(files) * 1000:6.2f} ms/route to build")
+    ratio = totals['json']['gzip'] / totals['polyline']['gzip']
+    print(f"  polyline is {totals['json']['raw'] / totals['polyline']['raw']:.1f}x smaller raw, {ratio:.1f}x smaller gzipped")
+    print(f"  max decode error: {max_decode_error['coord_deg']:.1e} deg, "
+          f"{max_decode_error['distance_m']:.2f} m distance, {max_decode_error['elevation_m']:.2f} m elevation")
+
+if __name__ == '__main__':
+    main()
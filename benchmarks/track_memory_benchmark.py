@@ -0,0 +1,90 @@
+# benchmarks/track_memory_benchmark.py
+
+"""
+Measures the memory held by a parsed track as a list of dicts versus the
+columnar Track container, plus the time to build each and to convert the
+Track to dicts at the JSON edge.
+
+Usage:
+    python benchmarks/track_memory_benchmark.py [corpus_dir]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.gpx_utils import parse_gpx_track, iter_gpx_points, haversine_distance
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', '0Dev Reference Docs',
+                              'TRA Files for Reference', 'route_files_store')
+
+def _build_dicts(points):
+    """The pre-Track representation: one four-key dict per point."""
+    track_points = []
+    total_km = 0.0
+    last = None
+    for lat, lon, ele in points:
+        if last:
+            total_km += haversine_distance(last[0], last[1], lat, lon)
+        track_points.append({'lat': lat, 'lon': lon, 'ele': ele, 'dist': total_km})
+        last = (lat, lon)
+    return track_points
+
+def _retained_bytes(build):
+    """Returns (bytes still allocated after build() returns, result, seconds)."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, result, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus', nargs='?', default=DEFAULT_CORPUS)
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.corpus, '*.gpx')), key=os.path.getsize, reverse=True)
+    if not files:
+        print(f"No GPX files found in {args.corpus}")
+        return
+
+    totals = {'points': 0, 'dict_bytes': 0, 'track_bytes': 0,
+              'dict_seconds': 0.0, 'track_seconds': 0.0, 'to_dicts_seconds': 0.0}
+    for path in files:
+        points = list(iter_gpx_points(path))
+        dict_bytes, _, _ = _retained_bytes(lambda: _build_dicts(points))
+        track_bytes, track, _ = _retained_bytes(lambda: parse_gpx_track(path))
+
+        # Untraced timings, parser cost included for both
+        start = time.perf_counter()
+        _build_dicts(iter_gpx_points(path))
+        totals['dict_seconds'] += time.perf_counter() - start
+        start = time.perf_counter()
+        track = parse_gpx_track(path)
+        totals['track_seconds'] += time.perf_counter() - start
+        start = time.perf_counter()
+        track.to_dicts()
+        totals['to_dicts_seconds'] += time.perf_counter() - start
+
+        totals['points'] += len(points)
+        totals['dict_bytes'] += dict_bytes
+        totals['track_bytes'] += track_bytes
+
+    n = totals['points']
+    print(f"{len(files)} files, {n} points")
+    print(f"  list of dicts   {totals['dict_bytes'] / 1024 / 1024:>8.1f} MB retained  "
+          f"{totals['dict_bytes'] / n:>6.1f} B/point  build {totals['dict_seconds']:.2f} s")
+    print(f"  Track           {totals['track_bytes'] / 1024 / 1024:>8.1f} MB retained  "
+          f"{totals['track_bytes'] / n:>6.1f} B/point  build {totals['track_seconds']:.2f} s")
+    print(f"  Track.to_dicts() at the edge: {totals['to_dicts_seconds']:.2f} s")
+
+if __name__ == '__main__':
+    main()
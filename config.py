@@ -37,6 +37,44 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD') # Reads 'MAIL_PASSWORD' from .env [cite: 1]
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', MAIL_USERNAME)
 
+    # Parsed-route cache used by the route profile page. The optional
+    # directory adds an on-disk tier so restarted workers start warm.
+    ROUTE_CACHE_MAX_BYTES = int(os.environ.get('ROUTE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    ROUTE_CACHE_DIR = os.environ.get('ROUTE_CACHE_DIR')
+
+    # Default number of points in the route profile's elevation chart;
+    # a ?chart_points= query parameter overrides it per request.
+    ROUTE_CHART_POINTS = int(os.environ.get('ROUTE_CHART_POINTS', 800))
+
+    # Adds an X-Mongo-Query-Count header (MongoDB commands per request) to
+    # every response, for spotting N+1 query patterns.
+    MONGO_QUERY_COUNT_HEADER = os.environ.get('MONGO_QUERY_COUNT_HEADER', 'false').lower() in ['true', 'on', '1']
+
+    # The home map gets server-side hotel clusters at this zoom and below,
+    # and individual hotels only when zoomed in further. Clusters group
+    # hotels within cells HOTEL_CLUSTER_CELL_PX pixels across.
+    HOTEL_CLUSTER_MAX_ZOOM = int(os.environ.get('HOTEL_CLUSTER_MAX_ZOOM', 12))
+    HOTEL_CLUSTER_CELL_PX = int(os.environ.get('HOTEL_CLUSTER_CELL_PX', 64))
+
+    # Both are served from an in-memory index of the approved hotels, built
+    # at startup when HOTEL_INDEX_PRELOAD is set. Each worker re-reads the
+    # hotels version counter at most every HOTEL_INDEX_VERSION_CHECK_SECONDS
+    # and rebuilds its index when a hotel write has bumped it.
+    HOTEL_INDEX_PRELOAD = os.environ.get('HOTEL_INDEX_PRELOAD', 'true').lower() in ['true', 'on', '1']
+    HOTEL_INDEX_VERSION_CHECK_SECONDS = float(os.environ.get('HOTEL_INDEX_VERSION_CHECK_SECONDS', 5))
+
+    # With HOTEL_TILE_CACHE_ENABLED, map views are snapped to the slippy-map
+    # tiles covering them, and each tile's share of the response is cached
+    # for HOTEL_TILE_CACHE_TTL seconds, up to HOTEL_TILE_CACHE_MAX_BYTES in
+    # total. Views covering more than HOTEL_TILE_CACHE_MAX_VIEW_TILES tiles
+    # bypass the cache. Off by default: the in-memory index answers views
+    # faster than the tile path does. Hit rates are reported at
+    # /admin/cache-stats.
+    HOTEL_TILE_CACHE_ENABLED = os.environ.get('HOTEL_TILE_CACHE_ENABLED', 'false').lower() in ['true', 'on', '1']
+    HOTEL_TILE_CACHE_TTL = int(os.environ.get('HOTEL_TILE_CACHE_TTL', 600))
+    HOTEL_TILE_CACHE_MAX_BYTES = int(os.environ.get('HOTEL_TILE_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    HOTEL_TILE_CACHE_MAX_VIEW_TILES = int(os.environ.get('HOTEL_TILE_CACHE_MAX_VIEW_TILES', 128))
+
     @staticmethod
     def init_app(app):
         """
@@ -53,6 +91,7 @@ class DevelopmentConfig(Config):
     # Enables debug mode, which provides helpful error pages and reloads
     # the server automatically when code changes.
     DEBUG = True
+    MONGO_QUERY_COUNT_HEADER = True
 
 class TestingConfig(Config):
     """
@@ -68,6 +107,9 @@ class TestingConfig(Config):
     # WTForms requires this to be False for tests to work correctly with CSRF protection.
     WTF_CSRF_ENABLED = False
 
+    # Tests load their own hotels; build the map index on first use.
+    HOTEL_INDEX_PRELOAD = False
+
 
 class ProductionConfig(Config):
     """
@@ -7,7 +7,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app import create_app
-from app.commands import create_admin_command
+from app.commands import (create_admin_command, build_route_artifacts_command, ingest_routes_command,
+                          reconcile_route_counts_command)
 
 # Get the config name from environment or use default
 config_name = os.getenv('FLASK_ENV') or 'default'
@@ -15,6 +16,9 @@ app = create_app(config_name)
 
 # Register the custom command with the Flask app
 app.cli.add_command(create_admin_command)
+app.cli.add_command(build_route_artifacts_command)
+app.cli.add_command(ingest_routes_command)
+app.cli.add_command(reconcile_route_counts_command)
 
 if __name__ == '__main__':
     app.run()
\ No newline at end of file